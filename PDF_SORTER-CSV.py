@@ -1,45 +1,93 @@
-import csv
-import re
-
-# Input and output file names
-input_file = "ftp_tree.txt"
-output_file = "sorted_question_papers.csv"
-
-rows = []
-
-with open(input_file, "r", encoding="utf-8") as f:
-    for line in f:
-        # Remove any leading/trailing whitespace (including tree symbols)
-        line = line.strip()
-        # Use regex to extract the full path starting with a "/"
-        match = re.search(r'(/.*)', line)
-        if match:
-            path = match.group(1).strip()
-            # Only consider lines that point to a PDF file
-            if path.lower().endswith(".pdf"):
-                # Split path into components and remove empty segments
-                parts = [part for part in path.split("/") if part]
-                if len(parts) >= 4:  # Ensure it has enough elements to extract branch & timeline
-                    # Extract Department
-                    department = parts[0]
-                    # Extract Branch (Second element in the path)
-                    branch = parts[1]  
-                    # Extract Timeline (Assumed to be before the Semester folder)
-                    timeline = parts[-3] if len(parts) >= 4 else "Unknown"
-                    # Extract Semester (Second-to-last folder)
-                    semester = parts[-2]
-                    # Extract Subject (Last segment)
-                    subject = parts[-1].replace(".pdf", "")
-
-                    rows.append([department, branch, timeline, semester, subject, path])
-
-# Sort the records by Department, then Branch, then Timeline, then Subject
-rows.sort(key=lambda x: (x[0].lower(), x[1].lower(), x[2].lower(), x[4].lower()))
-
-# Write the results to a CSV file
-with open(output_file, "w", encoding="utf-8", newline="") as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(["Department", "Branch", "Timeline", "Semester", "Subject", "FullPath"])
-    writer.writerows(rows)
-
-print(f"CSV file '{output_file}' created with {len(rows)} records.")
+import csv
+import re
+import argparse
+from paper_paths import CSV_HEADER, parse_paper_path, row_sort_key
+from ftp_snapshot import DELTA_PATH, load_delta
+import config
+
+# Input and output file names
+input_file = config.FTP_TREE_PATH
+output_file = config.PAPERS_CSV_PATH
+delta_output_file = "sorted_question_papers_delta.csv"
+
+
+def read_tree_rows(tree_file):
+    """
+    Parses every PDF line of an ftp_tree.txt into a CSV row.
+    """
+    rows = []
+    with open(tree_file, "r", encoding="utf-8") as f:
+        for line in f:
+            # Remove any leading/trailing whitespace (including tree symbols)
+            line = line.strip()
+            # Use regex to extract the full path starting with a "/"
+            match = re.search(r'(/.*)', line)
+            if match:
+                row = parse_paper_path(match.group(1).strip())
+                if row:
+                    rows.append(row)
+    return rows
+
+def read_csv_rows(csv_file):
+    """
+    Reads the rows (without the header) of an earlier sorted CSV.
+    """
+    with open(csv_file, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row for row in reader]
+
+def write_rows(csv_file, rows):
+    """
+    Writes the header and rows to csv_file.
+    """
+    with open(csv_file, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+
+def apply_delta(rows, delta):
+    """
+    Drops the rows of removed PDFs from rows and adds rows for added ones.
+    Returns (merged rows, rows of the added and modified PDFs).
+    """
+    removed = {item["path"] for item in delta["removed"]}
+    merged = [row for row in rows if row[5] not in removed]
+    known = {row[5] for row in merged}
+    changed = []
+    for item in delta["added"] + delta["modified"]:
+        row = parse_paper_path(item["path"])
+        if row is None:
+            continue
+        changed.append(row)
+        if row[5] not in known:
+            merged.append(row)
+    return merged, changed
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Build {output_file} from the FTP tree.")
+    parser.add_argument("--delta", nargs="?", const=DELTA_PATH,
+                        help="Update the existing CSV from a sync delta instead of re-parsing "
+                             f"{input_file}; the changed PDFs are also written to {delta_output_file}")
+    args = parser.parse_args()
+
+    if args.delta:
+        delta = load_delta(args.delta)
+        rows, changed = apply_delta(read_csv_rows(output_file), delta)
+        changed.sort(key=row_sort_key)
+        write_rows(delta_output_file, changed)
+        print(f"Delta: {len(delta['added'])} added, {len(delta['removed'])} removed, "
+              f"{len(delta['modified'])} modified; {len(changed)} rows written to '{delta_output_file}'.")
+    else:
+        rows = read_tree_rows(input_file)
+
+    # Sort the records by Department, then Branch, then Timeline, then Subject
+    rows.sort(key=row_sort_key)
+
+    # Write the results to a CSV file
+    write_rows(output_file, rows)
+
+    print(f"CSV file '{output_file}' created with {len(rows)} records.")
+
+if __name__ == "__main__":
+    main()
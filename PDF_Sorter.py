@@ -1,58 +1,298 @@
-import os
-import csv
-import shutil
-
-def get_unique_filename(directory, base_name, ext):
-    """
-    Returns a unique filename by appending a number if needed.
-    For example, if 'Subject_Timeline.pdf' exists, it will try 
-    'Subject_Timeline_1.pdf', 'Subject_Timeline_2.pdf', etc.
-    """
-    filename = f"{base_name}{ext}"
-    counter = 1
-    while os.path.exists(os.path.join(directory, filename)):
-        filename = f"{base_name}_{counter}{ext}"
-        counter += 1
-    return filename
-
-# Configurable paths
-csv_file = "sorted_question_papers.csv"
-local_root = "RCOEM"         # Folder where the original PDFs are downloaded
-target_root = "sorted_pdfs"  # Destination folder
-
-# Read CSV and process each row
-with open(csv_file, "r", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        # Extract details from CSV row (trimming whitespace)
-        department = row["Department"].strip()
-        branch = row["Branch"].strip()
-        timeline = row["Timeline"].strip()      # e.g. "SUMMER -2024"
-        semester = row["Semester"].strip()
-        subject = row["Subject"].strip()
-        full_path = row["FullPath"].strip()       # e.g. "/B. E/ARTIFICIAL INTELLGENCE AND MACHINE LEARNING/..."
-
-        # Construct the source file path (remove leading slash)
-        relative_path = full_path.lstrip("/")
-        source_path = os.path.join(local_root, relative_path)
-        
-        # Build target directory:
-        # sorted_pdfs/Department/Branch/Semester/Subject/
-        target_dir = os.path.join(target_root, department, branch, semester, subject)
-        os.makedirs(target_dir, exist_ok=True)
-        
-        # Create a new file name using subject and timeline (e.g. "Subject_Timeline.pdf")
-        base_name = f"{subject}_{timeline}"
-        ext = ".pdf"
-        new_filename = get_unique_filename(target_dir, base_name, ext)
-        dest_path = os.path.join(target_dir, new_filename)
-        
-        # Instead of moving, we copy the file (preserving metadata)
-        if os.path.exists(source_path):
-            try:
-                shutil.copy2(source_path, dest_path)
-                print(f"Copied: {source_path} -> {dest_path}")
-            except Exception as e:
-                print(f"Error copying {source_path}: {e}")
-        else:
-            print(f"Source file does not exist: {source_path}")
\ No newline at end of file
+import os
+import csv
+import errno
+import shutil
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from extraction_cache import hash_file
+import config
+
+# Configurable paths
+csv_file = config.PAPERS_CSV_PATH
+local_root = config.DOWNLOAD_ROOT  # Folder where the original PDFs are downloaded
+target_root = config.SORTED_ROOT   # Destination folder
+
+# Placement settings
+PLACE_MODE = "copy"  # "hardlink", "reflink" or "copy"; the first two fall back to copy where unsupported
+PLACE_WORKERS = 8    # Threads placing files at once
+
+FICLONE = 0x40049409  # Linux ioctl that makes dest share source's blocks (btrfs, XFS, ...)
+# Errors meaning a mode cannot work on this file system at all, not just for one file
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTTY,
+                      errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS}
+
+_unavailable_modes = set()
+
+
+class PlacementIndex:
+    """
+    The file names of each target directory, read with one scan the first
+    time the directory is used, so picking a free 'Subject_Timeline_N.pdf'
+    name needs no os.path.exists probing. Names handed out are reserved in
+    memory. Safe to share between threads.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._reserved = {}
+        self._lock = threading.Lock()
+
+    def _dir_names(self, directory):
+        names = self._names.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as it:
+                    names = {entry.name for entry in it}
+            except FileNotFoundError:
+                names = set()
+            names |= self._reserved.get(directory, set())
+            self._names[directory] = names
+        return names
+
+    def existing(self, directory, base_name, ext):
+        """
+        The names 'base_name.ext', 'base_name_1.ext', ... in use in
+        directory, up to the first free one, leaving out names reserved
+        through this index: those are being placed from other sources, and
+        whether they are on disk yet depends only on timing.
+        """
+        with self._lock:
+            names = self._dir_names(directory)
+            reserved = self._reserved.get(directory, set())
+            found = []
+            filename = f"{base_name}{ext}"
+            counter = 1
+            while filename in names:
+                if filename not in reserved:
+                    found.append(filename)
+                filename = f"{base_name}_{counter}{ext}"
+                counter += 1
+            return found
+
+    def reserve(self, directory, base_name, ext):
+        """
+        Returns the first free name in the same sequence and marks it used.
+        """
+        with self._lock:
+            names = self._dir_names(directory)
+            filename = f"{base_name}{ext}"
+            counter = 1
+            while filename in names:
+                filename = f"{base_name}_{counter}{ext}"
+                counter += 1
+            names.add(filename)
+            self._reserved.setdefault(directory, set()).add(filename)
+            return filename
+
+    def release(self, directory, filename):
+        with self._lock:
+            self._dir_names(directory).discard(filename)
+            self._reserved.get(directory, set()).discard(filename)
+
+    def refresh(self, directory):
+        """
+        Rescans directory, e.g. after another process created a file in it.
+        Names reserved through this index stay reserved.
+        """
+        with self._lock:
+            self._names.pop(directory, None)
+            self._dir_names(directory)
+
+
+_default_index = PlacementIndex()
+
+def is_same_file(existing_path, source_path, source_stat):
+    """
+    True when existing_path already holds source_path: the same inode (a
+    hardlink), or the same size and either the same modification time
+    (which copy2 and reflink placement preserve) or the same contents.
+    """
+    try:
+        existing = os.stat(existing_path)
+    except FileNotFoundError:
+        return False
+    if (existing.st_ino, existing.st_dev) == (source_stat.st_ino, source_stat.st_dev):
+        return True
+    if existing.st_size != source_stat.st_size:
+        return False
+    if int(existing.st_mtime) == int(source_stat.st_mtime):
+        return True
+    return hash_file(existing_path) == hash_file(source_path)
+
+def _mode_failed(mode, error):
+    if error.errno in UNSUPPORTED_ERRNOS and mode not in _unavailable_modes:
+        _unavailable_modes.add(mode)
+        logging.warning(f"{mode} placement unavailable ({error}); copying instead")
+
+def reflink(source_path, dest_path):
+    """
+    Creates dest_path (which must not exist) as a copy-on-write clone of
+    source_path and copies its timestamps.
+    """
+    import fcntl
+    with open(source_path, "rb") as src, open(dest_path, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(dest_path)
+            raise
+    shutil.copystat(source_path, dest_path)
+
+def place_file(source_path, dest_path, mode=PLACE_MODE):
+    """
+    Places source_path at dest_path, which must not exist yet (FileExistsError
+    otherwise), as a hardlink, a reflink or a copy. Hardlinks and reflinks
+    fall back to a copy where the file system does not support them.
+    Returns "linked", "reflinked" or "copied".
+    """
+    if mode == "hardlink" and mode not in _unavailable_modes:
+        try:
+            os.link(source_path, dest_path)
+            return "linked"
+        except FileExistsError:
+            raise
+        except OSError as e:
+            _mode_failed(mode, e)
+    elif mode == "reflink" and mode not in _unavailable_modes:
+        try:
+            reflink(source_path, dest_path)
+            return "reflinked"
+        except FileExistsError:
+            raise
+        except (OSError, ImportError) as e:
+            _mode_failed(mode, e if isinstance(e, OSError) else OSError(errno.ENOSYS, str(e)))
+
+    # Claim the name so a concurrent placement picks the next one
+    open(dest_path, "xb").close()
+    try:
+        shutil.copy2(source_path, dest_path)
+    except Exception:
+        os.remove(dest_path)
+        raise
+    return "copied"
+
+def plan_pdf(row, local_root=local_root, target_root=target_root, index=None):
+    """
+    Works out where the PDF of one CSV row goes:
+    target_root/Department/Branch/Semester/Subject/Subject_Timeline.pdf,
+    or Subject_Timeline_N.pdf if that name holds a different file.
+    Returns ("place", (source path, destination)) with the destination
+    name reserved in index, ("exists", earlier placement of the same
+    file) or ("missing", source path).
+    """
+    index = index or _default_index
+    # Extract details from CSV row (trimming whitespace)
+    department = row["Department"].strip()
+    branch = row["Branch"].strip()
+    timeline = row["Timeline"].strip()      # e.g. "SUMMER -2024"
+    semester = row["Semester"].strip()
+    subject = row["Subject"].strip()
+    full_path = row["FullPath"].strip()       # e.g. "/B. E/ARTIFICIAL INTELLGENCE AND MACHINE LEARNING/..."
+
+    # Construct the source file path (remove leading slash)
+    relative_path = full_path.lstrip("/")
+    source_path = os.path.join(local_root, relative_path)
+    try:
+        source_stat = os.stat(source_path)
+    except FileNotFoundError:
+        return "missing", source_path
+
+    # Build target directory:
+    # sorted_pdfs/Department/Branch/Semester/Subject/
+    target_dir = os.path.join(target_root, department, branch, semester, subject)
+    os.makedirs(target_dir, exist_ok=True)
+
+    # Create a new file name using subject and timeline (e.g. "Subject_Timeline.pdf")
+    base_name = f"{subject}_{timeline}"
+    ext = ".pdf"
+    for filename in index.existing(target_dir, base_name, ext):
+        if is_same_file(os.path.join(target_dir, filename), source_path, source_stat):
+            return "exists", os.path.join(target_dir, filename)
+    filename = index.reserve(target_dir, base_name, ext)
+    return "place", (source_path, os.path.join(target_dir, filename))
+
+def execute_plan(row, plan, local_root=local_root, target_root=target_root, mode=PLACE_MODE, index=None):
+    """
+    Carries out a plan_pdf result. Returns (status, path) as place_pdf does.
+    """
+    index = index or _default_index
+    while True:
+        status, path = plan
+        if status != "place":
+            return status, path
+        source_path, dest_path = path
+        try:
+            return place_file(source_path, dest_path, mode), dest_path
+        except FileExistsError:
+            # Created behind our back (another process): plan again against a fresh listing
+            index.refresh(os.path.dirname(dest_path))
+            plan = plan_pdf(row, local_root, target_root, index)
+        except Exception:
+            index.release(os.path.dirname(dest_path), os.path.basename(dest_path))
+            raise
+
+def place_pdf(row, local_root=local_root, target_root=target_root, mode=PLACE_MODE, index=None):
+    """
+    Places the PDF of one CSV row from local_root at
+    target_root/Department/Branch/Semester/Subject/Subject_Timeline.pdf.
+    Returns (status, path): ("copied" / "linked" / "reflinked", destination),
+    ("exists", earlier placement of the same file), or ("missing", source
+    path). Safe to call from several threads sharing one PlacementIndex.
+    """
+    plan = plan_pdf(row, local_root, target_root, index)
+    return execute_plan(row, plan, local_root, target_root, mode, index)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sort downloaded PDFs into Department/Branch/Semester/Subject.")
+    parser.add_argument("--csv", default=csv_file)
+    parser.add_argument("--mode", choices=["hardlink", "reflink", "copy"], default=PLACE_MODE,
+                        help="How PDFs are placed; hardlink and reflink fall back to copy where unsupported")
+    parser.add_argument("--workers", type=int, default=PLACE_WORKERS)
+    args = parser.parse_args()
+
+    # Read CSV and process each row
+    with open(args.csv, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    # Names are picked serially, in CSV order, so reruns and collisions name files
+    # the same way every time; only the copying runs in parallel
+    index = PlacementIndex()
+    plans = []
+    planned = {}  # (target dir, source) -> destination, for rows repeating a file within this run
+    for row in rows:
+        try:
+            plan = plan_pdf(row, index=index)
+        except Exception as e:
+            plan = ("error", e)
+        if plan[0] == "place":
+            source_path, dest_path = plan[1]
+            key = (os.path.dirname(dest_path), source_path)
+            if key in planned:
+                index.release(*os.path.split(dest_path))
+                plan = ("exists", planned[key])
+            else:
+                planned[key] = dest_path
+        plans.append(plan)
+
+    def place(row, plan):
+        try:
+            return execute_plan(row, plan, mode=args.mode, index=index)
+        except Exception as e:
+            return "error", e
+
+    verbs = {"copied": "Copied", "linked": "Linked", "reflinked": "Reflinked"}
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        for row, (status, path) in zip(rows, executor.map(place, rows, plans)):
+            source_path = os.path.join(local_root, row["FullPath"].strip().lstrip("/"))
+            if status in verbs:
+                print(f"{verbs[status]}: {source_path} -> {path}")
+            elif status == "missing":
+                print(f"Source file does not exist: {path}")
+            elif status == "error":
+                print(f"Error copying {source_path}: {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import random
+import argparse
+from fuzzywuzzy import fuzz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+import metrics
+
+SIMILARITY_THRESHOLD = main.SIMILARITY_THRESHOLD
+COMMON_WORDS = ["the", "of", "and", "a", "to", "in", "is", "with", "for", "its",
+                "explain", "define", "describe", "what", "write", "short", "note", "on",
+                "differentiate", "between", "give", "example", "suitable", "diagram"]
+
+
+SYLLABLES = ["com", "pro", "tion", "net", "work", "da", "ta", "al", "er", "ing", "sys",
+             "tem", "graph", "log", "ic", "struc", "ture", "man", "age", "ment", "pro",
+             "cess", "ory", "mem", "tree", "sort", "search", "re", "cur", "sive", "ma",
+             "chine", "learn", "con", "trol", "sig", "nal", "cir", "cuit", "de", "sign"]
+
+
+def make_vocabulary(rng, size=6000):
+    # Words built from English-like syllables keep realistic letter frequencies
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_question(rng, vocabulary):
+    # Skewed pick so some topic words repeat across many questions
+    words = [rng.choice(COMMON_WORDS) for _ in range(rng.randint(2, 5))]
+    words += [vocabulary[int(len(vocabulary) * rng.random() ** 2)]
+              for _ in range(rng.randint(3, 12))]
+    rng.shuffle(words)
+    return " ".join(words).capitalize() + rng.choice(["?", ".", ""])
+
+def misspell(rng, word):
+    # One dropped, doubled or appended letter, e.g. "kirchhoffs" -> "kirchoffs", "law" -> "laws"
+    i = rng.randrange(len(word))
+    edit = rng.randint(0, 2)
+    if edit == 0 and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + word[i] + word[i:]
+    return word + "s"
+
+def make_variant(rng, question, vocabulary):
+    words = question.split()
+    edit = rng.randint(0, 5)
+    if edit == 0 and len(words) > 4:
+        del words[rng.randrange(len(words))]
+    elif edit == 1:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(COMMON_WORDS))
+    elif edit == 2:
+        words = [w.upper() if rng.random() < 0.3 else w for w in words]
+    elif edit == 3:
+        words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    elif edit == 4 and len(words) > 1:
+        # Split-token variant: two words run together ("data structure" -> "datastructure")
+        i = rng.randrange(len(words) - 1)
+        words[i:i + 2] = [words[i] + words[i + 1]]
+    else:
+        # Near-token variant: most words slightly misspelt, so few tokens are shared
+        words = [misspell(rng, w) if rng.random() < 0.7 else w for w in words]
+    return " ".join(words)
+
+def make_corpus(size, duplicate_ratio=0.3, seed=7):
+    """
+    Returns size (question, source) tuples where about duplicate_ratio of
+    them are edited copies of earlier questions.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    rng.shuffle(vocabulary)
+    corpus = []
+    for i in range(size):
+        if corpus and rng.random() < duplicate_ratio:
+            question = make_variant(rng, rng.choice(corpus)[0], vocabulary)
+        else:
+            question = make_question(rng, vocabulary)
+            if rng.random() < 0.1:
+                # Short questions such as "Kirchhoffs law", where one edited token decides the match
+                question = " ".join(question.split()[:2])
+        corpus.append((question, f"paper_{i // 40}.pdf"))
+    return corpus
+
+def dedup_linear(question_source_list):
+    """
+    The original first-match scan, kept here as the reference.
+    """
+    unique_qs = []
+    for question, source in question_source_list:
+        for uq in unique_qs:
+            if fuzz.token_set_ratio(question, uq['question']) >= SIMILARITY_THRESHOLD:
+                if source not in uq['sources']:
+                    uq['sources'].append(source)
+                uq['count'] += 1
+                break
+        else:
+            unique_qs.append({'question': question, 'sources': [source], 'count': 1})
+    return unique_qs
+
+def linear_seconds_sampled(question_source_list, unique_qs, samples):
+    """
+    Estimates how long dedup_linear takes without running it: times the
+    scan of samples evenly spaced questions over the unique questions the
+    linear loop holds when it reaches them, and scales the mean up. The
+    unique questions (first occurrences, in order) come from unique_qs,
+    which the indexed deduplication finds exactly.
+    """
+    first_seen = {}
+    for position, (question, _) in enumerate(question_source_list):
+        first_seen.setdefault(question, position)
+    firsts = sorted((first_seen[uq['question']], uq['question']) for uq in unique_qs)
+    size = len(question_source_list)
+    elapsed = 0.0
+    for sample in range(samples):
+        position = int((sample + 0.5) * size / samples)
+        question = question_source_list[position][0]
+        start = time.perf_counter()
+        for first, unique in firsts:
+            if first >= position or fuzz.token_set_ratio(question, unique) >= SIMILARITY_THRESHOLD:
+                break
+        elapsed += time.perf_counter() - start
+    return elapsed / samples * size
+
+def dedup_indexed(question_source_list):
+    """
+    main.py's deduplication; returns its unique questions and how many
+    pairs it scored with fuzz.
+    """
+    with metrics.collect() as recorder:
+        unique_qs = main.deduplicate_questions_with_source(question_source_list)
+    return unique_qs, recorder.counters.get("dedup_comparisons", 0)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Compare linear and indexed question deduplication.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Comma separated corpus sizes")
+    parser.add_argument("--linear-max", type=int, default=1000,
+                        help="Largest size the quadratic reference is run on; larger sizes estimate it")
+    parser.add_argument("--linear-samples", type=int, default=50,
+                        help="Questions timed to estimate the reference above --linear-max")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'unique':>8} {'indexed s':>10} {'scored':>10} {'linear s':>10} {'speedup':>8} match")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        corpus = make_corpus(size)
+        start = time.perf_counter()
+        indexed, comparisons = dedup_indexed(corpus)
+        indexed_time = time.perf_counter() - start
+
+        if size <= args.linear_max:
+            start = time.perf_counter()
+            linear = dedup_linear(corpus)
+            linear_time = time.perf_counter() - start
+            print(f"{size:>8} {len(indexed):>8} {indexed_time:>10.2f} {comparisons:>10} "
+                  f"{linear_time:>10.2f} {linear_time / indexed_time:>7.1f}x {indexed == linear}")
+        else:
+            # Estimated, so there is no result to compare
+            linear_time = linear_seconds_sampled(corpus, indexed, args.linear_samples)
+            print(f"{size:>8} {len(indexed):>8} {indexed_time:>10.2f} {comparisons:>10} "
+                  f"{'~' + format(linear_time, '.0f'):>10} {linear_time / indexed_time:>7.0f}x -")
+
+if __name__ == "__main__":
+    main_cli()
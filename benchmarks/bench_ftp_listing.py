@@ -0,0 +1,141 @@
+import io
+import os
+import sys
+import time
+import ftplib
+import logging
+import argparse
+import tempfile
+import threading
+import importlib.util
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import FTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from ftp_listing import join_ftp_path, safe_nlst
+
+
+class CountingFTP(ftplib.FTP):
+    """
+    FTP client that counts the commands (round-trips) it sends.
+    """
+    commands = 0
+
+    def putcmd(self, line):
+        self.commands += 1
+        super().putcmd(line)
+
+
+def load_script(file_name, module_name):
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def build_tree(tree_file, root, limit=None):
+    """
+    Recreates the directories and (empty) files listed in an ftp_tree.txt
+    under root. Returns the number of entries created.
+    """
+    count = 0
+    with open(tree_file, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if "── /" not in line:
+                continue
+            path = line.split("── ", 1)[1]
+            target = os.path.join(root, *[part for part in path.split("/") if part])
+            if path.endswith("/"):
+                os.makedirs(target, exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                open(target, "wb").close()
+            count += 1
+            if limit and count >= limit:
+                break
+    return count
+
+def start_server(root, handler_class=FTPHandler):
+    """
+    Serves root to anonymous users on a free local port, from a daemon
+    thread. Returns (server, port).
+    """
+    authorizer = DummyAuthorizer()
+    authorizer.add_anonymous(root)
+    handler = type("Handler", (handler_class,), {"authorizer": authorizer})
+    server = FTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.socket.getsockname()[1]
+
+def is_ftp_dir(ftp, path):
+    """
+    The original per-entry probe: PWD, CWD path, CWD back.
+    """
+    original = ftp.pwd()
+    try:
+        ftp.cwd(path)
+        ftp.cwd(original)
+        return True
+    except ftplib.error_perm:
+        return False
+
+def write_tree_probing(ftp, remote_dir, prefix, out_file):
+    """
+    The original tree writer: NLST per directory plus a CWD probe per entry.
+    """
+    items = [item for item in safe_nlst(ftp, remote_dir) if item not in ['.', '..'] and item != '']
+    items.sort()
+    for index, item in enumerate(items):
+        full_path = join_ftp_path(remote_dir, item)
+        is_dir = is_ftp_dir(ftp, full_path)
+        connector = "└── " if index == len(items) - 1 else "├── "
+        out_file.write(prefix + connector + full_path + ("/" if is_dir else "") + "\n")
+        if is_dir:
+            new_prefix = prefix + ("    " if index == len(items) - 1 else "│   ")
+            write_tree_probing(ftp, full_path, new_prefix, out_file)
+
+def run(port, variant, tree_module):
+    ftp = CountingFTP()
+    ftp.connect("127.0.0.1", port)
+    ftp.encoding = "latin-1"
+    ftp.login()
+    if variant == "LIST":
+        ftp._paperiq_mlsd = False
+    ftp.commands = 0
+    out = io.StringIO()
+    start = time.perf_counter()
+    if variant == "NLST+CWD":
+        write_tree_probing(ftp, "/", "", out)
+    else:
+        tree_module.write_tree(ftp, "/", "", out)
+    elapsed = time.perf_counter() - start
+    commands = ftp.commands
+    ftp.quit()
+    return commands, elapsed, out.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Count FTP round-trips needed to crawl a tree.")
+    parser.add_argument("--tree", default=os.path.join(ROOT, "ftp_tree.txt"),
+                        help="ftp_tree.txt whose structure the local server serves")
+    parser.add_argument("--limit", type=int, help="Only recreate the first N entries")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("pyftpdlib").setLevel(logging.WARNING)
+    tree_module = load_script("folder_structure(ftp).py", "folder_structure_ftp")
+    with tempfile.TemporaryDirectory() as root:
+        entries = build_tree(args.tree, root, args.limit)
+        server, port = start_server(root)
+        print(f"Serving {entries} entries")
+        print(f"{'variant':>10} {'commands':>9} {'seconds':>8}")
+        outputs = {}
+        for variant in ["NLST+CWD", "MLSD", "LIST"]:
+            commands, elapsed, outputs[variant] = run(port, variant, tree_module)
+            print(f"{variant:>10} {commands:>9} {elapsed:>8.2f}")
+        server.close_all()
+        print("Same tree text:", len(set(outputs.values())) == 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+import main
+import metrics
+import page_triage
+from corpus import TRUTH_FILE, generate
+from bench_pipeline import KINDS, expected_questions, normalize, pdf_kind
+
+MODES = ["legacy", "triage", "triage+preprocess"]
+LEGACY_MIN_CHARS = 20  # The old rule OCR'd a whole page whose text layer had fewer characters than this
+
+
+def legacy_decision(text):
+    """
+    The routing before page_triage: the whole page at OCR_DPI when its text
+    layer is (nearly) empty, the text layer otherwise.
+    """
+    if not text or len(text.strip()) < LEGACY_MIN_CHARS:
+        return page_triage.Triage("ocr", main.OCR_DPI, None, {})
+    return page_triage.Triage("text", None, None, {})
+
+def extract_pages(pdf_path, mode):
+    """
+    The pages of one PDF the way main.extract_pages_from_pdf puts them
+    together, OCR'd by main.ocr_image. Pages are rendered by pdfplumber
+    (pypdfium2) one at a time, so this runs without poppler; rendering is
+    not part of the OCR time.
+    """
+    import pdfplumber
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for number, page in enumerate(pdf.pages, 1):
+            text = page.extract_text()
+            if mode == "legacy":
+                decision = legacy_decision(text)
+            else:
+                decision = page_triage.classify_page(page, text, main.OCR_DPI, main.OCR_MIN_DPI)
+            if decision.route == "text":
+                pages.append({"page": number, "text": text, "ocr": False})
+                continue
+            with metrics.timer("render"):
+                image = page.to_image(resolution=decision.dpi).original
+            ocr_text = main.ocr_image(image, decision, decision.dpi)
+            if decision.route == "hybrid":
+                ocr_text = text + "\n" + ocr_text
+            pages.append({"page": number, "text": ocr_text, "ocr": True})
+    return pages
+
+def run_mode(corpus_dir, truth, mode):
+    """
+    Extraction recall by kind of paper, and the time spent per OCR'd page
+    in Tesseract and in preprocessing, for one routing mode.
+    """
+    main.OCR_PREPROCESS = mode == "triage+preprocess"
+    found = {kind: 0 for kind in KINDS}
+    expected_total = {kind: 0 for kind in KINDS}
+    ocr_pages = 0
+    with metrics.collect() as recorder:
+        for relative, pdf_truth in sorted(truth["pdfs"].items()):
+            pages = extract_pages(os.path.join(corpus_dir, relative), mode)
+            ocr_pages += sum(page["ocr"] for page in pages)
+            questions = main.extract_questions(main.join_pages(pages))
+            expected = expected_questions(pdf_truth)
+            kind = pdf_kind(pdf_truth)
+            expected_total[kind] += len(expected)
+            found[kind] += len(expected.keys() & {normalize(question) for question in questions})
+    timings = recorder.summary()["timings"]
+    per_page = lambda name: timings.get(name, {}).get("seconds", 0.0) / ocr_pages * 1000 if ocr_pages else None
+    return {
+        "ocr_pages": ocr_pages,
+        "tesseract_ms_per_page": per_page("ocr"),
+        "preprocess_ms_per_page": per_page("ocr_preprocess"),
+        "render_ms_per_page": per_page("render"),
+        "recall": sum(found.values()) / sum(expected_total.values()) if sum(expected_total.values()) else None,
+        "recall_by_kind": {kind: found[kind] / expected_total[kind] for kind in KINDS if expected_total[kind]}
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description="Compare OCR routing: the old 20-character rule, page triage, and triage with preprocessing.")
+    parser.add_argument("--corpus", help="Existing corpus directory (generated into a temp dir if omitted)")
+    parser.add_argument("--subjects", type=int, default=2)
+    parser.add_argument("--papers", type=int, default=3)
+    parser.add_argument("--scanned-ratio", type=float, default=0.4)
+    parser.add_argument("--hybrid-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma separated modes to run")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {"ocr_backend": main.ocr.backend_name(main.OCR_BACKEND, main.TESSERACT_CONFIG)}
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = args.corpus or os.path.join(work_dir, "corpus")
+        if not args.corpus:
+            generate(corpus_dir, subjects=args.subjects, papers=args.papers, scanned_ratio=args.scanned_ratio,
+                     seed=args.seed, hybrid_ratio=args.hybrid_ratio)
+        with open(os.path.join(corpus_dir, TRUTH_FILE), encoding="utf-8") as f:
+            truth = json.load(f)
+        print(f"{'mode':>18} {'OCR pages':>10} {'tesseract ms':>13} {'preprocess ms':>14} {'recall':>7}  by kind")
+        for mode in args.modes.split(","):
+            results[mode] = result = run_mode(corpus_dir, truth, mode)
+            by_kind = ", ".join(f"{kind} {recall:.3f}" for kind, recall in result["recall_by_kind"].items())
+            print(f"{mode:>18} {result['ocr_pages']:>10} {result['tesseract_ms_per_page'] or 0:>13.1f} "
+                  f"{result['preprocess_ms_per_page'] or 0:>14.1f} {result['recall']:>7.3f}  {by_kind}")
+    print(f"OCR backend: {results['ocr_backend']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+if __name__ == "__main__":
+    main_cli()
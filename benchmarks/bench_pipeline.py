@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import resource
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from itertools import combinations
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+import main
+import metrics
+import page_triage
+from corpus import TRUTH_FILE, generate
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+HEADLINE = ["text_pages_per_second", "scanned_pages_per_second", "questions_per_second",
+            "dedup_questions_per_second", "extraction_recall", "dedup_precision", "dedup_recall", "triage_accuracy",
+            "peak_rss_mib"]
+KINDS = ["text", "scanned", "hybrid"]
+EXPECTED_ROUTES = {"text": "text", "scanned": "ocr", "hybrid": "hybrid"}  # page_triage route each corpus kind needs
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+def peak_rss_mib():
+    """
+    Peak RSS of this process and of its finished children (poppler, tesseract), in MiB.
+    """
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def expected_questions(pdf_truth):
+    """
+    {normalized question text: cluster} for the units extract_questions
+    should return for one paper: each question and each "(a) ..." subquestion.
+    """
+    expected = {}
+    for question in pdf_truth["questions"]:
+        expected[normalize(question["text"])] = question["cluster"]
+        for marker, sub in zip("abcdefgh", question["subquestions"]):
+            expected[normalize(f"({marker}) {sub['text']}")] = sub["cluster"]
+    return expected
+
+def pair_scores(groups, clusters):
+    """
+    Pairwise precision and recall of a clustering: groups maps each item
+    to its predicted group, clusters to its true cluster.
+    """
+    true_positive = predicted = actual = 0
+    for a, b in combinations(sorted(groups), 2):
+        same_group = groups[a] == groups[b]
+        same_cluster = clusters[a] == clusters[b]
+        predicted += same_group
+        actual += same_cluster
+        true_positive += same_group and same_cluster
+    return (true_positive / predicted if predicted else 1.0,
+            true_positive / actual if actual else 1.0)
+
+def pdf_kind(pdf_truth):
+    # Corpora generated before hybrid papers existed only say whether a PDF is scanned
+    return pdf_truth.get("kind", "scanned" if pdf_truth["scanned"] else "text")
+
+def triage_scores(corpus_dir, truth):
+    """
+    Routes page_triage.classify_page picks for every page of the corpus,
+    scored against the route each kind of paper needs. Returns (accuracy,
+    accuracy of the old "fewer than 20 characters" rule, {kind: {route:
+    pages}}, milliseconds per page).
+    """
+    import pdfplumber
+    routes = {kind: defaultdict(int) for kind in KINDS}
+    seconds = 0.0
+    legacy_correct = 0
+    for relative, pdf_truth in sorted(truth["pdfs"].items()):
+        with pdfplumber.open(os.path.join(corpus_dir, relative)) as pdf:
+            for page in pdf.pages:
+                text = page.extract_text()
+                start = time.perf_counter()
+                decision = page_triage.classify_page(page, text, main.OCR_DPI, main.OCR_MIN_DPI)
+                seconds += time.perf_counter() - start
+                routes[pdf_kind(pdf_truth)][decision.route] += 1
+                legacy_route = "ocr" if not text or len(text.strip()) < 20 else "text"
+                legacy_correct += legacy_route == EXPECTED_ROUTES[pdf_kind(pdf_truth)]
+    total = sum(sum(kind_routes.values()) for kind_routes in routes.values())
+    correct = sum(routes[kind].get(EXPECTED_ROUTES[kind], 0) for kind in KINDS)
+    return (correct / total if total else None, legacy_correct / total if total else None, {kind: dict(routes[kind]) for kind in KINDS if routes[kind]},
+            seconds / total * 1000 if total else None)
+
+def run_benchmark(corpus_dir, output_dir):
+    """
+    Runs the main.py stages over every PDF of the corpus, one at a time in
+    this process and without the extraction cache, and scores the
+    extraction and dedup against the corpus truth.
+    """
+    with open(os.path.join(corpus_dir, TRUTH_FILE), encoding="utf-8") as f:
+        truth = json.load(f)
+    main.USE_CACHE = False
+    main.OUTPUT_JSON_DIR = output_dir
+
+    pages = {kind: 0 for kind in KINDS}
+    seconds = {kind: 0.0 for kind in KINDS}
+    found = {kind: 0 for kind in KINDS}
+    expected_total = {kind: 0 for kind in KINDS}
+    errors = 0
+    subjects = defaultdict(list)
+    clusters = {}
+    started = time.perf_counter()
+    with metrics.collect() as recorder:
+        for relative, pdf_truth in sorted(truth["pdfs"].items()):
+            kind = pdf_kind(pdf_truth)
+            start = time.perf_counter()
+            with metrics.timer("extract_pages"):
+                pdf_pages, complete = main.extract_pages_from_pdf(os.path.join(corpus_dir, relative))
+            seconds[kind] += time.perf_counter() - start
+            pages[kind] += len(pdf_pages)
+            errors += not complete
+            questions = main.extract_questions(main.join_pages(pdf_pages))
+
+            expected = expected_questions(pdf_truth)
+            expected_total[kind] += len(expected)
+            found[kind] += len(expected.keys() & {normalize(question) for question in questions})
+            for position, question in enumerate(questions):
+                # Each instance is its own "source", so the sources of a
+                # unique question list exactly the instances merged into it
+                instance = f"{relative}#{position}"
+                clusters[instance] = expected.get(normalize(question))
+                subjects[tuple(pdf_truth["subject"])].append((question, instance))
+
+        groups = {}
+        dedup_seconds = 0.0
+        dedup_questions = 0
+        for key, question_source_list in subjects.items():
+            start = time.perf_counter()
+            unique_questions = main.deduplicate_questions_with_source(question_source_list)
+            dedup_seconds += time.perf_counter() - start
+            dedup_questions += len(question_source_list)
+            for group, unique in enumerate(unique_questions):
+                for instance in unique["sources"]:
+                    groups[instance] = (key, group)
+            main.save_to_json(*key, unique_questions)
+    elapsed = time.perf_counter() - started
+
+    # Score dedup only on instances the extraction got exactly right
+    scored = {instance: group for instance, group in groups.items() if clusters[instance] is not None}
+    precision, recall = pair_scores(scored, {instance: clusters[instance] for instance in scored})
+    summary = recorder.summary()
+    triage_accuracy, legacy_accuracy, routes, triage_ms = triage_scores(corpus_dir, truth)
+    extract_questions_seconds = summary["timings"].get("extract_questions", {}).get("seconds", 0.0)
+    own_rss, child_rss = peak_rss_mib()
+    return {
+        "pdfs": len(truth["pdfs"]),
+        "pages": pages,
+        "extraction_errors": errors,
+        "seconds": elapsed,
+        "text_pages_per_second": pages["text"] / seconds["text"] if seconds["text"] else None,
+        "scanned_pages_per_second": pages["scanned"] / seconds["scanned"] if seconds["scanned"] else None,
+        "questions_per_second": (len(clusters) / extract_questions_seconds
+                                 if extract_questions_seconds else None),
+        "dedup_questions_per_second": dedup_questions / dedup_seconds if dedup_seconds else None,
+        "extraction_recall": (sum(found.values()) / sum(expected_total.values())
+                              if sum(expected_total.values()) else None),
+        "extraction_recall_by_kind": {kind: found[kind] / expected_total[kind] if expected_total[kind] else None
+                                      for kind in found},
+        # Over every page of the PDFs, including pages whose OCR failed
+        "seconds_per_page_by_kind": {kind: seconds[kind] / sum(routes[kind].values()) for kind in routes},
+        "triage_accuracy": triage_accuracy,
+        "legacy_triage_accuracy": legacy_accuracy,
+        "triage_routes_by_kind": routes,
+        "triage_ms_per_page": triage_ms,
+        "dedup_precision": precision,
+        "dedup_recall": recall,
+        "dedup_scored_questions": len(scored),
+        "peak_rss_mib": own_rss,
+        "peak_child_rss_mib": child_rss,
+        "metrics": summary
+    }
+
+def print_results(results, previous=None):
+    print(f"{'metric':>28} {'value':>12}" + (f" {'previous':>12} {'change':>8}" if previous else ""))
+    for name in HEADLINE:
+        value = results.get(name)
+        line = f"{name:>28} {value if value is not None else float('nan'):>12.3f}"
+        if previous:
+            old = previous.get("results", previous).get(name)
+            if old is not None and value is not None:
+                change = f"{(value - old) / old * 100:+.1f}%" if old else ""
+                line += f" {old:>12.3f} {change:>8}"
+        print(line)
+    print(f"{'extraction_errors':>28} {results['extraction_errors']:>12}")
+    print(f"{'legacy_triage_accuracy':>28} {results['legacy_triage_accuracy']:>12.3f}")
+    print(f"{'triage_ms_per_page':>28} {results['triage_ms_per_page']:>12.3f}")
+    for kind in KINDS:
+        recall = results["extraction_recall_by_kind"].get(kind)
+        per_page = results["seconds_per_page_by_kind"].get(kind)
+        if recall is not None:
+            print(f"{kind + ' recall':>28} {recall:>12.3f}   {per_page:.3f} s/page, "
+                  f"routes {results['triage_routes_by_kind'].get(kind, {})}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the main.py stages on a synthetic corpus.")
+    parser.add_argument("--corpus", help="Existing corpus directory (generated into a temp dir if omitted)")
+    parser.add_argument("--subjects", type=int, default=4)
+    parser.add_argument("--papers", type=int, default=4)
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--max-subquestions", type=int, default=3)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.4)
+    parser.add_argument("--scanned-ratio", type=float, default=0.25)
+    parser.add_argument("--hybrid-ratio", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    corpus_params = {"subjects": args.subjects, "papers": args.papers, "questions": args.questions,
+                     "max_subquestions": args.max_subquestions, "duplicate_ratio": args.duplicate_ratio,
+                     "scanned_ratio": args.scanned_ratio, "seed": args.seed, "hybrid_ratio": args.hybrid_ratio}
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = args.corpus or os.path.join(work_dir, "corpus")
+        if not args.corpus:
+            generate(corpus_dir, **corpus_params)
+        results = run_benchmark(corpus_dir, os.path.join(work_dir, "json"))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "ocr_backend": main.ocr.backend_name(main.OCR_BACKEND, main.TESSERACT_CONFIG),
+        "corpus": args.corpus or corpus_params,
+        "results": results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_mib():
+    """
+    Peak RSS of this process and of its finished children (poppler), in MiB.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return own / scale, children / scale
+
+def render_per_page(pdf_path, dpi):
+    """
+    The original approach: one convert_from_path call per scanned page.
+    """
+    pages = pdfinfo_from_path(pdf_path)["Pages"]
+    for page_number in range(1, pages + 1):
+        for img in convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number):
+            img.load()
+
+def render_batched(pdf_path, dpi):
+    """
+    The batched approach used by main.ocr_pages.
+    """
+    import main
+    pages = pdfinfo_from_path(pdf_path)["Pages"]
+    for first_page, last_page in main.low_text_page_batches(range(1, pages + 1)):
+        for img in convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page):
+            img.load()
+
+def run_variant(variant, pdf_path, dpi):
+    start = time.perf_counter()
+    if variant == "per-page":
+        render_per_page(pdf_path, dpi)
+    else:
+        render_batched(pdf_path, dpi)
+    elapsed = time.perf_counter() - start
+    own, children = peak_rss_mib()
+    print(json.dumps({"variant": variant, "seconds": elapsed,
+                      "peak_rss_mib": own, "peak_child_rss_mib": children}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Time rendering every page of a scanned PDF for OCR.")
+    parser.add_argument("pdf", help="Scanned question paper, e.g. a 12-page one")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--variant", choices=["per-page", "batched"],
+                        help="Run one variant in this process (used internally)")
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.pdf, args.dpi)
+        return
+
+    # Each variant runs in a fresh interpreter so peak RSS is not shared
+    print(f"{'variant':>10} {'seconds':>8} {'python MiB':>11} {'poppler MiB':>12}")
+    for variant in ["per-page", "batched"]:
+        output = subprocess.run([sys.executable, __file__, args.pdf, "--dpi", str(args.dpi),
+                                 "--variant", variant], capture_output=True, text=True, check=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{variant:>10} {result['seconds']:>8.2f} {result['peak_rss_mib']:>11.1f} "
+              f"{result['peak_child_rss_mib']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
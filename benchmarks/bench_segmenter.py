@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import segmenter
+from corpus import make_subject, paper_lines
+
+
+def legacy_extract_subquestions(question_block):
+    subpattern = r'(?m)^\s*\(([a-zivx]+)\)'
+    parts = re.split(subpattern, question_block)
+    if len(parts) <= 1:
+        return [question_block.strip()]
+    subquestions = []
+    header = parts[0].strip()
+    for i in range(1, len(parts), 2):
+        marker = parts[i].strip()
+        content = parts[i+1].strip() if (i+1) < len(parts) else ""
+        subquestions.append(f"({marker}) {content}")
+    if header:
+        subquestions.insert(0, header)
+    return subquestions
+
+def legacy_extract_questions(text):
+    """
+    The original findall/split chain, kept here as the reference.
+    """
+    pattern = r'(?sm)^\s*\d+\.\s*(.*?)(?=^\s*\d+\.\s*|\Z)'
+    all_questions = []
+    for block in re.findall(pattern, text):
+        all_questions.extend(legacy_extract_subquestions(block))
+    return all_questions
+
+def segment_questions(text):
+    return [segmenter.question_text(segment) for segment in segmenter.iter_segments(text)]
+
+def make_text(megabytes, style="dot", seed=13):
+    """
+    Paper text from the benchmark corpus generator, concatenated to about
+    megabytes MB. style "q" renumbers the questions as "Q1" the way many
+    scanned papers do; the legacy functions find nothing in those.
+    """
+    rng = random.Random(seed)
+    papers = []
+    size = 0
+    subject_index = 0
+    while size < megabytes * 1024 * 1024:
+        for paper in make_subject(rng, subject_index, 4, 8, 3, 0.4):
+            text = "\n".join(paper_lines(f"SUBJECT {subject_index + 1}", paper)) + "\n"
+            if style == "q":
+                text = re.sub(r"(?m)^(\d+)\. ", r"Q\1 ", text)
+            papers.append(text)
+            size += len(text)
+        subject_index += 1
+    return "".join(papers)
+
+def make_ocr_text(megabytes, seed=13):
+    """
+    One question followed by long unnumbered OCR noise: the case where the
+    lazy DOTALL match re-checks its lookahead at every character.
+    """
+    rng = random.Random(seed)
+    words = ["the", "circuit", "shown", "in", "fig", "marks", "|", "~", "..", "(0", "1O", "ll"]
+    lines = ["1. Explain the working of the circuit shown."]
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(3, 14)))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+def throughput(func, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(text.encode("utf-8")) / (1024 * 1024) / best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the question segmenter with the legacy regex chain.")
+    parser.add_argument("--megabytes", type=float, default=8, help="Size of each test text")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    texts = [("corpus, 1. style", make_text(args.megabytes)),
+             ("corpus, Q1 style", make_text(args.megabytes, style="q")),
+             ("OCR noise", make_ocr_text(args.megabytes))]
+    print(f"{'text':>18} {'legacy MB/s':>12} {'segmenter MB/s':>15} {'speedup':>8} "
+          f"{'legacy qs':>10} {'segmenter qs':>13} same")
+    for name, text in texts:
+        legacy_rate, legacy = throughput(legacy_extract_questions, text, args.repeat)
+        rate, segmented = throughput(segment_questions, text, args.repeat)
+        print(f"{name:>18} {legacy_rate:>12.1f} {rate:>15.1f} {rate / legacy_rate:>7.1f}x "
+              f"{len(legacy):>10} {len(segmented):>13} {legacy == segmented}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+from paperiq import COMMANDS
+
+TARGET_MS = 200                 # Cold start budget of the light commands
+HEAVY_COMMANDS = {"extract"}    # Needs the PDF stack by nature; reported, not held to the budget
+
+
+def cold_start_ms(args, cwd, runs):
+    """
+    Wall time of running paperiq.py with args in a fresh interpreter,
+    in milliseconds, for each of runs runs.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "paperiq.py")] + args, cwd=cwd,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+def slowest_imports(args, cwd, limit=10):
+    """
+    The modules with the largest cumulative import time (python -X importtime).
+    """
+    output = subprocess.run([sys.executable, "-X", "importtime", os.path.join(ROOT, "paperiq.py")] + args,
+                            cwd=cwd, capture_output=True, text=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                imports.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(imports, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start of every paperiq command.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--imports", action="store_true", help="Also list each command's slowest imports")
+    args = parser.parse_args()
+
+    baseline = None
+    over_budget = []
+    # Run outside the repository so nothing (logs, caches) is written into it
+    with tempfile.TemporaryDirectory() as cwd:
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline = (time.perf_counter() - start) * 1000 / args.runs
+        print(f"{'command':>10} {'median ms':>10} {'min ms':>8}  (bare interpreter {baseline:.0f} ms, "
+              f"target {TARGET_MS} ms)")
+        for command in COMMANDS:
+            times = cold_start_ms([command, "--help"], cwd, args.runs)
+            median = statistics.median(times)
+            heavy = command in HEAVY_COMMANDS
+            flag = "" if heavy or median <= TARGET_MS else "  over target"
+            if flag:
+                over_budget.append(command)
+            print(f"{command:>10} {median:>10.0f} {min(times):>8.0f}{'  (heavy)' if heavy else ''}{flag}")
+            if args.imports:
+                for seconds, name in slowest_imports([command, "--help"], cwd):
+                    print(f"{'':>12}{seconds:>8.1f} ms  {name.strip()}")
+    if over_budget:
+        sys.exit(f"Over the {TARGET_MS} ms target: {', '.join(over_budget)}")
+
+if __name__ == "__main__":
+    main()
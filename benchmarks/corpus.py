@@ -0,0 +1,269 @@
+import os
+import json
+import random
+import argparse
+import textwrap
+import time
+import zlib
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+TRUTH_FILE = "truth.json"
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+FONT_SIZE = 11
+LINE_HEIGHT = 15
+MARGIN = 50
+WRAP_COLUMNS = 85
+SCAN_DPI = 150
+STAMP = "Downloaded from the RCOEM question paper archive"  # Text-layer header of hybrid papers
+FIXED_DATE = time.gmtime(1704067200)  # PDF dates of the scans, so reruns are byte-identical
+
+TOPICS = ["stack", "queue", "binary tree", "hash table", "graph", "heap", "linked list", "sorting",
+          "recursion", "dynamic programming", "deadlock", "paging", "virtual memory", "scheduling",
+          "normalization", "transaction", "indexing", "transformer", "amplifier", "rectifier",
+          "oscillator", "flip flop", "multiplexer", "fourier series", "laplace transform",
+          "eigen values", "beam deflection", "bending moment", "heat transfer", "entropy",
+          "turbine", "compressor", "fluid statics", "bernoulli theorem", "pipe flow", "concrete mix"]
+VERBS = ["Explain", "Describe", "Define", "Discuss", "Derive", "Compare", "Illustrate", "Write short notes on",
+         "State and prove", "Differentiate between"]
+DETAILS = ["with a neat diagram", "with a suitable example", "in detail", "and list its applications",
+           "and state its advantages", "and its limitations", "using an algorithm", "with the help of a sketch",
+           "for a practical system", "and compare it with the alternatives"]
+ASPECTS = ["time complexity", "memory layout", "failure modes", "design constraints", "boundary conditions",
+           "working principle", "governing equations", "error analysis", "hardware implementation",
+           "performance under load", "stability criteria", "sign conventions", "practical limitations",
+           "initialization steps", "energy losses", "worst case behaviour", "cost estimation",
+           "safety factors", "testing procedure", "historical development", "numerical example",
+           "frequency response", "storage requirements", "concurrency issues", "material selection"]
+FILLERS = ["clearly", "briefly", "also", "properly"]
+
+
+def make_question(rng):
+    topic = rng.choice(TOPICS)
+    aspects = rng.sample(ASPECTS, rng.randint(1, 2))
+    return f"{rng.choice(VERBS)} the {' and '.join(aspects)} of {topic} {rng.choice(DETAILS)}."
+
+def make_variant(rng, text):
+    """
+    A near-duplicate of text as it reappears in another paper: a word
+    dropped, a filler word added, or the wording re-cased.
+    """
+    words = text.rstrip(".").split()
+    edit = rng.randint(0, 2)
+    if edit == 0 and len(words) > 6:
+        del words[rng.randrange(1, len(words))]
+    elif edit == 1:
+        words.insert(rng.randrange(1, len(words) + 1), rng.choice(FILLERS))
+    else:
+        words = [word.upper() if rng.random() < 0.3 else word for word in words]
+    return " ".join(words) + "."
+
+def make_subject(rng, subject_index, papers, questions, max_subquestions, duplicate_ratio):
+    """
+    Returns the papers of one subject, each a list of questions
+    {"text", "cluster", "subquestions": [{"text", "cluster"}]}. About
+    duplicate_ratio of the questions of each paper after the first repeat
+    (as near-duplicates) a question asked in an earlier paper.
+    Clusters are the ids of the original question each text derives from.
+    """
+    pool = []
+    result = []
+    for paper_index in range(papers):
+        paper = []
+        for question_index in range(questions):
+            if pool and rng.random() < duplicate_ratio:
+                original = rng.choice(pool)
+                question = {
+                    "text": make_variant(rng, original["text"]),
+                    "cluster": original["cluster"],
+                    "subquestions": [{"text": make_variant(rng, sub["text"]), "cluster": sub["cluster"]}
+                                     for sub in original["subquestions"]]
+                }
+            else:
+                cluster = f"s{subject_index}p{paper_index}q{question_index}"
+                question = {
+                    "text": make_question(rng),
+                    "cluster": cluster,
+                    "subquestions": [{"text": make_question(rng), "cluster": f"{cluster}{chr(97 + n)}"}
+                                     for n in range(rng.randint(0, max_subquestions))]
+                }
+                pool.append(question)
+            paper.append(question)
+        result.append(paper)
+    return result
+
+def paper_lines(subject, paper):
+    """
+    The text lines of one paper laid out the way the extraction expects:
+    "1. question" with "(a) subquestion" lines under it.
+    """
+    lines = [f"Examination paper: {subject}", "Time: 3 hours    Max marks: 80", ""]
+    for number, question in enumerate(paper, 1):
+        lines += textwrap.wrap(f"{number}. {question['text']}", WRAP_COLUMNS)
+        for marker, sub in zip("abcdefgh", question["subquestions"]):
+            lines += textwrap.wrap(f"({marker}) {sub['text']}", WRAP_COLUMNS, subsequent_indent="    ")
+        lines.append("")
+    return lines
+
+def paginate(lines):
+    per_page = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+    return [lines[start:start + per_page] for start in range(0, len(lines), per_page)] or [[]]
+
+def pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_text_pdf(path, lines):
+    """
+    Writes a minimal PDF with a Helvetica text layer (no extra dependency).
+    """
+    pages = paginate(lines)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for page in pages:
+        stream = [f"BT /F1 {FONT_SIZE} Tf {LINE_HEIGHT} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td"]
+        stream += [f"({pdf_escape(line)}) Tj T*" for line in page]
+        stream.append("ET")
+        content = "\n".join(stream).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+                        "/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))).encode())
+        page_ids.append(len(objects))
+    write_pdf(path, objects, page_ids)
+
+def write_pdf(path, objects, page_ids):
+    """
+    Serializes objects (object 2, the page tree, is filled in from page_ids)
+    with a cross-reference table.
+    """
+    objects[1] = ("<< /Type /Pages /Kids [%s] /Count %d >>"
+                  % (" ".join(f"{n} 0 R" for n in page_ids), len(page_ids))).encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def scan_pages(lines, rng, dpi=SCAN_DPI):
+    """
+    The pages of the layout as a scanner sees them: the text drawn into
+    grayscale page images with slight skew and noise.
+    """
+    scale = dpi / 72
+    font = ImageFont.load_default(size=int(FONT_SIZE * scale))
+    images = []
+    for page in paginate(lines):
+        img = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 255)
+        draw = ImageDraw.Draw(img)
+        for row, line in enumerate(page):
+            draw.text((MARGIN * scale, (MARGIN + row * LINE_HEIGHT) * scale), line, fill=0, font=font)
+        img = img.rotate(rng.uniform(-1.5, 1.5), fillcolor=255, resample=Image.BILINEAR)
+        # Noise from the corpus rng (not effect_noise) keeps the scans reproducible
+        noise = Image.frombytes("L", img.size, rng.randbytes(img.size[0] * img.size[1]))
+        img = Image.blend(img, noise, 0.08).filter(ImageFilter.GaussianBlur(0.4))
+        images.append(img)
+    return images
+
+def write_scanned_pdf(path, lines, rng, dpi=SCAN_DPI):
+    """
+    Writes an image-only PDF of the same layout, as a scanner would.
+    """
+    images = scan_pages(lines, rng, dpi)
+    images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:],
+                   creationDate=FIXED_DATE, modDate=FIXED_DATE)
+
+def write_hybrid_pdf(path, lines, rng, dpi=SCAN_DPI):
+    """
+    Writes a scanned PDF whose pages also carry a one-line text layer above
+    the scan, like an archive's download stamp: enough text to pass for a
+    text page, none of it the questions.
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for img in scan_pages(lines, rng, dpi):
+        data = zlib.compress(img.tobytes())
+        objects.append(b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                       b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream"
+                       % (img.size[0], img.size[1], len(data), data))
+        content = (f"q {PAGE_WIDTH} 0 0 {PAGE_HEIGHT} 0 0 cm /Im0 Do Q "
+                   f"BT /F1 8 Tf {MARGIN} {PAGE_HEIGHT - MARGIN // 2} Td ({pdf_escape(STAMP)}) Tj ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> "
+                        "/XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                        % (PAGE_WIDTH, PAGE_HEIGHT, len(objects) - 1, len(objects))).encode())
+        page_ids.append(len(objects))
+    write_pdf(path, objects, page_ids)
+
+def generate(out_dir, subjects=4, papers=4, questions=8, max_subquestions=3, duplicate_ratio=0.4,
+             scanned_ratio=0.25, seed=13, hybrid_ratio=0.0):
+    """
+    Writes a reproducible corpus to out_dir in the sorted_pdfs layout
+    (Department/Branch/Semester/Subject/Subject_Paper.pdf) with a
+    sorted_pdfs.csv and a truth.json holding, per PDF, its kind ("text",
+    "scanned" or, for about hybrid_ratio of the unscanned ones, "hybrid":
+    scanned with a stamped text header), whether it is scanned and the
+    cluster of every question and subquestion.
+    Returns the truth dict.
+    """
+    rng = random.Random(seed)
+    truth = {"seed": seed, "pdfs": {}}
+    rows = []
+    for subject_index in range(subjects):
+        subject = f"SUBJECT {subject_index + 1}"
+        key = ("B. E", "BENCHMARK", "FOURTH SEM", subject)
+        subject_dir = os.path.join(out_dir, *key)
+        os.makedirs(subject_dir, exist_ok=True)
+        for paper_index, paper in enumerate(make_subject(rng, subject_index, papers, questions,
+                                                         max_subquestions, duplicate_ratio)):
+            relative = os.path.join(*key, f"{subject}_PAPER-{paper_index + 1}.pdf")
+            scanned = rng.random() < scanned_ratio
+            # Only drawn when asked for, so corpora without hybrids stay as they were
+            hybrid = not scanned and hybrid_ratio > 0 and rng.random() < hybrid_ratio
+            lines = paper_lines(subject, paper)
+            if scanned:
+                write_scanned_pdf(os.path.join(out_dir, relative), lines, rng)
+            elif hybrid:
+                write_hybrid_pdf(os.path.join(out_dir, relative), lines, rng)
+            else:
+                write_text_pdf(os.path.join(out_dir, relative), lines)
+            kind = "scanned" if scanned else "hybrid" if hybrid else "text"
+            truth["pdfs"][relative] = {"subject": list(key), "kind": kind, "scanned": scanned or hybrid,
+                                       "questions": paper}
+            rows.append(list(key) + [relative])
+
+    with open(os.path.join(out_dir, TRUTH_FILE), "w", encoding="utf-8") as f:
+        json.dump(truth, f, indent=1)
+    with open(os.path.join(out_dir, "sorted_pdfs.csv"), "w", encoding="utf-8") as f:
+        f.write("Department,Branch,Semester,Subject,FullPath\n")
+        f.writelines(",".join(f'"{value}"' for value in row) + "\n" for row in rows)
+    return truth
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic question-paper corpus.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--subjects", type=int, default=4)
+    parser.add_argument("--papers", type=int, default=4, help="Papers per subject")
+    parser.add_argument("--questions", type=int, default=8, help="Questions per paper")
+    parser.add_argument("--max-subquestions", type=int, default=3)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.4,
+                        help="Share of questions repeated (as near-duplicates) from earlier papers")
+    parser.add_argument("--scanned-ratio", type=float, default=0.25, help="Share of image-only PDFs")
+    parser.add_argument("--hybrid-ratio", type=float, default=0.0,
+                        help="Share of the other PDFs that are scans with a stamped text header")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+    truth = generate(args.out_dir, args.subjects, args.papers, args.questions, args.max_subquestions,
+                     args.duplicate_ratio, args.scanned_ratio, args.seed, args.hybrid_ratio)
+    scanned = sum(1 for pdf in truth["pdfs"].values() if pdf["kind"] == "scanned")
+    hybrid = sum(1 for pdf in truth["pdfs"].values() if pdf["kind"] == "hybrid")
+    print(f"Wrote {len(truth['pdfs'])} PDFs ({scanned} scanned, {hybrid} hybrid) to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
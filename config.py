@@ -0,0 +1,47 @@
+import os
+import configparser
+
+# The settings file every script reads; PAPERIQ_CONFIG (or paperiq --config) points elsewhere.
+CONFIG_PATH = os.environ.get("PAPERIQ_CONFIG", "paperiq.ini")
+
+# Used for whatever the settings file leaves out (or when there is none)
+DEFAULTS = {
+    "ftp": {
+        "server": "172.16.191.17",
+        "port": "21",
+        "encoding": "latin-1",
+    },
+    "paths": {
+        "download_root": "RCOEM",                      # FTP tree mirrored by fetcher.py
+        "ftp_tree": "ftp_tree.txt",                    # Written by folder_structure(ftp).py
+        "papers_csv": "sorted_question_papers.csv",    # Written by PDF_SORTER-CSV.py
+        "sorted_root": "sorted_pdfs",                  # Filled by PDF_Sorter.py
+        "sorted_tree": "folder_structure.txt",
+        "sorted_csv": "sorted_pdfs.csv",               # Input of main.py
+        "json_dir": "sorted_json",                     # Output of main.py
+    },
+}
+
+
+def load(path=CONFIG_PATH):
+    """
+    DEFAULTS overridden by the INI file at path, if there is one.
+    """
+    settings = configparser.ConfigParser(interpolation=None)
+    settings.read_dict(DEFAULTS)
+    settings.read(path, encoding="utf-8")
+    return settings
+
+settings = load()
+
+FTP_SERVER = settings.get("ftp", "server")
+FTP_PORT = settings.getint("ftp", "port")
+FTP_ENCODING = settings.get("ftp", "encoding")
+
+DOWNLOAD_ROOT = settings.get("paths", "download_root")
+FTP_TREE_PATH = settings.get("paths", "ftp_tree")
+PAPERS_CSV_PATH = settings.get("paths", "papers_csv")
+SORTED_ROOT = settings.get("paths", "sorted_root")
+SORTED_TREE_PATH = settings.get("paths", "sorted_tree")
+SORTED_CSV_PATH = settings.get("paths", "sorted_csv")
+JSON_DIR = settings.get("paths", "json_dir")
@@ -0,0 +1,282 @@
+import os
+from collections import Counter, defaultdict
+from functools import lru_cache
+from fuzzywuzzy import fuzz, utils
+
+# SequenceMatcher ignores "popular" characters in strings of this length or more,
+# so the exact prefix ratio below only holds for shorter strings.
+AUTOJUNK_LENGTH = 200
+SIMILARITY_THRESHOLD = 85  # token_set_ratio from which two questions are the same (main, search and global dedup)
+
+
+def question_tokens(text):
+    """
+    Returns the token set fuzz.token_set_ratio builds for text
+    (same ASCII forcing, punctuation stripping and lower-casing).
+    """
+    return frozenset(utils.full_process(text, force_ascii=True).split())
+
+def char_counts(tokens):
+    """
+    How often each character occurs in the tokens joined by spaces, as 128
+    counts (bytes folded onto ASCII, which only ever merges counts). Any
+    string token_set_ratio builds from tokens has exactly these characters.
+    """
+    import numpy as np
+    joined = " ".join(tokens).encode("utf-8")
+    return np.bincount(np.frombuffer(joined, dtype=np.uint8) & 127, minlength=128)
+
+def lcs_length(text, other):
+    """
+    Length of the longest common subsequence of two strings (bit-parallel,
+    one pass over other). SequenceMatcher's matching blocks form a common
+    subsequence, so this bounds the matches fuzz.ratio counts.
+    """
+    masks = {}
+    for i, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    full = (1 << len(text)) - 1
+    row = full
+    for char in other:
+        matched = row & masks.get(char, 0)
+        row = ((row + matched) | (row - matched)) & full
+    return len(text) - bin(row).count("1")
+
+def joined_length(tokens):
+    """
+    Length of " ".join(sorted(tokens)) without building the string.
+    """
+    if not tokens:
+        return 0
+    return sum(len(token) for token in tokens) + len(tokens) - 1
+
+def prefix_ratio(sect_length, total_length):
+    """
+    fuzz.ratio of the sorted intersection against one of the combined strings.
+    The intersection is a prefix of the combined string, so the ratio
+    follows from the two lengths alone.
+    """
+    if sect_length == 0:
+        return 0
+    return int(round(100 * 2.0 * sect_length / (sect_length + total_length)))
+
+@lru_cache(maxsize=None)
+def min_sect_length(total_length, threshold):
+    """
+    The shortest intersection whose prefix_ratio against a combined string
+    of total_length reaches threshold (total_length + 1 if none does).
+    """
+    sect_length = max(int(threshold * total_length / (200.0 - threshold)) - 1, 1)
+    while sect_length <= total_length and prefix_ratio(sect_length, total_length) < threshold:
+        sect_length += 1
+    return sect_length
+
+@lru_cache(maxsize=None)
+def min_matches(total_length, threshold):
+    """
+    The fewest matching characters two strings with total_length
+    characters between them need for fuzz.ratio to reach threshold.
+    """
+    matches = max(int(threshold * total_length / 200.0) - 1, 0)
+    while matches < total_length and int(round(100 * 2.0 * matches / total_length)) < threshold:
+        matches += 1
+    return matches
+
+@lru_cache(maxsize=None)
+def min_matches_by_length(length, threshold):
+    """
+    For each joined length (the index) a question can have, the fewest
+    matching characters its combined string needs with one of length to
+    reach threshold; the last entry, for every longer question, and lengths
+    that cannot reach threshold at all need more than either string has.
+    """
+    import numpy as np
+    longest = length * 200 // max(threshold, 1) + 1
+    needed = np.full(longest + 2, 2 * (length + longest) + 1, dtype=np.int64)
+    for other_length in range(1, longest + 1):
+        matches = min_matches(length + other_length, threshold)
+        if matches <= min(length, other_length):
+            needed[other_length] = matches
+    return needed
+
+
+class QuestionIndex:
+    """
+    Index of the questions added so far. find_match() returns the question
+    a linear scan with fuzz.token_set_ratio would pick first: candidates()
+    finds every indexed question that can reach the threshold, and score()
+    rules most of them out on length and character bounds before calling
+    fuzz.
+    """
+
+    def __init__(self):
+        self.questions = []
+        self.tokens = []
+        self.lengths = []
+        self.postings = defaultdict(list)   # token -> positions
+        self.anchors = {}                   # threshold -> token -> positions
+        self.comparisons = 0
+        self._char_counts = None            # char_counts() of each question, one column per position
+        self._length_array = None           # self.lengths as a numpy array, same capacity
+
+    def __len__(self):
+        return len(self.questions)
+
+    def add(self, question, tokens=None):
+        """
+        Adds a question to the index and returns its position.
+        """
+        if tokens is None:
+            tokens = question_tokens(question)
+        import numpy as np
+        position = len(self.questions)
+        length = joined_length(tokens)
+        self.questions.append(question)
+        self.tokens.append(tokens)
+        self.lengths.append(length)
+        for token in tokens:
+            self.postings[token].append(position)
+        if self._char_counts is None or position == self._char_counts.shape[1]:
+            capacity = max(position * 2, 64)
+            char_counts_grown = np.zeros((128, capacity), dtype=np.int32)
+            length_array = np.zeros(capacity, dtype=np.int64)
+            if position:
+                char_counts_grown[:, :position] = self._char_counts
+                length_array[:position] = self._length_array
+            self._char_counts, self._length_array = char_counts_grown, length_array
+        self._char_counts[:, position] = char_counts(tokens)
+        self._length_array[position] = length
+        for threshold, anchors in self.anchors.items():
+            for token in self._anchor_tokens(tokens, length, threshold):
+                anchors[token].append(position)
+        return position
+
+    def _anchor_tokens(self, tokens, length, threshold):
+        """
+        The longest tokens of a question, enough of them that any intersection
+        leaving them all out is too short for a prefix ratio of threshold.
+        """
+        needed = min_sect_length(length, threshold)
+        rest_chars, rest_count = length - len(tokens) + 1, len(tokens)
+        anchors = []
+        for token in sorted(tokens, key=lambda token: (-len(token), token)):
+            if rest_chars + rest_count - 1 < needed:
+                break
+            anchors.append(token)
+            rest_chars -= len(token)
+            rest_count -= 1
+        return anchors
+
+    def _anchor_postings(self, threshold):
+        anchors = self.anchors.get(threshold)
+        if anchors is None:
+            anchors = self.anchors[threshold] = defaultdict(list)
+            for position, tokens in enumerate(self.tokens):
+                for token in self._anchor_tokens(tokens, self.lengths[position], threshold):
+                    anchors[token].append(position)
+        return anchors
+
+    def candidates(self, tokens, threshold):
+        """
+        Positions, in insertion order, of every indexed question whose
+        token_set_ratio with a question of these tokens can reach threshold.
+        token_set_ratio is the best of three ratios, each covered exactly:
+
+        - the intersection against the query's combined string: the query's
+          rarest tokens, enough that an intersection without them is too short;
+        - the intersection against the other combined string: the anchor
+          tokens of the indexed questions (see _anchor_tokens);
+        - the two combined strings against each other: they cannot match
+          more characters than they have in common, which is checked for
+          every indexed question at once (see min_matches_by_length).
+        """
+        import numpy as np
+        found = set()
+        length = joined_length(tokens)
+        if not length:
+            return []
+
+        # Intersection against the query's combined string
+        needed = min_sect_length(length, threshold)
+        rest_chars, rest_count = length - len(tokens) + 1, len(tokens)
+        for token in sorted(tokens, key=lambda token: len(self.postings.get(token, ()))):
+            if rest_chars + rest_count - 1 < needed:
+                break
+            found.update(self.postings.get(token, ()))
+            rest_chars -= len(token)
+            rest_count -= 1
+
+        # Intersection against the indexed question's combined string
+        anchors = self._anchor_postings(threshold)
+        for token in tokens:
+            found.update(anchors.get(token, ()))
+
+        # Combined strings against each other
+        count = len(self.questions)
+        if count:
+            needed = min_matches_by_length(length, threshold)
+            other_needed = needed[np.minimum(self._length_array[:count], len(needed) - 1)]
+            query_counts = char_counts(tokens)
+            chars = np.flatnonzero(query_counts)
+            shared = np.minimum(self._char_counts[chars, :count], query_counts[chars, None]).sum(axis=0)
+            found.update(np.flatnonzero(shared >= other_needed).tolist())
+        return sorted(found)
+
+    def score(self, question, tokens, position, threshold):
+        """
+        Returns a score that reaches threshold exactly when
+        fuzz.token_set_ratio(question, indexed question) does. Pairs whose
+        upper bound is below threshold score 0 without calling fuzz.
+        """
+        other = self.tokens[position]
+        sect = tokens & other
+        query_length = joined_length(tokens)
+        other_length = self.lengths[position]
+        sect_length = joined_length(sect)
+
+        # The first two pairwise ratios are exact, the intersection being a
+        # prefix of both combined strings; accept on them without scoring.
+        query_ratio = prefix_ratio(sect_length, query_length)
+        other_ratio = prefix_ratio(sect_length, other_length)
+        if query_length < AUTOJUNK_LENGTH and query_ratio >= threshold:
+            return query_ratio
+        if other_length < AUTOJUNK_LENGTH and other_ratio >= threshold:
+            return other_ratio
+
+        # The two combined strings cannot match more characters than they
+        # share as multisets: the intersection, the common spaces and the
+        # characters the two remainders have in common. Nor more than their
+        # longest common subsequence, which starts with their common prefix
+        # (the sorted intersection).
+        total_length = query_length + other_length
+        if prefix_ratio(min(query_length, other_length), max(query_length, other_length)) >= threshold:
+            shared = Counter("".join(tokens - other)) & Counter("".join(other - tokens))
+            matchable = (sum(len(token) for token in sect) + min(len(tokens), len(other)) - 1
+                         + sum(shared.values()))
+            combined_bound = int(round(100 * 2.0 * matchable / total_length))
+            if combined_bound >= threshold:
+                sorted_sect = " ".join(sorted(sect))
+                combined = (f"{sorted_sect} {' '.join(sorted(tokens - other))}".strip(),
+                            f"{sorted_sect} {' '.join(sorted(other - tokens))}".strip())
+                common = len(os.path.commonprefix(combined))
+                matchable = common + lcs_length(combined[0][common:], combined[1][common:])
+                combined_bound = int(round(100 * 2.0 * matchable / total_length))
+        else:
+            combined_bound = 0
+        if max(query_ratio, other_ratio, combined_bound) < threshold:
+            return 0
+
+        self.comparisons += 1
+        return fuzz.token_set_ratio(question, self.questions[position])
+
+    def find_match(self, question, threshold, tokens=None):
+        """
+        Returns the position of the first indexed question whose
+        token_set_ratio with question is at least threshold, or None.
+        """
+        if tokens is None:
+            tokens = question_tokens(question)
+        for position in self.candidates(tokens, threshold):
+            if self.score(question, tokens, position, threshold) >= threshold:
+                return position
+        return None
@@ -0,0 +1,235 @@
+import io
+import os
+import json
+import hashlib
+import logging
+import argparse
+import tempfile
+import extraction_cache
+
+DIAGRAM_STORE = "diagram_store"  # Content-addressed images: <store>/<hash[:2]>/<hash>.<ext>
+MIN_DIAGRAM_SIDE = 16            # Images smaller than this (pixels, either side) are decorations
+MAX_PAGE_COVERAGE = 0.8          # Images covering more of the page are scans of it, not diagrams
+RENDER_RESOLUTION = 150          # DPI for images whose stream cannot be copied as is
+
+# Colour spaces (and their inline image abbreviations) whose samples PIL reads as they are
+PLAIN_COLOR_SPACES = {"DeviceGray": ("L", 1), "G": ("L", 1),
+                      "DeviceRGB": ("RGB", 3), "RGB": ("RGB", 3),
+                      "DeviceCMYK": ("CMYK", 4), "CMYK": ("CMYK", 4)}
+
+
+def blob_path(store_dir, digest, ext):
+    return os.path.join(store_dir, digest[:2], f"{digest}.{ext}")
+
+def store_blob(store_dir, data, ext):
+    """
+    Store data under its sha256 and return the hex digest. Identical images
+    (logos, headers) from any number of papers are written once.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(store_dir, digest, ext)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return digest
+
+def encode_png(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
+
+def decode_pixels(img_obj, data):
+    """
+    Build a PIL image from decoded (unfiltered) image stream data, for 8-bit
+    DeviceGray/DeviceRGB/DeviceCMYK images and 1-bit gray images and image
+    masks, all with the default /Decode. Returns None otherwise (indexed,
+    ICC-based, Lab or separation colours, inverted or remapped /Decode
+    arrays, other bit depths), and the image is rendered instead.
+    """
+    from PIL import Image
+    from pdfminer.pdftypes import resolve1
+    from pdfminer.psparser import PSLiteral
+    stream = img_obj["stream"]
+    width, height = img_obj["srcsize"]
+    bits = img_obj.get("bits")
+    if resolve1(stream.get("ImageMask", stream.get("IM"))):
+        mode, components = "L", 1
+    else:
+        color_space = resolve1(stream.get("ColorSpace", stream.get("CS")))
+        if isinstance(color_space, list) and len(color_space) == 1:
+            color_space = resolve1(color_space[0])
+        if not isinstance(color_space, PSLiteral) or color_space.name not in PLAIN_COLOR_SPACES:
+            return None
+        mode, components = PLAIN_COLOR_SPACES[color_space.name]
+    decode = resolve1(stream.get("Decode", stream.get("D")))
+    if decode is not None and [float(resolve1(value)) for value in decode] != [0.0, 1.0] * components:
+        return None
+
+    if bits == 1 and components == 1:
+        if len(data) < (width + 7) // 8 * height:
+            return None
+        img = Image.frombytes("1", (width, height), data)
+        # Image masks paint where the bit is 0; gray 1-bit images use 0 for black too
+        return img.convert("L")
+    if bits != 8 or len(data) < width * height * components:
+        return None
+    img = Image.frombytes(mode, (width, height), data[:width * height * components])
+    return img.convert("RGB") if mode == "CMYK" else img
+
+def image_bytes(page, img_obj):
+    """
+    The bytes and file extension of one embedded image. JPEG and JPEG 2000
+    streams are copied as they are, other streams are decoded once and
+    stored as PNG; only images that cannot be decoded as they are (indexed
+    or ICC-based colours, /Decode arrays, CCITT, JBIG2, ...) are rendered
+    from the page.
+    """
+    from pdfminer.pdftypes import LITERALS_DCT_DECODE, LITERALS_JPX_DECODE
+    stream = img_obj["stream"]
+    filters = [name for name, _ in stream.get_filters()]
+    last = filters[-1] if filters else None
+    try:
+        if last in LITERALS_DCT_DECODE:
+            return stream.get_data(), "jpg"
+        if last in LITERALS_JPX_DECODE:
+            return stream.get_data(), "jp2"
+        img = decode_pixels(img_obj, stream.get_data())
+        if img is not None:
+            return encode_png(img), "png"
+    except Exception as e:
+        logging.debug(f"Could not copy image stream on page {page.page_number}: {e}")
+    bbox = (max(img_obj["x0"], 0), max(img_obj["top"], 0),
+            min(img_obj["x1"], page.width), min(img_obj["bottom"], page.height))
+    rendered = page.crop(bbox).to_image(resolution=RENDER_RESOLUTION).original
+    return encode_png(rendered), "png"
+
+def is_diagram(page, img_obj):
+    width, height = img_obj["srcsize"]
+    if width < MIN_DIAGRAM_SIDE or height < MIN_DIAGRAM_SIDE:
+        return False
+    coverage = (img_obj["width"] * img_obj["height"]) / (page.width * page.height)
+    return coverage <= MAX_PAGE_COVERAGE
+
+def extract_diagrams(pdf_path, store_dir=DIAGRAM_STORE):
+    """
+    Store every diagram of a PDF in the content-addressed store.
+    Returns a list of {'hash', 'ext', 'page', 'width', 'height'} references,
+    one per distinct image of the PDF.
+    """
+    import pdfplumber
+    refs = []
+    seen = set()
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            for img_obj in page.images:
+                if not is_diagram(page, img_obj):
+                    continue
+                try:
+                    data, ext = image_bytes(page, img_obj)
+                except Exception as e:  # Not main's PDFTimeoutError, a BaseException
+                    logging.error(f"Error extracting image on page {page.page_number} of {pdf_path}: {e}")
+                    continue
+                digest = store_blob(store_dir, data, ext)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                width, height = img_obj["srcsize"]
+                refs.append({"hash": digest, "ext": ext, "page": page.page_number,
+                             "width": width, "height": height})
+    return refs
+
+def extract_diagrams_cached(pdf_path, store_dir=DIAGRAM_STORE):
+    """
+    extract_diagrams, remembered per PDF content in <store>/pdfs/<pdf hash>.json
+    so each distinct PDF is only scanned once.
+    """
+    pdf_hash = extraction_cache.hash_file(pdf_path)
+    index_path = os.path.join(store_dir, "pdfs", f"{pdf_hash}.json")
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            return json.load(f)
+    refs = extract_diagrams(pdf_path, store_dir)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(refs, f)
+    os.replace(tmp_path, index_path)
+    return refs
+
+def subject_diagrams(pdf_refs):
+    """
+    Merge the references of a subject's PDFs, given as (source_pdf_filename,
+    refs) pairs, into one entry per image hash with the PDFs it appears in.
+    """
+    merged = {}
+    for source, refs in pdf_refs:
+        for ref in refs:
+            entry = merged.setdefault(ref["hash"], {"hash": ref["hash"], "ext": ref["ext"],
+                                                    "width": ref["width"], "height": ref["height"],
+                                                    "sources": []})
+            if source not in entry["sources"]:
+                entry["sources"].append(source)
+    return list(merged.values())
+
+def add_diagrams_to_json(json_path, diagrams):
+    """
+    Set the 'diagrams' list of an existing subject JSON file.
+    """
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["diagrams"] = diagrams
+    tmp_path = f"{json_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, json_path)
+
+def main():
+    """
+    Run diagram extraction as its own stage over the PDFs of the CSV that
+    main.py used, and add the references to the subject JSON files main.py
+    wrote.
+    """
+    import csv
+    from concurrent.futures import ProcessPoolExecutor
+    import main as extraction
+
+    parser = argparse.ArgumentParser(description="Extract diagrams into a content-addressed store.")
+    parser.add_argument("--csv", default=extraction.CSV_PATH)
+    parser.add_argument("--input-dir", default=extraction.INPUT_DIR)
+    parser.add_argument("--json-dir", default=extraction.OUTPUT_JSON_DIR)
+    parser.add_argument("--store", default=DIAGRAM_STORE)
+    parser.add_argument("--workers", type=int, default=extraction.MAX_WORKERS)
+    args = parser.parse_args()
+
+    subjects = {}
+    with open(args.csv, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = (row["Department"], row["Branch"], row["Semester"], row["Subject"])
+            subjects.setdefault(key, []).append(
+                os.path.join(args.input_dir, row["FullPath"].replace("\\", os.sep)))
+
+    pdf_paths = [path for paths in subjects.values() for path in paths]
+    with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        futures = {path: executor.submit(extract_diagrams_cached, path, args.store) for path in pdf_paths}
+
+    images = updated = 0
+    for (dept, branch, sem, subject), paths in subjects.items():
+        pdf_refs = []
+        for path in paths:
+            try:
+                pdf_refs.append((os.path.basename(path), futures[path].result()))
+            except Exception as e:
+                logging.error(f"Diagram extraction failed for {path}: {e}")
+        json_path = os.path.join(args.json_dir, dept, branch, str(sem), subject, f"{subject}_Questions.json")
+        diagrams = subject_diagrams(pdf_refs)
+        images += len(diagrams)
+        if os.path.exists(json_path):
+            add_diagrams_to_json(json_path, diagrams)
+            updated += 1
+    print(f"{len(pdf_paths)} PDFs, {images} diagram references, {updated} subject files updated")
+
+if __name__ == "__main__":
+    main()
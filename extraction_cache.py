@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+
+CACHE_PATH = "extraction_cache.sqlite"
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # Evict least recently used entries beyond this size
+CACHE_VERSION = 1                # Bump when text extraction or question splitting changes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    pdf_hash TEXT NOT NULL,
+    pdf_path TEXT NOT NULL,
+    config TEXT NOT NULL,
+    pages TEXT NOT NULL,
+    questions TEXT NOT NULL,
+    diagrams TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_pdf_hash ON entries (pdf_hash);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    pdf_hash TEXT NOT NULL
+);
+"""
+
+
+def open_cache(path=CACHE_PATH):
+    """
+    Opens (creating if needed) the SQLite cache. WAL mode lets several worker
+    processes read while one of them writes.
+    """
+    conn = sqlite3.connect(path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def hash_file(path):
+    """
+    Returns the SHA-256 hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_hash(conn, pdf_path):
+    """
+    Returns the SHA-256 of the file contents. Hashes are remembered per
+    path, size and mtime so unchanged files are not read again.
+    """
+    stat = os.stat(pdf_path)
+    row = conn.execute("SELECT pdf_hash FROM files WHERE path = ? AND size = ? AND mtime = ?",
+                       (pdf_path, stat.st_size, stat.st_mtime)).fetchone()
+    if row:
+        return row[0]
+    pdf_hash = hash_file(pdf_path)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO files (path, size, mtime, pdf_hash) VALUES (?, ?, ?, ?)",
+                     (pdf_path, stat.st_size, stat.st_mtime, pdf_hash))
+    return pdf_hash
+
+def cache_key(pdf_hash, config):
+    """
+    Key of one extraction: the file contents plus every setting that
+    changes the extracted text.
+    """
+    return hashlib.sha256(f"{CACHE_VERSION}|{pdf_hash}|{config}".encode("utf-8")).hexdigest()
+
+def lookup(conn, key):
+    """
+    Returns the cached extraction for key as a dict with 'pages', 'questions'
+    and 'diagrams', or None on a miss.
+    """
+    row = conn.execute("SELECT pages, questions, diagrams FROM entries WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    with conn:
+        conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+    return {
+        "pages": json.loads(row[0]),
+        "questions": json.loads(row[1]),
+        "diagrams": json.loads(row[2])
+    }
+
+def store(conn, key, pdf_hash, pdf_path, config, pages, questions, diagrams):
+    """
+    Stores one extraction. pages is a list of dicts with 'page', 'text' and 'ocr'.
+    """
+    pages_json = json.dumps(pages, ensure_ascii=False)
+    questions_json = json.dumps(questions, ensure_ascii=False)
+    diagrams_json = json.dumps(diagrams, ensure_ascii=False)
+    size = len(pages_json) + len(questions_json) + len(diagrams_json)
+    now = time.time()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO entries (key, pdf_hash, pdf_path, config, pages, questions, "
+                     "diagrams, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (key, pdf_hash, pdf_path, config, pages_json, questions_json, diagrams_json,
+                      size, now, now))
+
+def evict(conn, max_bytes=CACHE_MAX_BYTES):
+    """
+    Deletes least recently used entries until the cached data fits in
+    max_bytes. Returns the number of entries removed.
+    """
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+    doomed = []
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+        if total <= max_bytes:
+            break
+        doomed.append((key,))
+        total -= size
+    with conn:
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+    return len(doomed)
+
+def invalidate(conn, pdf_path=None):
+    """
+    Drops the cached extractions of pdf_path (matched by path or by its
+    current contents), or of every PDF when pdf_path is None.
+    Returns the number of entries removed.
+    """
+    with conn:
+        if pdf_path is None:
+            conn.execute("DELETE FROM files")
+            return conn.execute("DELETE FROM entries").rowcount
+        hashes = {row[0] for row in conn.execute("SELECT pdf_hash FROM files WHERE path = ?", (pdf_path,))}
+        if os.path.exists(pdf_path):
+            hashes.add(hash_file(pdf_path))
+        removed = conn.execute("DELETE FROM entries WHERE pdf_path = ?", (pdf_path,)).rowcount
+        for pdf_hash in hashes:
+            removed += conn.execute("DELETE FROM entries WHERE pdf_hash = ?", (pdf_hash,)).rowcount
+        conn.execute("DELETE FROM files WHERE path = ?", (pdf_path,))
+    return removed
+
+def cache_stats(conn):
+    """
+    Returns entry count, stored bytes and distinct PDFs in the cache.
+    """
+    entries, size, pdfs = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT pdf_hash) FROM entries").fetchone()
+    return {"entries": entries, "bytes": size, "pdfs": pdfs}
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and maintain the PDF extraction cache.")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Path of the cache database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show cache size")
+    evict_parser = subparsers.add_parser("evict", help="Evict least recently used entries")
+    evict_parser.add_argument("--max-bytes", type=int, default=CACHE_MAX_BYTES)
+    invalidate_parser = subparsers.add_parser("invalidate", help="Drop cached extractions")
+    group = invalidate_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--pdf", help="PDF whose extraction should be redone")
+    group.add_argument("--all", action="store_true", help="Empty the whole cache")
+    args = parser.parse_args()
+
+    conn = open_cache(args.cache)
+    if args.command == "stats":
+        stats = cache_stats(conn)
+        print(f"{stats['entries']} entries for {stats['pdfs']} PDFs, {stats['bytes'] / 1024 ** 2:.1f} MiB")
+    elif args.command == "evict":
+        print(f"Evicted {evict(conn, args.max_bytes)} entries")
+    else:
+        print(f"Invalidated {invalidate(conn, None if args.all else args.pdf)} entries")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
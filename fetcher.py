@@ -1,81 +1,229 @@
-import ftplib
-import os
-
-def custom_retrlines(ftp, cmd, callback):
-    """
-    Custom version of FTP.retrlines that decodes using errors='replace'.
-    """
-    conn = ftp.transfercmd(cmd)
-    # Create a file object with the desired encoding and errors handling.
-    fp = conn.makefile('r', encoding=ftp.encoding, errors='replace')
-    while True:
-        line = fp.readline()
-        if not line:
-            break
-        callback(line.rstrip('\r\n'))
-    fp.close()
-    ftp.voidresp()
-
-def safe_nlst(ftp, remote_dir):
-    """
-    Retrieves a directory listing from remote_dir using our custom retrlines.
-    """
-    lines = []
-    try:
-        custom_retrlines(ftp, 'NLST ' + remote_dir, lines.append)
-    except ftplib.error_perm as e:
-        print(f"Error listing {remote_dir}: {e}")
-    return lines
-
-def is_ftp_dir(ftp, path):
-    """
-    Checks if a given FTP path is a directory.
-    It attempts to change directory into the path. On success, returns True.
-    """
-    original = ftp.pwd()
-    try:
-        ftp.cwd(path)
-        ftp.cwd(original)
-        return True
-    except ftplib.error_perm:
-        return False
-
-def download_ftp_tree(ftp, remote_dir, local_dir):
-    """
-    Recursively downloads contents of remote_dir into the local folder local_dir.
-    """
-    os.makedirs(local_dir, exist_ok=True)
-    items = safe_nlst(ftp, remote_dir)
-    for item in items:
-        base = os.path.basename(item.rstrip("/"))
-        if base in ['.', '..'] or base == '':
-            continue
-
-        local_path = os.path.join(local_dir, base)
-        if is_ftp_dir(ftp, item):
-            print("Entering directory:", item)
-            download_ftp_tree(ftp, item, local_path)
-        else:
-            print("Downloading file:", item)
-            try:
-                with open(local_path, 'wb') as f:
-                    ftp.retrbinary("RETR " + item, f.write)
-            except Exception as e:
-                print(f"Failed to download {item}: {e}")
-
-def main():
-    ftp_server = "172.16.191.17"
-    local_root = "RCOEM"  # Local folder for saving files
-
-    ftp = ftplib.FTP(ftp_server)
-    # Set encoding to 'latin-1' (or try 'cp1252' if needed)
-    ftp.encoding = 'latin-1'
-    ftp.login()  # Use credentials if required (e.g., ftp.login("user", "pass"))
-    print("Connected to", ftp_server)
-
-    download_ftp_tree(ftp, "/", local_root)
-    ftp.quit()
-    print("Download complete.")
-
-if __name__ == "__main__":
-    main()
+import ftplib
+import os
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ftp_listing import join_ftp_path, walk
+from ftp_snapshot import DELTA_PATH, load_delta
+import config
+
+FTP_SERVER = config.FTP_SERVER
+FTP_PORT = config.FTP_PORT
+FTP_ENCODING = config.FTP_ENCODING  # latin-1 by default, or try 'cp1252' if needed
+MAX_CONNECTIONS = 4       # Parallel FTP connections used for downloads
+RETRIES = 2               # Extra attempts per file after a failed transfer
+
+def connect(server=FTP_SERVER, port=FTP_PORT, user="", password=""):
+    """
+    Opens and logs in one FTP connection.
+    """
+    ftp = ftplib.FTP()
+    ftp.connect(server, port)
+    ftp.encoding = FTP_ENCODING
+    ftp.login(user, password)  # Anonymous unless credentials are given
+    return ftp
+
+def list_ftp_files(ftp, remote_dir, local_dir):
+    """
+    Recursively lists remote_dir (one MLSD/LIST per directory) and returns
+    (remote_path, local_path, size, mtime) tuples for every file, creating
+    the matching local directories on the way.
+    """
+    files = []
+    for directory, entries in walk(ftp, remote_dir):
+        relative = directory[len(remote_dir):].strip("/")
+        local_path = os.path.join(local_dir, *relative.split("/")) if relative else local_dir
+        os.makedirs(local_path, exist_ok=True)
+        print("Entering directory:", directory)
+        for entry in entries:
+            if entry["type"] == "file":
+                files.append((join_ftp_path(directory, entry["name"]),
+                              os.path.join(local_path, entry["name"]),
+                              entry["size"], entry["modify"]))
+    return files
+
+def parse_mdtm(value):
+    """
+    Converts an MDTM timestamp (YYYYMMDDHHMMSS[.sss], UTC) to epoch seconds.
+    """
+    return datetime.strptime(value[:14], "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc).timestamp()
+
+def remote_file_info(ftp, remote_path):
+    """
+    Returns (size, mtime) of a remote file; either is None when the server
+    does not support SIZE or MDTM.
+    """
+    size = mtime = None
+    try:
+        ftp.voidcmd("TYPE I")
+        size = ftp.size(remote_path)
+    except ftplib.error_perm:
+        pass
+    try:
+        mtime = parse_mdtm(ftp.voidcmd("MDTM " + remote_path).split()[-1])
+    except (ftplib.error_perm, ValueError):
+        pass
+    return size, mtime
+
+def is_unchanged(local_path, size, mtime):
+    """
+    True when the local copy has the remote size and modification time.
+    """
+    if size is None or not os.path.exists(local_path):
+        return False
+    stat = os.stat(local_path)
+    if stat.st_size != size:
+        return False
+    return mtime is None or int(stat.st_mtime) == int(mtime)
+
+def download_file(ftp, remote_path, local_path, size=None, mtime=None):
+    """
+    Downloads one file into local_path + '.part', resuming an earlier partial
+    transfer with REST, and renames it into place only once it is complete.
+    size and mtime come from the directory listing; when size is unknown they
+    are asked for with SIZE/MDTM. Returns "skipped" if the local copy is
+    already up to date.
+    """
+    if size is None:
+        size, mtime = remote_file_info(ftp, remote_path)
+    if is_unchanged(local_path, size, mtime):
+        return "skipped"
+
+    part_path = local_path + ".part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if size is None or offset > size:
+        offset = 0
+    with open(part_path, "ab" if offset else "wb") as f:
+        if size is None or offset < size:
+            ftp.retrbinary("RETR " + remote_path, f.write, rest=offset or None)
+    if size is not None and os.path.getsize(part_path) != size:
+        raise IOError(f"expected {size} bytes, got {os.path.getsize(part_path)}")
+    os.replace(part_path, local_path)
+    if mtime is not None:
+        os.utime(local_path, (mtime, mtime))
+    return "resumed" if offset else "downloaded"
+
+def iter_downloads(files, connections=MAX_CONNECTIONS, connect_args=None):
+    """
+    Downloads (remote_path, local_path, size, mtime) tuples, as returned by
+    list_ftp_files, over a pool of FTP connections, one per worker thread,
+    and yields (item, outcome) as transfers finish. Items may carry extra
+    fields after mtime; they are passed through untouched. At most 2 * connections
+    transfers are queued at a time, so files may be a lazy iterator and a
+    slow consumer holds the downloads back. A failed transfer reconnects and
+    resumes from the partial file, up to RETRIES more times.
+    """
+    connect_args = connect_args or {}
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+
+    def get_connection(reconnect=False):
+        if reconnect or getattr(local, "ftp", None) is None:
+            local.ftp = connect(**connect_args)
+            with lock:
+                opened.append(local.ftp)
+        return local.ftp
+
+    def fetch(remote_path, local_path, size, mtime):
+        for attempt in range(RETRIES + 1):
+            try:
+                return download_file(get_connection(reconnect=attempt > 0), remote_path, local_path,
+                                     size, mtime)
+            except (ftplib.Error, OSError, EOFError) as e:
+                if attempt == RETRIES:
+                    print(f"Failed to download {remote_path}: {e}")
+                    return "failed"
+
+    pending = iter(files)
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            while True:
+                while len(in_flight) < connections * 2:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    in_flight[executor.submit(fetch, *item[:4])] = item
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield in_flight.pop(future), future.result()
+    finally:
+        for ftp in opened:
+            try:
+                ftp.quit()
+            except (ftplib.Error, OSError, EOFError):
+                ftp.close()
+
+def download_files(files, connections=MAX_CONNECTIONS, connect_args=None):
+    """
+    Downloads (remote_path, local_path, size, mtime) tuples over a pool of
+    FTP connections (see iter_downloads). Returns the number of files per outcome.
+    """
+    outcomes = {"downloaded": 0, "resumed": 0, "skipped": 0, "failed": 0}
+    for item, outcome in iter_downloads(files, connections, connect_args):
+        outcomes[outcome] += 1
+        if outcome != "skipped":
+            print(f"{outcome.capitalize()}: {item[0]}")
+    return outcomes
+
+def download_ftp_tree(ftp, remote_dir, local_dir, connections=MAX_CONNECTIONS, connect_args=None):
+    """
+    Recursively downloads contents of remote_dir into the local folder local_dir,
+    skipping files whose local copy already matches the remote size and time.
+    """
+    files = list_ftp_files(ftp, remote_dir, local_dir)
+    print(f"Found {len(files)} files under {remote_dir}")
+    return download_files(files, connections, connect_args)
+
+def delta_files(delta, remote_dir, local_dir):
+    """
+    Turns a sync delta into (remote_path, local_path, size, mtime) tuples for
+    the added and modified files under remote_dir, plus the local paths of
+    the removed ones.
+    """
+    def local_path(remote_path):
+        relative = remote_path[len(remote_dir):].strip("/")
+        return os.path.join(local_dir, *relative.split("/"))
+
+    files = []
+    for item in delta["added"] + delta["modified"]:
+        if item["path"].startswith(remote_dir):
+            path = local_path(item["path"])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            files.append((item["path"], path, item["size"], item["modify"]))
+    removed = [local_path(item["path"]) for item in delta["removed"] if item["path"].startswith(remote_dir)]
+    return files, removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Download the FTP tree.")
+    parser.add_argument("--delta", nargs="?", const=DELTA_PATH,
+                        help="Only fetch the PDFs added or modified in a sync delta "
+                             "(and delete local copies of removed ones)")
+    args = parser.parse_args()
+
+    ftp_server = FTP_SERVER
+    local_root = config.DOWNLOAD_ROOT  # Local folder for saving files
+
+    if args.delta:
+        files, removed = delta_files(load_delta(args.delta), "/", local_root)
+        for path in removed:
+            if os.path.exists(path):
+                os.remove(path)
+                print("Removed:", path)
+        outcomes = download_files(files, connect_args={"server": ftp_server, "port": FTP_PORT})
+        print(f"Download complete: {outcomes}")
+        return
+
+    ftp = connect(ftp_server, FTP_PORT)  # Pass user/password to connect() if required
+    print("Connected to", ftp_server)
+
+    outcomes = download_ftp_tree(ftp, "/", local_root, connect_args={"server": ftp_server, "port": FTP_PORT})
+    ftp.quit()
+    print(f"Download complete: {outcomes}")
+
+if __name__ == "__main__":
+    main()
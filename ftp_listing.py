@@ -0,0 +1,168 @@
+import re
+import ftplib
+from datetime import datetime, timezone
+
+MONTHS = {name: number for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+
+UNIX_LIST_LINE = re.compile(
+    r'^(?P<mode>[\-dlbcps][\-rwxsStT]{9})\S*\s+\d+\s+\S+\s+\S+\s+(?P<size>\d+)\s+'
+    r'(?P<month>[A-Za-z]{3})\s+(?P<day>\d{1,2})\s+(?P<time>\d{1,2}:\d{2}|\d{4})\s(?P<name>.+)$')
+DOS_LIST_LINE = re.compile(
+    r'^(?P<date>\d{2}-\d{2}-\d{2,4})\s+(?P<time>\d{1,2}:\d{2}[AP]M)\s+'
+    r'(?:(?P<dir><DIR>)|(?P<size>\d+))\s+(?P<name>.+)$')
+
+
+def custom_retrlines(ftp, cmd, callback):
+    """
+    Custom version of FTP.retrlines that decodes using errors='replace'.
+    """
+    conn = ftp.transfercmd(cmd)
+    # Create a file object with the desired encoding and errors handling.
+    fp = conn.makefile('r', encoding=ftp.encoding, errors='replace')
+    while True:
+        line = fp.readline()
+        if not line:
+            break
+        callback(line.rstrip('\r\n'))
+    fp.close()
+    ftp.voidresp()
+
+def safe_nlst(ftp, remote_dir):
+    """
+    Retrieves a directory listing from remote_dir using our custom retrlines.
+    """
+    lines = []
+    try:
+        custom_retrlines(ftp, 'NLST ' + remote_dir, lines.append)
+    except ftplib.error_perm as e:
+        print(f"Error listing {remote_dir}: {e}")
+    return lines
+
+def join_ftp_path(current_dir, item):
+    """
+    Joins FTP paths. If item is already absolute, it returns item.
+    Otherwise, it joins current_dir and item.
+    """
+    if item.startswith('/'):
+        return item
+    if current_dir == "/":
+        return "/" + item
+    return f"{current_dir.rstrip('/')}/{item}"
+
+def supports_mlsd(ftp):
+    """
+    Asks the server once (FEAT) whether it implements MLSD; the answer is
+    remembered on the connection.
+    """
+    if not hasattr(ftp, "_paperiq_mlsd"):
+        try:
+            features = ftp.sendcmd("FEAT").upper()
+            ftp._paperiq_mlsd = "MLST" in features or "MLSD" in features
+        except ftplib.Error:
+            ftp._paperiq_mlsd = False
+    return ftp._paperiq_mlsd
+
+def parse_mlsd_line(line):
+    """
+    Parses one MLSD line ("type=file;size=10;modify=20240101120000; name").
+    Returns an entry dict, or None for the '.' and '..' entries.
+    """
+    facts_text, _, name = line.partition(" ")
+    facts = {}
+    for fact in facts_text.split(";"):
+        key, _, value = fact.partition("=")
+        if key:
+            facts[key.lower()] = value
+    kind = facts.get("type", "").lower()
+    if kind in ("cdir", "pdir") or name in (".", ".."):
+        return None
+    modify = None
+    if "modify" in facts:
+        try:
+            modify = datetime.strptime(facts["modify"][:14], "%Y%m%d%H%M%S") \
+                .replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+    size = facts.get("size")
+    return {
+        "name": name,
+        "type": "dir" if kind == "dir" else "file",
+        "size": int(size) if size and size.isdigit() else None,
+        "modify": modify
+    }
+
+def parse_list_line(line, now=None):
+    """
+    Parses one line of Unix or DOS style LIST output. Times carry only the
+    precision the server gives (minutes, or days for older files).
+    Returns an entry dict, or None when the line is not an entry.
+    """
+    match = UNIX_LIST_LINE.match(line)
+    if match:
+        name = match.group("name")
+        if match.group("mode")[0] == "l" and " -> " in name:
+            name = name.split(" -> ")[0]
+        if name in (".", ".."):
+            return None
+        now = now or datetime.now(timezone.utc)
+        month = MONTHS.get(match.group("month").lower(), 1)
+        day = int(match.group("day"))
+        if ":" in match.group("time"):
+            hour, minute = (int(part) for part in match.group("time").split(":"))
+            # Without a year the date lies within the last twelve months
+            year = now.year if (month, day) <= (now.month, now.day) else now.year - 1
+        else:
+            hour = minute = 0
+            year = int(match.group("time"))
+        modify = datetime(year, month, day, hour, minute, tzinfo=timezone.utc).timestamp()
+        return {
+            "name": name,
+            "type": "dir" if match.group("mode")[0] == "d" else "file",
+            "size": int(match.group("size")),
+            "modify": modify
+        }
+    match = DOS_LIST_LINE.match(line)
+    if match:
+        date_format = "%m-%d-%y" if len(match.group("date")) == 8 else "%m-%d-%Y"
+        modify = datetime.strptime(f"{match.group('date')} {match.group('time')}", f"{date_format} %I:%M%p") \
+            .replace(tzinfo=timezone.utc).timestamp()
+        return {
+            "name": match.group("name"),
+            "type": "dir" if match.group("dir") else "file",
+            "size": int(match.group("size")) if match.group("size") else None,
+            "modify": modify
+        }
+    return None
+
+def list_dir(ftp, remote_dir):
+    """
+    Lists remote_dir in one round-trip and returns entry dicts with 'name',
+    'type' ('dir' or 'file'), 'size' and 'modify' (epoch seconds or None),
+    sorted by name. Uses MLSD when the server supports it, LIST otherwise.
+    """
+    lines = []
+    try:
+        if supports_mlsd(ftp):
+            custom_retrlines(ftp, 'MLSD ' + remote_dir, lines.append)
+            parse = parse_mlsd_line
+        else:
+            custom_retrlines(ftp, 'LIST ' + remote_dir, lines.append)
+            parse = parse_list_line
+    except ftplib.error_perm as e:
+        print(f"Error listing {remote_dir}: {e}")
+        return []
+    entries = [entry for entry in (parse(line) for line in lines if line) if entry]
+    entries.sort(key=lambda entry: entry["name"])
+    return entries
+
+def walk(ftp, remote_dir="/"):
+    """
+    Yields (directory, entries) for remote_dir and every directory below it,
+    depth first, with one listing round-trip per directory.
+    """
+    entries = list_dir(ftp, remote_dir)
+    yield remote_dir, entries
+    for entry in entries:
+        if entry["type"] == "dir":
+            yield from walk(ftp, join_ftp_path(remote_dir, entry["name"]))
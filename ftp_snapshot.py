@@ -0,0 +1,127 @@
+import os
+import json
+import time
+from ftp_listing import join_ftp_path, list_dir
+from run_manifest import write_json_atomic
+
+SNAPSHOT_PATH = "ftp_snapshot.json"
+DELTA_PATH = "ftp_delta.json"
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """
+    Returns the snapshot stored at path, or None if there is none yet.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def crawl(ftp, root="/", previous=None):
+    """
+    Lists root and every directory below it and returns a snapshot:
+    {"root": ..., "created": ..., "dirs": {path: {"modify": ..., "entries": [...]}}}
+    where entries are list_dir() dicts.
+    With a previous snapshot, a directory that has no subdirectories and
+    whose modify time is unchanged is reused without listing it: adding,
+    removing or renaming a file changes its directory's modify time. Parent
+    directories are always listed, since a change deeper down does not
+    change their time. A file overwritten in place keeps its directory's
+    time, so run a full crawl now and then. Returns (snapshot, number of
+    directories listed).
+    """
+    previous_dirs = previous["dirs"] if previous else {}
+    dirs = {}
+    listed = 0
+
+    def visit(path, modify):
+        nonlocal listed
+        old = previous_dirs.get(path)
+        if (old and modify is not None and old["modify"] == modify
+                and not any(entry["type"] == "dir" for entry in old["entries"])):
+            dirs[path] = old
+            return
+        entries = list_dir(ftp, path)
+        listed += 1
+        dirs[path] = {"modify": modify, "entries": entries}
+        for entry in entries:
+            if entry["type"] == "dir":
+                visit(join_ftp_path(path, entry["name"]), entry["modify"])
+
+    visit(root, None)
+    return {"root": root, "created": time.time(), "dirs": dirs}, listed
+
+def iter_files(snapshot):
+    """
+    Yields (full_path, entry) for every file in the snapshot.
+    """
+    for path, listing in snapshot["dirs"].items():
+        for entry in listing["entries"]:
+            if entry["type"] == "file":
+                yield join_ftp_path(path, entry["name"]), entry
+
+def diff_snapshots(old, new, extension=".pdf"):
+    """
+    Compares the files (with the given extension) of two snapshots.
+    Returns {"added": [...], "removed": [...], "modified": [...]} where each
+    item is a dict with 'path', 'size' and 'modify' (from the new snapshot,
+    or the old one for removed files).
+    """
+    def files(snapshot):
+        if snapshot is None:
+            return {}
+        return {path: entry for path, entry in iter_files(snapshot) if path.lower().endswith(extension)}
+
+    old_files = files(old)
+    new_files = files(new)
+
+    def item(path, entry):
+        return {"path": path, "size": entry["size"], "modify": entry["modify"]}
+
+    delta = {"added": [], "removed": [], "modified": []}
+    for path, entry in sorted(new_files.items()):
+        if path not in old_files:
+            delta["added"].append(item(path, entry))
+        elif (entry["size"], entry["modify"]) != (old_files[path]["size"], old_files[path]["modify"]):
+            delta["modified"].append(item(path, entry))
+    for path, entry in sorted(old_files.items()):
+        if path not in new_files:
+            delta["removed"].append(item(path, entry))
+    return delta
+
+def write_tree_text(snapshot, out_file, remote_dir=None, prefix=""):
+    """
+    Writes the snapshot in the ftp_tree.txt box-drawing format.
+    """
+    remote_dir = remote_dir or snapshot["root"]
+    items = snapshot["dirs"].get(remote_dir, {"entries": []})["entries"]
+    for index, entry in enumerate(items):
+        full_path = join_ftp_path(remote_dir, entry["name"])
+        is_dir = entry["type"] == "dir"
+        connector = "└── " if index == len(items) - 1 else "├── "
+        out_file.write(prefix + connector + full_path + ("/" if is_dir else "") + "\n")
+        if is_dir:
+            new_prefix = prefix + ("    " if index == len(items) - 1 else "│   ")
+            write_tree_text(snapshot, out_file, full_path, new_prefix)
+
+def load_delta(path=DELTA_PATH):
+    """
+    Returns the delta written by the last sync.
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def sync(ftp, root="/", snapshot_path=SNAPSHOT_PATH, delta_path=DELTA_PATH, full=False):
+    """
+    Crawls the server against the snapshot at snapshot_path (re-listing
+    everything when full is set), writes the new snapshot and the delta of
+    PDFs since the previous one, and returns (snapshot, delta, directories listed).
+    """
+    previous = load_snapshot(snapshot_path)
+    snapshot, listed = crawl(ftp, root, None if full else previous)
+    delta = diff_snapshots(previous, snapshot)
+    delta["previous"] = previous["created"] if previous else None
+    delta["created"] = snapshot["created"]
+    write_json_atomic(snapshot_path, snapshot)
+    write_json_atomic(delta_path, delta)
+    return snapshot, delta, listed
@@ -0,0 +1,195 @@
+import os
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dedup import QuestionIndex, SIMILARITY_THRESHOLD
+from question_store import question_hash
+import config
+
+CLUSTERS_PATH = "question_clusters.json"
+SCORE_CHUNK = 2000         # Questions whose candidate pairs one worker task scores
+MAX_WORKERS = os.cpu_count() or 1
+
+_index = None
+
+
+class UnionFind:
+    """
+    Disjoint sets over 0..size-1 with path halving and union by size.
+    """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+
+def load_occurrences(json_dir):
+    """
+    Every unique question of every subject JSON under json_dir, as
+    (json_path, position in its 'questions' list, question dict, subject dict).
+    """
+    occurrences = []
+    for path in sorted(glob.glob(os.path.join(json_dir, "**", "*_Questions.json"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        subject = {name: data[name] for name in ("Department", "Branch", "Semester", "Subject")}
+        for position, question in enumerate(data["questions"]):
+            occurrences.append((path, position, question, subject))
+    return occurrences
+
+def _init_worker(questions):
+    global _index
+    _index = QuestionIndex()
+    for question in questions:
+        _index.add(question)
+
+def score_chunk(start, stop, threshold):
+    """
+    Edges (i, j), i < j, whose token_set_ratio reaches threshold, found by
+    scoring questions start..stop-1 against their QuestionIndex candidates,
+    which include every question that can reach threshold. Returns (edges,
+    fuzz comparisons).
+    """
+    edges = []
+    before = _index.comparisons
+    for i in range(start, stop):
+        question, tokens = _index.questions[i], _index.tokens[i]
+        for j in _index.candidates(tokens, threshold):
+            # Each pair is scored from its lower index only
+            if j > i and _index.score(question, tokens, j, threshold) >= threshold:
+                edges.append((i, j))
+    return edges, _index.comparisons - before
+
+def cluster_questions(questions, threshold=SIMILARITY_THRESHOLD, workers=MAX_WORKERS):
+    """
+    Connected components of the similarity graph over questions, scored in
+    parallel chunks. Questions with the same question_hash are joined
+    first, so the same text is always in one component even when it has
+    no tokens to score (e.g. "???"). Returns (component root of each
+    question, edge count, fuzz comparisons).
+    """
+    chunks = [(start, min(start + SCORE_CHUNK, len(questions)))
+              for start in range(0, len(questions), SCORE_CHUNK)]
+    components = UnionFind(len(questions))
+    first_with_hash = {}
+    for i, question in enumerate(questions):
+        components.union(first_with_hash.setdefault(question_hash(question), i), i)
+    edge_count = comparisons = 0
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(questions,)) as executor:
+            results = executor.map(score_chunk, *zip(*chunks), [threshold] * len(chunks))
+            for edges, chunk_comparisons in results:
+                for a, b in edges:
+                    components.union(a, b)
+                edge_count += len(edges)
+                comparisons += chunk_comparisons
+    else:
+        _init_worker(questions)
+        for start, stop in chunks:
+            edges, chunk_comparisons = score_chunk(start, stop, threshold)
+            for a, b in edges:
+                components.union(a, b)
+            edge_count += len(edges)
+            comparisons += chunk_comparisons
+    return [components.find(i) for i in range(len(questions))], edge_count, comparisons
+
+def build_clusters(occurrences, roots):
+    """
+    ({cluster_id: cluster}, {component root: cluster_id}). A cluster id is
+    the smallest question_hash among its members, so it stays the same
+    across runs as long as that question is in the archive; it is unique
+    because equal hashes share a component (see cluster_questions). The
+    representative question is the most repeated member.
+    """
+    members = {}
+    for occurrence, root in zip(occurrences, roots):
+        members.setdefault(root, []).append(occurrence)
+    clusters = {}
+    cluster_ids = {}
+    for root, group in members.items():
+        cluster_id = min(question_hash(question["question"]) for _, _, question, _ in group)
+        representative = max(group, key=lambda occurrence: occurrence[2]["count"])[2]["question"]
+        cluster_ids[root] = cluster_id
+        subjects = {tuple(subject.values()) for _, _, _, subject in group}
+        clusters[cluster_id] = {
+            "question": representative,
+            "count": sum(question["count"] for _, _, question, _ in group),
+            "subjects": len(subjects),
+            "occurrences": [dict(subject, question=question["question"], count=question["count"],
+                                 sources=question["sources"], json_path=path)
+                            for path, _, question, subject in group]
+        }
+    return clusters, cluster_ids
+
+def tag_subject_files(occurrences, roots, cluster_ids):
+    """
+    Add the 'cluster_id' of every question to the subject JSON files.
+    """
+    by_path = {}
+    for (path, position, _, _), root in zip(occurrences, roots):
+        by_path.setdefault(path, {})[position] = cluster_ids[root]
+    for path, positions in by_path.items():
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for position, cluster_id in positions.items():
+            data["questions"][position]["cluster_id"] = cluster_id
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+def run(json_dir, clusters_path=CLUSTERS_PATH, threshold=SIMILARITY_THRESHOLD, workers=MAX_WORKERS, tag=True):
+    """
+    Cluster the unique questions of every subject JSON under json_dir
+    across subjects, semesters and branches, write the clusters to
+    clusters_path and (with tag) the cluster ids into the subject files.
+    Returns the clusters.
+    """
+    start = time.perf_counter()
+    occurrences = load_occurrences(json_dir)
+    roots, edge_count, comparisons = cluster_questions([occurrence[2]["question"] for occurrence in occurrences],
+                                                       threshold, workers)
+    clusters, cluster_ids = build_clusters(occurrences, roots)
+    output = {"threshold": threshold, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "clusters": clusters}
+    tmp_path = f"{clusters_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, clusters_path)
+    if tag:
+        tag_subject_files(occurrences, roots, cluster_ids)
+    shared = sum(1 for cluster in clusters.values() if cluster["subjects"] > 1)
+    print(f"{len(occurrences)} questions in {len(clusters)} clusters ({shared} span several subjects); "
+          f"{edge_count} similar pairs from {comparisons} comparisons in {time.perf_counter() - start:.1f}s")
+    return clusters
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster questions across all subjects.")
+    parser.add_argument("--json-dir", default=config.JSON_DIR, help="Subject JSON files written by main.py")
+    parser.add_argument("--output", default=CLUSTERS_PATH, help="Where to write the cluster mapping")
+    parser.add_argument("--threshold", type=int, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--no-tag", action="store_true", help="Leave the subject JSON files unchanged")
+    args = parser.parse_args()
+    run(args.json_dir, args.output, args.threshold, args.workers, tag=not args.no_tag)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import os
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+LOCAL_ROOT = config.SORTED_ROOT
+TREE_PATH = config.SORTED_TREE_PATH
+CSV_PATH = config.SORTED_CSV_PATH
+INDEX_PATH = "local_index.json"
+INDEX_WORKERS = 8  # Threads scanning top-level subtrees; directory reads mostly wait on storage
+
+CSV_HEADER = ["Department", "Branch", "Semester", "Subject", "FullPath"]
+
+
+def scan_dir(path):
+    """
+    Lists one directory with os.scandir, in the order the file system
+    returns it. Types come from the cached d_type, size and mtime from one
+    stat per entry. Returns a list of {"name", "type", "size", "mtime"}
+    dicts ("link": True marks symlinked directories), or None if the
+    directory cannot be read.
+    """
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                    stat = entry.stat()
+                except OSError:
+                    # A broken symlink: os.walk lists it as a file too
+                    is_dir, stat = False, None
+                item = {"name": entry.name, "type": "dir" if is_dir else "file",
+                        "size": stat.st_size if stat and not is_dir else None,
+                        "mtime": stat.st_mtime if stat else None}
+                if is_dir and entry.is_symlink():
+                    item["link"] = True
+                entries.append(item)
+    except OSError:
+        return None
+    return entries
+
+def list_or_reuse(path, relative, mtime, previous_dirs):
+    """
+    The entries of one directory: reused from previous_dirs when its mtime
+    is unchanged, listed otherwise. Returns (entries, {subdirectory name:
+    mtime} for the subdirectories that were stat'ed while listing, number
+    of directories listed).
+    """
+    old = previous_dirs.get(relative)
+    if old is not None and mtime is not None and old["mtime"] == mtime:
+        return old["entries"], {}, 0
+    entries = scan_dir(path)
+    if entries is None:
+        return None, {}, 1
+    return entries, {entry["name"]: entry["mtime"] for entry in entries if entry["type"] == "dir"}, 1
+
+def scan_tree(root, relative, previous_dirs, dirs, mtime=None):
+    """
+    Scans root/relative and everything below it into dirs ({relative path:
+    {"mtime", "entries"}}). Directories whose mtime matches previous_dirs
+    are not listed again, but their subdirectories are still checked with
+    one stat each. Symlinked directories are listed, not followed.
+    Returns the number of directories listed.
+    """
+    path = os.path.join(root, relative)
+    if mtime is None:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return 0
+    entries, subdir_mtimes, listed = list_or_reuse(path, relative, mtime, previous_dirs)
+    if entries is None:
+        # Unreadable: recorded empty and without mtime, so it is retried next time
+        dirs[relative] = {"mtime": None, "entries": []}
+        return listed
+    dirs[relative] = {"mtime": mtime, "entries": entries}
+    for entry in entries:
+        if entry["type"] == "dir" and not entry.get("link"):
+            listed += scan_tree(root, os.path.join(relative, entry["name"]), previous_dirs, dirs,
+                                subdir_mtimes.get(entry["name"]))
+    return listed
+
+def build_index(root=LOCAL_ROOT, previous=None, workers=INDEX_WORKERS):
+    """
+    Scans root in one pass and returns (index, directories listed), where
+    index is {"root", "created", "dirs": {relative path: {"mtime",
+    "entries"}}} ("" is root itself). The subtrees below root are scanned
+    by a pool of threads. With a previous index only directories whose
+    mtime changed are listed again; a file overwritten in place keeps its
+    directory's mtime, so rebuild fully now and then.
+    """
+    previous_dirs = previous["dirs"] if previous and previous.get("root") == root else {}
+    mtime = os.stat(root).st_mtime
+    entries, subdir_mtimes, listed = list_or_reuse(root, "", mtime, previous_dirs)
+    dirs = {"": {"mtime": mtime if entries is not None else None, "entries": entries or []}}
+
+    subtrees = [entry["name"] for entry in entries or [] if entry["type"] == "dir" and not entry.get("link")]
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        scans = []
+        for name in subtrees:
+            subtree_dirs = {}
+            future = executor.submit(scan_tree, root, name, previous_dirs, subtree_dirs, subdir_mtimes.get(name))
+            scans.append((subtree_dirs, future))
+        for subtree_dirs, future in scans:
+            listed += future.result()
+            dirs.update(subtree_dirs)
+    return {"root": root, "created": time.time(), "dirs": dirs}, listed
+
+def load_index(path=INDEX_PATH):
+    """
+    Returns the index stored at path, or None if there is none yet.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_index(index, path=INDEX_PATH):
+    """
+    Writes the index atomically. It is written compact: one json.dumps call
+    without indent runs in the C encoder, several times faster than
+    json.dump with indent for a tree of thousands of directories.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+    os.replace(tmp_path, path)
+
+def write_tree(index, out_file, relative="", prefix=""):
+    """
+    Writes the tree below relative in the folder_structure.txt format:
+    entries sorted by name, directories marked with a trailing "/".
+    """
+    items = sorted(index["dirs"].get(relative, {"entries": []})["entries"], key=lambda entry: entry["name"])
+    for position, entry in enumerate(items):
+        is_dir = entry["type"] == "dir"
+        last = position == len(items) - 1
+        connector = "└── " if last else "├── "
+        out_file.write(prefix + connector + entry["name"] + ("/" if is_dir else "") + "\n")
+        if is_dir:
+            write_tree(index, out_file, os.path.join(relative, entry["name"]), prefix + ("    " if last else "│   "))
+
+def write_tree_file(index, path=TREE_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Folder Structure for {index['root']}\n")
+        f.write("=" * 40 + "\n")
+        write_tree(index, f)
+
+def iter_files(index, relative=""):
+    """
+    Yields the relative path of every file, in os.walk order: a directory's
+    files, then its subdirectories, each in listing order.
+    """
+    entries = index["dirs"].get(relative, {"entries": []})["entries"]
+    for entry in entries:
+        if entry["type"] == "file":
+            yield os.path.join(relative, entry["name"])
+    for entry in entries:
+        if entry["type"] == "dir" and not entry.get("link"):
+            yield from iter_files(index, os.path.join(relative, entry["name"]))
+
+def extract_details(full_path):
+    """
+    Extracts department, branch, semester, and subject from the given file path.
+    Assumes the folder structure: Department -> Branch -> Semester -> Subject -> PDF files.
+    """
+    parts = full_path.split(os.sep)
+    parts = [p for p in parts if p]  # Remove empty parts
+
+    if len(parts) < 4:
+        return None  # Ensure valid folder structure
+
+    department, branch, semester, subject_file = parts[:4]
+    subject = os.path.splitext(subject_file)[0]  # Remove .pdf extension safely
+
+    return [department, branch, semester, subject, full_path]
+
+def csv_rows(index):
+    """
+    The sorted_pdfs.csv rows of every PDF in the index, sorted by
+    Department, Branch, Semester and Subject.
+    """
+    rows = []
+    for relative_path in iter_files(index):
+        if relative_path.lower().endswith(".pdf"):
+            details = extract_details(relative_path)
+            if details:
+                rows.append(details)
+    rows.sort(key=lambda x: (x[0].lower(), x[1].lower(), x[2].lower(), x[3].lower()))
+    return rows
+
+def write_csv(rows, path=CSV_PATH):
+    with open(path, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+
+def run(root=LOCAL_ROOT, tree_path=TREE_PATH, csv_path=CSV_PATH, index_path=INDEX_PATH, full=False,
+        workers=INDEX_WORKERS):
+    """
+    Indexes root (incrementally against index_path unless full) and writes
+    whichever of the tree text, the CSV and the index have a path.
+    Returns (index, rows, directories listed).
+    """
+    previous = None if full or not index_path else load_index(index_path)
+    index, listed = build_index(root, previous, workers)
+    rows = csv_rows(index)
+    if tree_path:
+        write_tree_file(index, tree_path)
+    if csv_path:
+        write_csv(rows, csv_path)
+    if index_path:
+        write_index(index, index_path)
+    return index, rows, listed
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the sorted PDF tree: folder structure, CSV and manifest.")
+    parser.add_argument("--root", default=LOCAL_ROOT)
+    parser.add_argument("--tree", default=TREE_PATH, help="Folder structure text output")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV output for main.py")
+    parser.add_argument("--index", default=INDEX_PATH, help="Index (manifest) with size and mtime of every entry")
+    parser.add_argument("--full", action="store_true", help="List every directory instead of only changed ones")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, rows, listed = run(args.root, args.tree, args.csv, args.index, args.full, args.workers)
+    print(f"Indexed {len(index['dirs'])} directories ({listed} listed) and {len(rows)} PDFs "
+          f"in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
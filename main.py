@@ -1,134 +1,251 @@
 import os
-import re
 import shutil
-import tempfile
-import cv2
-import pdfplumber
-import pytesseract
-from pdf2image import convert_from_path
-import pandas as pd
-from fuzzywuzzy import fuzz
+import signal
+import time
+import argparse
+from dedup import QuestionIndex, SIMILARITY_THRESHOLD
+import extraction_cache
+from run_manifest import RunManifest, MANIFEST_PATH, subject_id
+import ocr
+import metrics
+import diagrams
+import segmenter
+import page_triage
+import question_store
+import search_index
+import global_dedup
+import config
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 import logging
 import json  
 
 
-SIMILARITY_THRESHOLD = 85
-CSV_PATH = "sorted_pdfs.csv"  
-INPUT_DIR = "sorted_pdfs"   
-OUTPUT_JSON_DIR = "sorted_json"  
+CSV_PATH = config.SORTED_CSV_PATH
+INPUT_DIR = config.SORTED_ROOT
+OUTPUT_JSON_DIR = config.JSON_DIR
+CSV_CHUNK_SIZE = 1000  # Rows read from CSV_PATH at a time
 
 
 TESSERACT_CONFIG = "--oem 3 --psm 6"
+OCR_DPI = 200          # Highest resolution pages are rendered at for OCR
+OCR_MIN_DPI = 150      # Lowest; scans are rendered at their own resolution in between
+OCR_PREPROCESS = True  # Deskew rendered pages before OCR (see page_triage.prepare_for_ocr)
+OCR_BATCH_PAGES = 4    # Most pages rendered by one poppler call (bounds memory)
+OCR_BACKEND = ocr.OCR_BACKEND
+OCR_THREADS = 1        # Threads OCR'ing the pages of a batch in each worker (tesserocr pools this many handles)
+
+# Parallel extraction settings
+MAX_WORKERS = os.cpu_count() or 1  # Worker processes used by main(); 1 runs serially
+PDF_TIMEOUT = 600                  # Seconds allowed per PDF before it is marked failed
+MAX_ATTEMPTS = 2                   # Tries per PDF when a worker process dies
+
+# Extraction cache settings
+USE_CACHE = True
+CACHE_PATH = extraction_cache.CACHE_PATH
+CACHE_MAX_BYTES = extraction_cache.CACHE_MAX_BYTES
+
+# Diagram settings (off by default; diagrams.py can also run as its own stage)
+EXTRACT_DIAGRAMS = False
+DIAGRAM_STORE = diagrams.DIAGRAM_STORE
+
+_cache_conn = None
+_cache_pid = None
+
+# Settings copied into worker processes, which may be spawned rather than forked
+WORKER_SETTINGS = ["INPUT_DIR", "TESSERACT_CONFIG", "OCR_DPI", "OCR_MIN_DPI", "OCR_PREPROCESS", "OCR_BATCH_PAGES",
+                   "OCR_BACKEND", "OCR_THREADS",
+                   "PDF_TIMEOUT", "USE_CACHE", "CACHE_PATH", "EXTRACT_DIAGRAMS", "DIAGRAM_STORE"]
 
 logging.basicConfig(filename='paperiq.log', level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s'
+                    format='%(asctime)s - %(levelname)s - %(message)s')
 
-def extract_text_from_pdf(pdf_path):
+
+class PDFTimeoutError(BaseException):
+    """
+    Raised inside a worker when a single PDF exceeds PDF_TIMEOUT. Not an
+    Exception, so the "except Exception" of a stage or library it
+    interrupts cannot swallow it.
+    """
+
+def low_text_page_batches(page_numbers, batch_size=None):
+    """
+    Group page numbers into (first_page, last_page) ranges of consecutive
+    pages, at most batch_size pages each, so each range is rendered by one
+    poppler call without holding too many page images at once.
     """
-    Extract text using pdfplumber. For pages with minimal text,
-    fall back to OCR using pdf2image and pytesseract.
-    Also attempts to extract images (diagrams) from the PDF.
+    batch_size = batch_size or OCR_BATCH_PAGES
+    batches = []
+    for number in sorted(page_numbers):
+        if batches and number == batches[-1][1] + 1 and number - batches[-1][0] < batch_size:
+            batches[-1][1] = number
+        else:
+            batches.append([number, number])
+    return [tuple(batch) for batch in batches]
+
+def ocr_image(img, decision, dpi):
+    """
+    OCR one rendered page: the regions of its Triage decision, or all of it
+    without one. Returns the text of the regions, one per line block.
+    """
+    parts = []
+    for region in page_triage.crop_regions(img, decision.regions if decision else None, dpi):
+        if OCR_PREPROCESS:
+            with metrics.timer("ocr_preprocess"):
+                region = page_triage.prepare_for_ocr(region)
+        with metrics.timer("ocr"):
+            parts.append(ocr.image_to_string(region, OCR_BACKEND, TESSERACT_CONFIG, OCR_THREADS))
+    return "\n".join(parts)
+
+def ocr_pages(pdf_path, page_numbers, decisions=None):
+    """
+    Render the given (1-based) pages in batches and OCR them in memory with
+    the OCR_BACKEND of this process. decisions ({page_number: Triage}, see
+    page_triage.classify_page) give each page's resolution and the regions
+    to OCR; pages without one are OCR'd whole at OCR_DPI. With
+    OCR_PREPROCESS the images are deskewed first. The pages
+    of a batch are OCR'd by OCR_THREADS threads.
+    Returns {page_number: text} for every page that could be rendered.
     """
-    full_text = ""
-    images_for_diagrams = [] 
+    decisions = decisions or {}
+    by_dpi = defaultdict(list)
+    for page_number in page_numbers:
+        decision = decisions.get(page_number)
+        by_dpi[decision.dpi if decision else OCR_DPI].append(page_number)
+
+    texts = {}
+    for dpi, dpi_pages in sorted(by_dpi.items()):
+        for first_page, last_page in low_text_page_batches(dpi_pages):
+            logging.info(f"Performing OCR for pages {first_page}-{last_page} of {pdf_path} at {dpi} dpi")
+            with metrics.timer("rasterize"):
+                from pdf2image import convert_from_path
+                pil_images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+            numbers = range(first_page, last_page + 1)
+            with ThreadPoolExecutor(max_workers=max(OCR_THREADS, 1)) as executor:
+                page_texts = executor.map(ocr_image, pil_images, [decisions.get(n) for n in numbers],
+                                          [dpi] * len(pil_images))
+                texts.update(zip(numbers, page_texts))
+            del pil_images
+    return texts
+
+def extract_pages_from_pdf(pdf_path):
+    """
+    Extract text page by page using pdfplumber. Each page is routed by
+    page_triage.classify_page: its text layer alone, OCR of the whole page,
+    or (hybrid) the text layer plus OCR of its scanned regions. Pages to OCR
+    are collected first and then rasterized in batches (see ocr_pages); an
+    OCR page that could not be OCR'd keeps whatever its text layer had.
+    Diagrams are a separate stage (see diagrams.py).
+    Returns (pages, complete) where pages is a list of dicts with 'page',
+    'text', 'ocr' and 'route', and complete is False if an error cut the
+    extraction short.
+    """
+    import pdfplumber
+    page_texts = {}
+    decisions = {}
+    routes = {}
+    complete = True
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
+        with metrics.timer("pdfplumber"), pdfplumber.open(pdf_path) as pdf:
             for i, page in enumerate(pdf.pages):
                 page_text = page.extract_text()
-                if not page_text or len(page_text.strip()) < 20:
-                    logging.info(f"Performing OCR for page {i+1} of {pdf_path}")
-                    pil_images = convert_from_path(pdf_path, first_page=i+1, last_page=i+1)
-                    if pil_images:
-                        img = pil_images[0]
-                        tmp_img_path = os.path.join(tempfile.gettempdir(), f"page_{i+1}.png")
-                        img.save(tmp_img_path, "PNG")
-                        ocr_text = pytesseract.image_to_string(tmp_img_path, config=TESSERACT_CONFIG)
-                        full_text += "\n" + ocr_text
-                        images_for_diagrams.append(tmp_img_path)
-                    else:
-                        logging.warning(f"Failed to convert page {i+1} to image.")
-                else:
-                    full_text += "\n" + page_text
-                    if "images" in page.objects:
-                        for img_obj in page.images:
-                            try:
-                                cropped = page.crop((img_obj["x0"], img_obj["top"],
-                                                     img_obj["x1"], img_obj["bottom"]))
-                                tmp_img_path = os.path.join(
-                                    tempfile.gettempdir(), 
-                                    f"{os.path.basename(pdf_path)}_page_{i+1}_img.png"
-                                )
-                                cropped.to_image().save(tmp_img_path, format="PNG")
-                                images_for_diagrams.append(tmp_img_path)
-                            except Exception as e:
-                                logging.error(f"Error extracting image on page {i+1}: {e}")
-        logging.info(f"Extracted text from {pdf_path}:\n{full_text}")
+                with metrics.timer("triage"):
+                    decision = page_triage.classify_page(page, page_text, OCR_DPI, OCR_MIN_DPI)
+                routes[i + 1] = decision.route
+                if decision.route != "text":
+                    decisions[i + 1] = decision
+                page_texts[i + 1] = page_text
+        ocr_texts = {}
+        if decisions:
+            ocr_texts = ocr_pages(pdf_path, sorted(decisions), decisions)
     except Exception as e:
         logging.error(f"Error processing {pdf_path}: {e}")
-    return full_text, images_for_diagrams
+        ocr_texts = {}
+        complete = False
+
+    pages = []
+    for page_number, route in sorted(routes.items()):
+        if route == "hybrid" and page_number in ocr_texts:
+            pages.append({"page": page_number, "text": page_texts[page_number] + "\n" + ocr_texts[page_number],
+                          "ocr": True, "route": route})
+        elif page_number in ocr_texts:
+            pages.append({"page": page_number, "text": ocr_texts[page_number], "ocr": True, "route": route})
+        elif route != "ocr" or (page_texts[page_number] or "").strip():
+            if route == "ocr" and complete:
+                logging.warning(f"Failed to convert page {page_number} to image; using its text layer.")
+            pages.append({"page": page_number, "text": page_texts[page_number], "ocr": False, "route": route})
+        elif complete:
+            logging.warning(f"Failed to convert page {page_number} to image.")
+    metrics.count("pages", len(pages))
+    metrics.count("ocr_pages", sum(1 for page in pages if page["ocr"]))
+    for route in ("text", "ocr", "hybrid"):
+        metrics.count(f"{route}_route_pages", sum(1 for page_route in routes.values() if page_route == route))
+    return pages, complete
 
-def extract_subquestions(question_block):
+def join_pages(pages):
     """
-    Split a question block into subquestions if markers such as (a), (b), etc. are present.
-    The regex looks for markers at the beginning of a line.
+    Concatenate page texts the way the extracted text has always been built.
     """
-    subpattern = r'(?m)^\s*\(([a-zivx]+)\)'
-    parts = re.split(subpattern, question_block)
-    if len(parts) <= 1:
-        return [question_block.strip()]
-    else:
-        subquestions = []    
-        header = parts[0].strip()
-        for i in range(1, len(parts), 2):
-            marker = parts[i].strip()
-            content = parts[i+1].strip() if (i+1) < len(parts) else ""
-            full_text = f"({marker}) {content}"
-            subquestions.append(full_text)
-        if header:
-            subquestions.insert(0, header)
-        return subquestions
+    return "".join("\n" + page["text"] for page in pages)
+
+def extract_text_from_pdf(pdf_path):
+    """
+    Extract the full text of a PDF (see extract_pages_from_pdf).
+    """
+    pages, _ = extract_pages_from_pdf(pdf_path)
+    full_text = join_pages(pages)
+    logging.debug(f"Extracted text from {pdf_path}:\n{full_text}")
+    return full_text
 
 def extract_questions(text):
     """
-    Extract full question blocks from the text and then further split into subquestions.
-    It matches from a line that starts with a question number (e.g., "1.") until the next such line or end of text.
+    Split the text into questions and subquestions with the single-pass
+    segmenter (see segmenter.py). A question runs from a line that starts
+    with a question number ("1.", "1)", "Q1") to the next one; subquestion
+    markers such as (a), (ii) or b) at line starts split it further.
     """
-    pattern = r'(?sm)^\s*\d+\.\s*(.*?)(?=^\s*\d+\.\s*|\Z)'
-    blocks = re.findall(pattern, text)
-    all_questions = []
-    for block in blocks:
-        subqs = extract_subquestions(block)
-        all_questions.extend(subqs)
-    logging.info(f"Extracted questions: {all_questions}")
+    with metrics.timer("extract_questions"):
+        all_questions = [segmenter.question_text(segment) for segment in segmenter.iter_segments(text)]
+    metrics.count("questions_extracted", len(all_questions))
+    logging.debug(f"Extracted questions: {all_questions}")
     return all_questions
 
 def deduplicate_questions_with_source(question_source_list):
     """
     Deduplicate questions using fuzzy matching while preserving source PDF names.
+    Each question is merged into the first earlier unique question with a
+    token_set_ratio of at least SIMILARITY_THRESHOLD; a QuestionIndex narrows
+    the unique questions that need to be scored.
     Input: list of tuples (question_text, source_pdf_filename)
     Returns: list of dicts with keys 'question', 'sources', and 'count'.
     """
     unique_qs = []
-    for question, source in question_source_list:
-        merged = False
-        for uq in unique_qs:
-            similarity = fuzz.token_set_ratio(question, uq['question'])
-            if similarity >= SIMILARITY_THRESHOLD:
+    index = QuestionIndex()
+    with metrics.timer("dedup"):
+        for question, source in question_source_list:
+            position = index.find_match(question, SIMILARITY_THRESHOLD)
+            if position is not None:
+                uq = unique_qs[position]
                 if source not in uq['sources']:
                     uq['sources'].append(source)
                 uq['count'] += 1
-                merged = True
-                break
-        if not merged:
-            unique_qs.append({'question': question, 'sources': [source], 'count': 1})
-    logging.info(f"Unique questions after deduplication: {unique_qs}")
+            else:
+                index.add(question)
+                unique_qs.append({'question': question, 'sources': [source], 'count': 1})
+    metrics.count("dedup_questions", len(question_source_list))
+    metrics.count("dedup_unique", len(unique_qs))
+    metrics.count("dedup_comparisons", index.comparisons)
+    logging.info(f"{len(unique_qs)} unique of {len(question_source_list)} questions after deduplication")
+    logging.debug(f"Unique questions after deduplication: {unique_qs}")
     return unique_qs
 
-def save_to_json(department, branch, semester, subject, unique_questions):
+def save_to_json(department, branch, semester, subject, unique_questions, diagram_refs=None):
     """
-    Save unique questions and their metadata to a JSON file.
+    Save unique questions and their metadata to a JSON file, with the
+    subject's diagram references (by hash into DIAGRAM_STORE) when given.
+    Returns the path of the file written.
     """
     out_dir = os.path.join(OUTPUT_JSON_DIR, department, branch, str(semester), subject)
     ensure_directory(out_dir)
@@ -140,15 +257,77 @@ def save_to_json(department, branch, semester, subject, unique_questions):
         "Subject": subject,
         "questions": unique_questions
     }
-    with open(json_file_path, 'w', encoding='utf-8') as f:
+    if diagram_refs is not None:
+        data["diagrams"] = diagram_refs
+    with metrics.timer("save_to_json"), open(json_file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
     logging.info(f"Saved JSON file for {subject} at {json_file_path}")
+    return json_file_path
+
+def extraction_config(ocr_backend):
+    """
+    Settings that change the extracted text; part of the cache key.
+    ocr_backend is the name of the OCR backend in use (ocr.backend_name).
+    """
+    return json.dumps({"tesseract": TESSERACT_CONFIG, "ocr_dpi": OCR_DPI, "ocr_min_dpi": OCR_MIN_DPI,
+                       "ocr_preprocess": OCR_PREPROCESS, "triage": page_triage.TRIAGE_VERSION,
+                       "ocr_backend": ocr_backend, "segmenter": segmenter.SEGMENTER_VERSION}, sort_keys=True)
+
+def get_cache():
+    """
+    Returns this process's connection to the extraction cache, or None when
+    caching is off. Connections are opened lazily so forked workers never
+    share one.
+    """
+    global _cache_conn, _cache_pid
+    if not USE_CACHE:
+        return None
+    if _cache_conn is None or _cache_pid != os.getpid():
+        _cache_conn = extraction_cache.open_cache(CACHE_PATH)
+        _cache_pid = os.getpid()
+    return _cache_conn
+
+def extract_questions_cached(pdf_path):
+    """
+    Extract and split the questions of one PDF, reusing the cached result
+    when the same file contents were extracted with the same settings.
+    Returns a dict with 'questions', 'pages' (page count) and
+    'ocr_pages' (pages that needed OCR) and 'error' (None unless the
+    extraction was cut short).
+    """
+    conn = get_cache() if os.path.exists(pdf_path) else None
+    if conn is not None:
+        pdf_hash = extraction_cache.file_hash(conn, pdf_path)
+        config = extraction_config(ocr.backend_name(OCR_BACKEND, TESSERACT_CONFIG))
+        key = extraction_cache.cache_key(pdf_hash, config)
+        cached = extraction_cache.lookup(conn, key)
+        if cached is not None:
+            logging.info(f"Cache hit for {pdf_path}")
+            metrics.count("cache_hits")
+            pages = cached["pages"]
+            return {"questions": cached["questions"], "error": None,
+                    "pages": len(pages), "ocr_pages": sum(1 for page in pages if page["ocr"])}
+        metrics.count("cache_misses")
+
+    with metrics.timer("extract_pages"):
+        pages, complete = extract_pages_from_pdf(pdf_path)
+    text = join_pages(pages)
+    logging.debug(f"Extracted text from {pdf_path}:\n{text}")
+    questions = extract_questions(text)
+    if conn is not None and complete:
+        # Diagrams live in their own content-addressed store (diagrams.py)
+        extraction_cache.store(conn, key, pdf_hash, pdf_path, config,
+                               pages, questions, [])
+    return {"questions": questions,
+            "error": None if complete else "extraction incomplete, see paperiq.log",
+            "pages": len(pages), "ocr_pages": sum(1 for page in pages if page["ocr"])}
 
 def process_pdf_record(pdf_record):
     """
     Process a single PDF record.
     Expected CSV columns: Department, Branch, Semester, Subject, FullPath.
-    Returns a dict with metadata, list of (question, source_pdf_filename) tuples, and diagrams.
+    Returns a dict with metadata, list of (question, source_pdf_filename) tuples, diagram
+    references (only with EXTRACT_DIAGRAMS) and page counts.
     """
     pdf_rel_path = pdf_record["FullPath"].replace("\\", os.sep)
     pdf_path = os.path.join(INPUT_DIR, pdf_rel_path)
@@ -158,10 +337,17 @@ def process_pdf_record(pdf_record):
     subject = pdf_record["Subject"]
 
     logging.info(f"Processing: {pdf_path}")
-    text, diagrams = extract_text_from_pdf(pdf_path)
-    questions = extract_questions(text)
+    extracted = extract_questions_cached(pdf_path)
+    questions = extracted["questions"]
     pdf_filename = os.path.basename(pdf_path)
     question_source_list = [(q, pdf_filename) for q in questions]
+    diagram_refs = []
+    if EXTRACT_DIAGRAMS and os.path.exists(pdf_path):
+        try:
+            with metrics.timer("diagrams"):
+                diagram_refs = diagrams.extract_diagrams_cached(pdf_path, DIAGRAM_STORE)
+        except Exception as e:
+            logging.error(f"Error extracting diagrams from {pdf_path}: {e}")
     
     return {
         "Department": department,
@@ -169,29 +355,381 @@ def process_pdf_record(pdf_record):
         "Semester": semester,
         "Subject": subject,
         "questions": question_source_list,
-        "diagrams": diagrams,
-        "pdf_path": pdf_path
+        "diagrams": diagram_refs,
+        "pages": extracted["pages"],
+        "ocr_pages": extracted["ocr_pages"],
+        "pdf_path": pdf_path,
+        "FullPath": pdf_record["FullPath"],
+        "error": extracted["error"]
     }
 
 def ensure_directory(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
-def main():
-    df = pd.read_csv(CSV_PATH)
-    subject_records = defaultdict(lambda: {"questions": [], "diagrams": []})
-    for _, row in df.iterrows():
-        record = process_pdf_record(row)
-        key = (record["Department"], record["Branch"], record["Semester"], record["Subject"])
-        subject_records[key]["questions"].extend(record["questions"])
-        subject_records[key]["diagrams"].extend(record["diagrams"])
-    
-    for (dept, branch, sem, subject), data in subject_records.items():
-        unique_questions = deduplicate_questions_with_source(data["questions"])
-        unique_questions = sorted(unique_questions, key=lambda x: x['count'], reverse=True)
-        save_to_json(dept, branch, sem, subject, unique_questions)
+def _timeout_handler(signum, frame):
+    raise PDFTimeoutError(f"PDF processing exceeded {PDF_TIMEOUT} seconds")
+
+def failed_pdf_record(pdf_record, error):
+    """
+    Build an empty result for a PDF that could not be processed, so that
+    one bad file never stops the rest of the batch.
+    """
+    pdf_rel_path = pdf_record["FullPath"].replace("\\", os.sep)
+    return {
+        "Department": pdf_record["Department"],
+        "Branch": pdf_record["Branch"],
+        "Semester": pdf_record["Semester"],
+        "Subject": pdf_record["Subject"],
+        "questions": [],
+        "diagrams": [],
+        "pages": 0,
+        "ocr_pages": 0,
+        "pdf_path": os.path.join(INPUT_DIR, pdf_rel_path),
+        "FullPath": pdf_record["FullPath"],
+        "error": str(error)
+    }
+
+def run_pdf_record(pdf_record):
+    """
+    Run process_pdf_record with a PDF_TIMEOUT alarm (where SIGALRM exists).
+    Any exception is logged and turned into an empty, failed record, and so
+    is a PDF that still ran past PDF_TIMEOUT (code that catches even
+    BaseException can hold the alarm off).
+    The wall time spent is stored in the record's 'duration', and the
+    stage metrics of this PDF in its 'metrics' (see metrics.collect).
+    """
+    start = time.perf_counter()
+    use_alarm = PDF_TIMEOUT and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _timeout_handler)
+        signal.alarm(PDF_TIMEOUT)
+    with metrics.collect() as pdf_metrics:
+        try:
+            record = process_pdf_record(pdf_record)
+        except (Exception, PDFTimeoutError) as e:
+            logging.error(f"Failed to process {pdf_record['FullPath']}: {e}")
+            record = failed_pdf_record(pdf_record, e)
+        finally:
+            if use_alarm:
+                signal.alarm(0)
+                signal.signal(signal.SIGALRM, previous_handler)
+        if PDF_TIMEOUT and record["error"] is None and time.perf_counter() - start > PDF_TIMEOUT:
+            error = PDFTimeoutError(f"PDF processing exceeded {PDF_TIMEOUT} seconds")
+            logging.error(f"Failed to process {pdf_record['FullPath']}: {error}")
+            record = failed_pdf_record(pdf_record, error)
+        record["duration"] = time.perf_counter() - start
+        pdf_metrics.observe("pdf", record["duration"])
+    record["metrics"] = pdf_metrics.as_dict()
+    return record
+
+def _init_worker(settings):
+    globals().update(settings)
+
+def _new_executor(workers, mp_context=None):
+    settings = {name: globals()[name] for name in WORKER_SETTINGS}
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                               initializer=_init_worker, initargs=(settings,))
+
+def iter_processed_records(pdf_records, workers=MAX_WORKERS, mp_context=None):
+    """
+    Process PDF records and yield (index, result) pairs, where index is the
+    position of the record in pdf_records.
+    With workers > 1 the records are fanned out over a process pool and
+    results are yielded as they finish (not in input order). At most
+    2 * workers records are in flight, so pdf_records may be a lazy iterator.
+    If a worker process dies the pool is rebuilt and the records that were in
+    flight are retried one by one, up to MAX_ATTEMPTS times each.
+    mp_context selects how worker processes start; callers that run other
+    threads should pass a forkserver or spawn context rather than fork.
+    """
+    pending = iter(enumerate(pdf_records))
+    if workers <= 1:
+        for index, pdf_record in pending:
+            yield index, run_pdf_record(pdf_record)
+        return
+
+    executor = _new_executor(workers, mp_context)
+    in_flight = {}
+    retry = []
+    attempts = defaultdict(int)
+    try:
+        while True:
+            while len(in_flight) < workers * 2:
+                if retry:
+                    # Retry one record at a time so a crash is pinned on the right PDF
+                    if in_flight:
+                        break
+                    index, pdf_record = retry.pop()
+                else:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    index, pdf_record = item
+                attempts[index] += 1
+                future = executor.submit(run_pdf_record, pdf_record)
+                in_flight[future] = (index, pdf_record)
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            pool_broken = False
+            for future in done:
+                index, pdf_record = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    pool_broken = True
+                    if attempts[index] < MAX_ATTEMPTS:
+                        retry.append((index, pdf_record))
+                        continue
+                    logging.error(f"Worker crashed on {pdf_record['FullPath']}, giving up")
+                    result = failed_pdf_record(pdf_record, "worker process crashed")
+                except Exception as e:
+                    logging.error(f"Failed to process {pdf_record['FullPath']}: {e}")
+                    result = failed_pdf_record(pdf_record, e)
+                del attempts[index]
+                yield index, result
+
+            if pool_broken:
+                logging.warning("Worker pool broke, restarting it")
+                retry.extend(in_flight.values())
+                in_flight.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = _new_executor(workers, mp_context)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def iter_csv_records(csv_path=None, chunksize=None):
+    """
+    Yield the rows of the PDF CSV (CSV_PATH by default) as dicts, reading
+    CSV_CHUNK_SIZE rows at a time. Columns are read as strings so a subject
+    key cannot change type between chunks.
+    """
+    import pandas as pd
+    for chunk in pd.read_csv(csv_path or CSV_PATH, chunksize=chunksize or CSV_CHUNK_SIZE, dtype=str):
+        yield from chunk.to_dict("records")
+
+def subject_key(record):
+    return (record["Department"], record["Branch"], record["Semester"], record["Subject"])
+
+def finish_subject(key, group, sinks=()):
+    """
+    Deduplicate and save the questions of one subject group, and hand them
+    to each extra output sink (question_store.QuestionStore,
+    search_index.SearchIndex).
+    Returns the JSON path and the number of unique questions.
+    """
+    dept, branch, sem, subject = key
+    # Restore CSV order so the greedy dedup matches a serial run
+    question_source_list = [q for _, qs in sorted(group["questions"], key=lambda x: x[0]) for q in qs]
+    unique_questions = deduplicate_questions_with_source(question_source_list)
+    unique_questions = sorted(unique_questions, key=lambda x: x['count'], reverse=True)
+    diagram_refs = None
+    if EXTRACT_DIAGRAMS:
+        diagram_refs = diagrams.subject_diagrams(
+            (source, refs) for _, source, refs in sorted(group["diagrams"], key=lambda x: x[0]))
+    json_path = save_to_json(dept, branch, sem, subject, unique_questions, diagram_refs)
+    for sink in sinks:
+        sink.add_subject(dept, branch, sem, subject, unique_questions)
+    return json_path, len(unique_questions)
+
+def output_sinks(parquet_dir=None, search_index_path=None):
+    """
+    The extra outputs finish_subject feeds besides the subject JSON files.
+    """
+    sinks = []
+    if parquet_dir:
+        sinks.append(question_store.QuestionStore(parquet_dir))
+    if search_index_path:
+        sinks.append(search_index.SearchIndex(search_index_path))
+    return sinks
+
+def record_metrics(record):
+    """
+    Merge the metrics a processed record carries into this process's run
+    totals and drop them from the record.
+    """
+    metrics.current().merge(record.pop("metrics", None) or {})
+    metrics.count("pdfs_failed" if record.get("error") else "pdfs_done")
+
+def profile_pdf(pdf_path, output=None):
+    """
+    Extract one PDF (without the cache) under a profiler and print the report
+    and the stage metrics.
+    """
+    global USE_CACHE
+    USE_CACHE = False
+    with metrics.collect() as pdf_metrics:
+        metrics.profile_call(extract_questions_cached, pdf_path, output=output)
+    print(json.dumps(pdf_metrics.summary(), indent=1))
+
+def extract_pdf(pdf_path):
+    """
+    Extract the questions of one PDF, wherever it is, without touching the
+    subject JSON files or the run manifest. Returns the dict of
+    extract_questions_cached with the path added.
+    """
+    extracted = extract_questions_cached(pdf_path)
+    if not os.path.exists(pdf_path):
+        extracted["error"] = "file not found"
+    return dict(extracted, pdf_path=pdf_path)
+
+def main(workers=MAX_WORKERS, stream=False, resume=False, manifest_path=MANIFEST_PATH,
+         metrics_path=metrics.METRICS_JSON_PATH, prometheus_path=metrics.METRICS_PROM_PATH, parquet_dir=None,
+         search_index_path=None, subjects=None):
+    """
+    Extract every PDF listed in CSV_PATH and write one JSON file per subject.
+    By default all subjects are written once every PDF is processed. With
+    stream=True the CSV must be sorted by subject: a subject is closed as
+    soon as the next one starts in the CSV, and it is deduplicated and saved
+    as soon as its last PDF finishes, so memory holds only the open subjects.
+    Progress is recorded in a RunManifest at manifest_path. With resume=True,
+    subjects the manifest lists as written without failed PDFs are skipped;
+    the rest are redone, with already finished PDFs served from the
+    extraction cache.
+    Stage timings and counters are written to metrics_path (JSON) and
+    prometheus_path (Prometheus text) at the end of the run.
+    With parquet_dir, the unique questions are also appended to the
+    Parquet question store there (see question_store.py), and with
+    search_index_path upserted into that search index (search_index.py).
+    With subjects (subject names, compared case-insensitively) only the
+    PDFs of those subjects are processed, and their progress is merged into
+    the existing manifest so the entries of the other subjects are kept.
+    """
+    groups = {}
+    wanted = {subject.strip().lower() for subject in subjects} if subjects else None
+    sinks = output_sinks(parquet_dir, search_index_path)
+    finished = set()
+    manifest = RunManifest(manifest_path, resume=resume or wanted is not None)
+    skip_subjects = manifest.subjects_to_skip() if resume else set()
+    if skip_subjects:
+        logging.info(f"Resuming: skipping {len(skip_subjects)} finished subjects")
+
+    def tracked_records():
+        current = None
+        for pdf_record in iter_csv_records():
+            key = subject_key(pdf_record)
+            if subject_id(key) in skip_subjects:
+                continue
+            if wanted is not None and str(pdf_record["Subject"]).strip().lower() not in wanted:
+                continue
+            if key != current:
+                if key in finished or (stream and key in groups):
+                    raise ValueError(f"{CSV_PATH} is not sorted by subject ({key} appears twice); "
+                                     "run without streaming")
+                if stream and current is not None:
+                    groups[current]["closed"] = True
+                current = key
+            group = groups.setdefault(key, {"questions": [], "diagrams": [], "pending": 0, "closed": False})
+            group["pending"] += 1
+            manifest.mark_pending(pdf_record["FullPath"], key)
+            yield pdf_record
+        for group in groups.values():
+            group["closed"] = True
+
+    def flush_ready():
+        for key in [key for key, group in groups.items() if group["closed"] and group["pending"] == 0]:
+            json_path, question_count = finish_subject(key, groups.pop(key), sinks)
+            manifest.mark_subject(key, json_path, question_count)
+            finished.add(key)
+
+    for index, record in iter_processed_records(tracked_records(), workers):
+        record_metrics(record)
+        manifest.mark_pdf(record["FullPath"], subject_key(record), record)
+        group = groups[subject_key(record)]
+        group["pending"] -= 1
+        group["questions"].append((index, record["questions"]))
+        group["diagrams"].append((index, os.path.basename(record["pdf_path"]), record["diagrams"]))
+        flush_ready()
+    flush_ready()
+    for sink in sinks:
+        sink.flush()
+    manifest.save(force=True)
+    logging.info(f"Run manifest: {manifest.counts()}")
     
+    conn = get_cache()
+    if conn is not None:
+        evicted = extraction_cache.evict(conn, CACHE_MAX_BYTES)
+        if evicted:
+            logging.info(f"Evicted {evicted} entries from the extraction cache")
+    metrics.current().write(metrics_path, prometheus_path)
+    logging.info(f"Metrics: {json.dumps(metrics.current().summary()['derived'])}")
     logging.info("Processing complete.")
 
+def main_cli(argv=None):
+    global USE_CACHE, OCR_DPI, OCR_MIN_DPI, OCR_PREPROCESS, OCR_BACKEND, OCR_THREADS, EXTRACT_DIAGRAMS, \
+        DIAGRAM_STORE
+    parser = argparse.ArgumentParser(description="Extract and deduplicate questions from sorted PDFs.")
+    parser.add_argument("--pdf", metavar="PATH",
+                        help="Only extract this PDF and print its questions as JSON (subject files are left alone)")
+    parser.add_argument("--subject", action="append", metavar="NAME",
+                        help="Only process the PDFs of this subject (repeatable)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="Number of worker processes (1 = serial)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-extract every PDF instead of using the extraction cache")
+    parser.add_argument("--ocr-dpi", type=int, default=OCR_DPI,
+                        help="Highest resolution pages are rendered at for OCR")
+    parser.add_argument("--ocr-min-dpi", type=int, default=OCR_MIN_DPI,
+                        help="Lowest resolution pages are rendered at for OCR")
+    parser.add_argument("--no-ocr-preprocess", action="store_true",
+                        help="Hand rendered pages to Tesseract without deskewing them")
+    parser.add_argument("--ocr-backend", choices=["auto", "tesserocr", "pytesseract"], default=OCR_BACKEND,
+                        help="OCR engine binding (tesserocr keeps Tesseract loaded between pages)")
+    parser.add_argument("--ocr-threads", type=int, default=OCR_THREADS,
+                        help="Threads OCR'ing the pages of a batch in each worker process")
+    parser.add_argument("--stream", action="store_true",
+                        help="Save each subject as soon as it is done (CSV must be sorted by subject)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip subjects finished by a previous run and retry failed PDFs")
+    parser.add_argument("--manifest", default=MANIFEST_PATH,
+                        help="Path of the per-PDF run manifest")
+    parser.add_argument("--metrics", default=metrics.METRICS_JSON_PATH,
+                        help="Where to write the JSON metrics summary")
+    parser.add_argument("--prometheus", default=metrics.METRICS_PROM_PATH,
+                        help="Where to write the metrics in Prometheus text format")
+    parser.add_argument("--profile-pdf", metavar="PDF",
+                        help="Profile the extraction of a single PDF (pyinstrument if installed, "
+                             "else cProfile) and exit")
+    parser.add_argument("--profile-output",
+                        help="Write the profile here (cProfile stats or pyinstrument text) instead of printing it")
+    parser.add_argument("--diagrams", action="store_true",
+                        help="Also store each PDF's diagrams in the image store and list them in the JSON")
+    parser.add_argument("--diagram-store", default=DIAGRAM_STORE,
+                        help="Directory of the content-addressed diagram store")
+    parser.add_argument("--parquet", nargs="?", const=question_store.STORE_DIR, metavar="DIR",
+                        help="Also append the unique questions to a partitioned Parquet dataset "
+                             f"(default {question_store.STORE_DIR})")
+    parser.add_argument("--search-index", nargs="?", const=search_index.INDEX_PATH, metavar="PATH",
+                        help="Also keep a searchable question index up to date "
+                             f"(default {search_index.INDEX_PATH}; query it with search_index.py)")
+    parser.add_argument("--global-dedup", action="store_true",
+                        help="Afterwards cluster questions across all subjects into "
+                             f"{global_dedup.CLUSTERS_PATH} and tag the subject JSON files")
+    parser.add_argument("--debug", action="store_true",
+                        help="Also log the full extracted text and question lists")
+    args = parser.parse_args(argv)
+    USE_CACHE = not args.no_cache
+    OCR_DPI = args.ocr_dpi
+    OCR_MIN_DPI = args.ocr_min_dpi
+    OCR_PREPROCESS = not args.no_ocr_preprocess
+    OCR_BACKEND = args.ocr_backend
+    OCR_THREADS = args.ocr_threads
+    EXTRACT_DIAGRAMS = args.diagrams
+    DIAGRAM_STORE = args.diagram_store
+    if args.debug:
+        logging.getLogger().setLevel(logging.DEBUG)
+    if args.profile_pdf:
+        profile_pdf(args.profile_pdf, args.profile_output)
+    elif args.pdf:
+        print(json.dumps(extract_pdf(args.pdf), indent=4, ensure_ascii=False))
+    else:
+        main(workers=args.workers, stream=args.stream, resume=args.resume, manifest_path=args.manifest,
+             metrics_path=args.metrics, prometheus_path=args.prometheus, parquet_dir=args.parquet,
+             search_index_path=args.search_index, subjects=args.subject)
+        if args.global_dedup:
+            global_dedup.run(OUTPUT_JSON_DIR, threshold=SIMILARITY_THRESHOLD, workers=args.workers)
+
 if __name__ == "__main__":
-    main()
+    main_cli()
@@ -0,0 +1,174 @@
+import time
+import json
+import threading
+from contextlib import contextmanager
+
+METRICS_JSON_PATH = "metrics.json"
+METRICS_PROM_PATH = "metrics.prom"
+METRICS_PREFIX = "paperiq"
+
+
+class Metrics:
+    """
+    Per-stage timings (call count, total and slowest seconds) and counters
+    such as pages, OCR pages and dedup comparisons. Safe to update from
+    several threads.
+    """
+
+    def __init__(self, data=None):
+        self.timings = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        if data:
+            self.merge(data)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timing = self.timings.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            timing["count"] += 1
+            timing["seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, data):
+        """
+        Add the timings and counters of another recorder's as_dict() output,
+        e.g. the metrics a worker process returned with its record.
+        """
+        with self._lock:
+            for name, timing in data.get("timings", {}).items():
+                own = self.timings.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+                own["count"] += timing["count"]
+                own["seconds"] += timing["seconds"]
+                own["max_seconds"] = max(own["max_seconds"], timing["max_seconds"])
+            for name, value in data.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        with self._lock:
+            return {"timings": {name: dict(timing) for name, timing in self.timings.items()},
+                    "counters": dict(self.counters)}
+
+    def summary(self):
+        """
+        as_dict() plus derived rates: pages per second of extraction, OCR
+        page ratio, dedup comparisons per question and cache hit ratio.
+        """
+        data = self.as_dict()
+        counters = data["counters"]
+        extract_seconds = data["timings"].get("extract_pages", {}).get("seconds", 0.0)
+        pages = counters.get("pages", 0)
+        lookups = counters.get("cache_hits", 0) + counters.get("cache_misses", 0)
+        derived = {
+            "pages_per_second": pages / extract_seconds if extract_seconds else None,
+            "ocr_page_ratio": counters.get("ocr_pages", 0) / pages if pages else None,
+            "dedup_comparisons_per_question": (counters.get("dedup_comparisons", 0) /
+                                               counters["dedup_questions"]
+                                               if counters.get("dedup_questions") else None),
+            "cache_hit_ratio": counters.get("cache_hits", 0) / lookups if lookups else None
+        }
+        return dict(data, derived=derived)
+
+    def to_prometheus(self, prefix=METRICS_PREFIX):
+        """
+        The summary in the Prometheus text exposition format.
+        """
+        summary = self.summary()
+        lines = [f"# TYPE {prefix}_stage_seconds_total counter",
+                 f"# TYPE {prefix}_stage_calls_total counter",
+                 f"# TYPE {prefix}_stage_max_seconds gauge"]
+        for name, timing in sorted(summary["timings"].items()):
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {timing["seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {timing["count"]}')
+            lines.append(f'{prefix}_stage_max_seconds{{stage="{name}"}} {timing["max_seconds"]:.6f}')
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in sorted(summary["derived"].items()):
+            if value is not None:
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=METRICS_JSON_PATH, prom_path=METRICS_PROM_PATH):
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(self.summary(), f, indent=1)
+        if prom_path:
+            with open(prom_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+
+
+_current = Metrics()
+
+def current():
+    """
+    The recorder timers and counters in this process write to.
+    """
+    return _current
+
+@contextmanager
+def timer(name):
+    """
+    Time the body of a with block as one call of the stage name.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current.observe(name, time.perf_counter() - start)
+
+def count(name, value=1):
+    _current.count(name, value)
+
+@contextmanager
+def collect():
+    """
+    Record into a fresh Metrics for the duration of the with block and
+    yield it; the previous recorder is restored afterwards. Used to gather
+    the metrics of one PDF so they can travel back with its record.
+    """
+    global _current
+    previous, _current = _current, Metrics()
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+def profile_call(func, *args, output=None):
+    """
+    Run func(*args) under pyinstrument when it is installed, cProfile
+    otherwise, and print (or write to output) the report. Returns func's result.
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return func(*args)
+        finally:
+            profiler.stop()
+            report = profiler.output_text(unicode=True)
+            if output:
+                with open(output, "w", encoding="utf-8") as f:
+                    f.write(report)
+            else:
+                print(report)
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        if output:
+            profiler.dump_stats(output)
+        else:
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
@@ -0,0 +1,157 @@
+import os
+import queue
+import shlex
+import logging
+
+OCR_BACKEND = "auto"  # "tesserocr", "pytesseract" or "auto" (tesserocr when installed)
+
+_backends = {}
+_backends_pid = None
+_backend_names = {}
+
+
+class PytesseractBackend:
+    """
+    Runs the tesseract executable once per image through pytesseract.
+    Images are handed over as PIL images; pytesseract writes them to its own
+    uniquely named temp file, so parallel runs cannot overwrite each other.
+    """
+    name = "pytesseract"
+
+    def __init__(self, config):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.config = config
+
+    def image_to_string(self, image):
+        return self._pytesseract.image_to_string(image, config=self.config)
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    """
+    Keeps long-lived Tesseract API handles loaded with the language data and
+    passes images to them in memory, with no temp file and no process spawn
+    per page. Handles are pooled so several threads can OCR at once.
+    """
+    name = "tesserocr"
+
+    def __init__(self, config, pool_size=1):
+        import tesserocr
+        self.config = config
+        options = parse_tesseract_config(config)
+        self._handles = queue.Queue()
+        for _ in range(pool_size):
+            api = tesserocr.PyTessBaseAPI(lang=options["lang"],
+                                          psm=options.get("psm", tesserocr.PSM.AUTO),
+                                          oem=options.get("oem", tesserocr.OEM.DEFAULT))
+            for name, value in options["variables"].items():
+                api.SetVariable(name, value)
+            self._handles.put(api)
+        self.pool_size = pool_size
+
+    def image_to_string(self, image):
+        api = self._handles.get()
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            self._handles.put(api)
+
+    def close(self):
+        for _ in range(self.pool_size):
+            self._handles.get().End()
+
+
+def parse_tesseract_config(config):
+    """
+    Translates tesseract command line options ("--oem 3 --psm 6 -l eng
+    -c name=value") into keyword arguments for the Tesseract API.
+    """
+    options = {"lang": "eng", "variables": {}}
+    args = shlex.split(config)
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == "--oem":
+            options["oem"] = int(value)
+        elif arg == "--psm":
+            options["psm"] = int(value)
+        elif arg == "-l":
+            options["lang"] = value
+        elif arg == "-c" and value and "=" in value:
+            name, _, setting = value.partition("=")
+            options["variables"][name] = setting
+        else:
+            i += 1
+            continue
+        i += 2
+    return options
+
+def resolve_backend_name(name=OCR_BACKEND):
+    """
+    Maps "auto" to the best installed backend.
+    """
+    if name != "auto":
+        return name
+    try:
+        import tesserocr  # noqa: F401
+        return TesserocrBackend.name
+    except ImportError:
+        return PytesseractBackend.name
+
+def get_backend(name=OCR_BACKEND, config="", pool_size=1):
+    """
+    Returns this process's backend for (name, config, pool_size), creating it
+    on first use; a tesserocr backend holds pool_size handles, for that many
+    threads. Falls back to pytesseract when tesserocr cannot be loaded.
+    """
+    global _backends_pid
+    if _backends_pid != os.getpid():
+        # Handles inherited from a forked parent must not be reused
+        _backends.clear()
+        _backends_pid = os.getpid()
+    name = resolve_backend_name(name)
+    key = (name, config, pool_size)
+    if key not in _backends:
+        if name == TesserocrBackend.name:
+            try:
+                _backends[key] = TesserocrBackend(config, pool_size)
+            except Exception as e:
+                logging.warning(f"tesserocr unavailable ({e}), falling back to pytesseract")
+                _backends[key] = PytesseractBackend(config)
+        elif name == PytesseractBackend.name:
+            _backends[key] = PytesseractBackend(config)
+        else:
+            raise ValueError(f"Unknown OCR backend: {name}")
+    return _backends[key]
+
+def backend_name(name=OCR_BACKEND, config=""):
+    """
+    The name of the backend get_backend() hands out for these arguments,
+    i.e. after falling back to pytesseract when tesserocr is missing or
+    lacks the configured languages. Worked out once per process without
+    loading any Tesseract handles.
+    """
+    key = (name, config)
+    if key not in _backend_names:
+        resolved = resolve_backend_name(name)
+        if resolved == TesserocrBackend.name:
+            try:
+                import tesserocr
+                _, languages = tesserocr.get_languages()
+                if not set(parse_tesseract_config(config)["lang"].split("+")) <= set(languages):
+                    resolved = PytesseractBackend.name
+            except Exception:
+                resolved = PytesseractBackend.name
+        _backend_names[key] = resolved
+    return _backend_names[key]
+
+def image_to_string(image, name=OCR_BACKEND, config="", pool_size=1):
+    """
+    OCR a PIL image with the pooled backend of this process.
+    """
+    return get_backend(name, config, pool_size).image_to_string(image)
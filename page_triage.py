@@ -0,0 +1,174 @@
+import re
+import unicodedata
+from collections import namedtuple
+
+# Bump when the routing rules or the OCR image preparation change; part of the extraction cache key.
+TRIAGE_VERSION = 2
+
+MIN_TEXT_CHARS = 20            # Fewer text-layer characters than this is no text layer at all
+MIN_ALNUM_RATIO = 0.4          # Letters and digits among the visible characters of a real text layer
+MAX_GARBAGE_RATIO = 0.2        # Share of unmapped glyphs ("(cid:12)"), U+FFFD and control characters tolerated
+MIN_REGION_COVERAGE = 0.05     # Images smaller than this share of the page (logos, stamps) are not OCR'd
+HYBRID_IMAGE_COVERAGE = 0.3    # Image share of the page from which a page with a text layer is also OCR'd
+SCANNED_TEXT_DENSITY = 4.0     # Text-layer characters per square inch of image above which a scan is
+                               # already searchable (a scanner's OCR layer) rather than just stamped with a header
+
+DESKEW_MAX_ANGLE = 5.0         # Degrees searched either way for the text line angle
+DESKEW_MIN_ANGLE = 0.2         # Smaller skews are left alone
+DESKEW_WIDTH = 600             # Width the page is scaled to while searching for the angle
+
+CID_RE = re.compile(r"\(cid:\d+\)")
+
+Triage = namedtuple("Triage", ["route", "dpi", "regions", "signals"])
+
+
+def garbage_ratio(text):
+    """
+    The share of the non-space characters of text that are unmapped glyphs
+    (pdfminer's "(cid:N)"), replacement characters or control / private-use
+    code points: what a text layer with a broken font encoding looks like.
+    """
+    garbage = sum(len(match) for match in CID_RE.findall(text))
+    visible = 0
+    for char in text:
+        if char.isspace():
+            continue
+        visible += 1
+        if char == "\ufffd" or unicodedata.category(char) in ("Cc", "Co", "Cn", "Cs"):
+            garbage += 1
+    return min(garbage / visible, 1.0) if visible else 0.0
+
+def alnum_ratio(text):
+    visible = [char for char in text if not char.isspace()]
+    return sum(1 for char in visible if char.isalnum()) / len(visible) if visible else 0.0
+
+def image_regions(page):
+    """
+    Bounding boxes (x0, top, x1, bottom, in points, clipped to the page) of
+    the images covering at least MIN_REGION_COVERAGE of the page, top to
+    bottom, with the resolution each was scanned at.
+    """
+    page_area = float(page.width * page.height) or 1.0
+    regions = []
+    for image in page.images:
+        x0, top = max(image["x0"], 0), max(image["top"], 0)
+        x1, bottom = min(image["x1"], page.width), min(image["bottom"], page.height)
+        if x1 <= x0 or bottom <= top or (x1 - x0) * (bottom - top) / page_area < MIN_REGION_COVERAGE:
+            continue
+        width_inches = (image["x1"] - image["x0"]) / 72
+        srcsize = image.get("srcsize") or (0, 0)
+        native_dpi = srcsize[0] / width_inches if width_inches > 0 and srcsize[0] else None
+        regions.append(((x0, top, x1, bottom), native_dpi))
+    regions.sort(key=lambda region: (region[0][1], region[0][0]))
+    return regions
+
+def ocr_dpi(native_dpis, max_dpi, min_dpi):
+    """
+    The resolution to render a page at for OCR: that of its scan, since
+    rendering a 150 dpi scan at 300 dpi only makes Tesseract read more
+    interpolated pixels, kept between min_dpi and max_dpi. Pages without a
+    scan (vector text with a broken encoding) are rendered at max_dpi.
+    """
+    native_dpis = [dpi for dpi in native_dpis if dpi]
+    if not native_dpis:
+        return max_dpi
+    return int(round(min(max(max(native_dpis), min_dpi), max_dpi)))
+
+def classify_page(page, text, max_dpi, min_dpi):
+    """
+    Picks how one pdfplumber page is read from cheap signals: the amount of
+    text in its text layer, whether that text comes from fonts and is
+    readable, and how much of the page is covered by images.
+
+    - "text": the text layer alone.
+    - "ocr": the whole page is rendered and OCR'd; the text layer is empty,
+      unreadable or missing fonts.
+    - "hybrid": the text layer plus OCR of the image regions only, for scans
+      that carry a real text layer just for a header or stamp.
+
+    Returns a Triage with the route, the OCR resolution, the regions to OCR
+    (None for the whole page) and the signals used.
+    """
+    text = text or ""
+    chars = len(text.strip())
+    fonts = len({char.get("fontname") for char in page.chars if char.get("fontname")})
+    garbage = garbage_ratio(text)
+    alnum = alnum_ratio(text)
+    regions = image_regions(page)
+    page_area = float(page.width * page.height) or 1.0
+    image_area = sum((x1 - x0) * (bottom - top) for (x0, top, x1, bottom), _ in regions)
+    coverage = min(image_area / page_area, 1.0)
+    density = chars / (image_area / 72 ** 2) if image_area else None
+    signals = {"chars": chars, "fonts": fonts, "garbage_ratio": round(garbage, 3), "alnum_ratio": round(alnum, 3),
+               "image_coverage": round(coverage, 3)}
+    dpi = ocr_dpi([native_dpi for _, native_dpi in regions], max_dpi, min_dpi)
+
+    if chars < MIN_TEXT_CHARS or not fonts or garbage > MAX_GARBAGE_RATIO or alnum < MIN_ALNUM_RATIO:
+        return Triage("ocr", dpi, None, signals)
+    if coverage >= HYBRID_IMAGE_COVERAGE and density < SCANNED_TEXT_DENSITY:
+        return Triage("hybrid", dpi, [bbox for bbox, _ in regions], signals)
+    return Triage("text", None, None, signals)
+
+def crop_regions(image, regions, dpi):
+    """
+    The parts of a page image rendered at dpi covered by regions (bounding
+    boxes in points), top to bottom. None means the whole page.
+    """
+    if regions is None:
+        return [image]
+    scale = dpi / 72
+    return [image.crop((int(x0 * scale), int(top * scale), int(x1 * scale + 0.5), int(bottom * scale + 0.5)))
+            for x0, top, x1, bottom in regions]
+
+def _line_contrast(binary, angle):
+    """
+    How sharply the rows of ink of a binarized, inverted image separate
+    into lines and gaps once rotated by angle degrees.
+    """
+    import cv2
+    import numpy as np
+    height, width = binary.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    rotated = cv2.warpAffine(binary, matrix, (width, height), flags=cv2.INTER_NEAREST, borderValue=0)
+    return float(np.var(rotated.sum(axis=1, dtype=np.int64)))
+
+def skew_angle(binary):
+    """
+    The rotation (degrees, counter-clockwise) that makes the text lines of a
+    binarized page horizontal, found by maximizing the contrast between
+    lines and gaps: coarse half-degree steps, then tenths around the best.
+    """
+    import cv2
+    import numpy as np
+    height, width = binary.shape
+    scale = min(DESKEW_WIDTH / width, 1.0)
+    small = cv2.resize(binary, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                       interpolation=cv2.INTER_AREA)
+    ink = (small < 128).astype(np.uint8)
+    if ink.sum() < 50:
+        return 0.0
+    coarse = [step / 2 for step in range(int(-DESKEW_MAX_ANGLE * 2), int(DESKEW_MAX_ANGLE * 2) + 1)]
+    best = max(coarse, key=lambda angle: _line_contrast(ink, angle))
+    fine = [best + step / 10 for step in range(-4, 5)]
+    return max(fine, key=lambda angle: _line_contrast(ink, angle))
+
+def prepare_for_ocr(image, deskew=True):
+    """
+    Grayscale and (with deskew) rotation of the text lines to horizontal.
+    The Otsu binarized page is only used to find the angle: Tesseract's own
+    thresholding of the grayscale page keeps the dots and thin strokes a
+    hard threshold loses at 150-200 dpi. Returns a PIL image.
+    """
+    import cv2
+    import numpy as np
+    from PIL import Image
+
+    gray = np.asarray(image.convert("L"))
+    if deskew:
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        angle = skew_angle(binary)
+        if abs(angle) >= DESKEW_MIN_ANGLE:
+            height, width = gray.shape
+            matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+            gray = cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_LINEAR, borderValue=255)
+    return Image.fromarray(gray)
@@ -0,0 +1,34 @@
+CSV_HEADER = ["Department", "Branch", "Timeline", "Semester", "Subject", "FullPath"]
+
+
+def parse_paper_path(path):
+    """
+    Splits an FTP path such as /Dept/Branch/.../Timeline/Semester/Subject.pdf
+    into a [Department, Branch, Timeline, Semester, Subject, FullPath] row.
+    Returns None for paths that are not PDFs or are too short.
+    """
+    # Only consider paths that point to a PDF file
+    if not path.lower().endswith(".pdf"):
+        return None
+    # Split path into components and remove empty segments
+    parts = [part for part in path.split("/") if part]
+    if len(parts) < 4:  # Ensure it has enough elements to extract branch & timeline
+        return None
+    department = parts[0]
+    # Extract Branch (Second element in the path)
+    branch = parts[1]
+    # Extract Timeline (Assumed to be before the Semester folder)
+    timeline = parts[-3]
+    # Extract Semester (Second-to-last folder)
+    semester = parts[-2]
+    # Extract Subject (Last segment)
+    subject = parts[-1].replace(".pdf", "")
+    return [department, branch, timeline, semester, subject, path]
+
+def row_sort_key(row):
+    """
+    Sorts rows by Department, then Branch, then Timeline, then Subject; ties
+    keep the tree order (path components), so merged and rebuilt CSVs agree.
+    """
+    return (row[0].lower(), row[1].lower(), row[2].lower(), row[4].lower(),
+            [part for part in row[5].split("/") if part])
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+
+# Subcommand: (scripts it runs, in order; what it does). A script is only
+# imported when its subcommand runs, so light subcommands never load
+# pdfplumber, pandas or OpenCV.
+COMMANDS = {
+    "crawl": (["folder_structure(ftp)", "PDF_SORTER-CSV"],
+              "List the FTP server into the FTP tree and the question paper CSV"),
+    "fetch": (["fetcher"], "Download the question papers from the FTP server"),
+    "sort": (["PDF_Sorter"], "Place the downloaded PDFs by department, branch, semester and subject"),
+    "index": (["local_index"], "Index the sorted PDF tree into the folder structure, CSV and manifest"),
+    "extract": (["main"], "Extract and deduplicate the questions (all, one --subject or one --pdf)"),
+    "dedup": (["global_dedup"], "Cluster questions across all subjects"),
+    "query": (["search_index"], "Search the extracted questions"),
+}
+
+
+def script_args(command, script, args):
+    """
+    The command line handed to one script of a subcommand. crawl passes its
+    options to the FTP tree script; the CSV script applies the sync delta
+    when there is a CSV to apply it to, and re-parses the tree otherwise.
+    """
+    if command == "crawl" and script == "PDF_SORTER-CSV":
+        import config
+        return ["--delta"] if "--sync" in args and os.path.exists(config.PAPERS_CSV_PATH) else []
+    return args
+
+def run_script(command, script, args):
+    """
+    Runs the command line entry point of one script (main_cli where a
+    script has one, else main) as if it was started with args.
+    """
+    module = importlib.import_module(script)
+    entry = getattr(module, "main_cli", None) or module.main
+    saved_argv = sys.argv
+    sys.argv = [f"paperiq {command}"] + args
+    try:
+        entry()
+    finally:
+        sys.argv = saved_argv
+
+def main(argv=None):
+    commands = "\n".join(f"  {name:<9}{description}" for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="paperiq", description="PaperIQ: collect question papers and extract their questions.",
+        epilog=f"commands:\n{commands}\n\nRun 'paperiq <command> --help' for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", help="Settings file (default: $PAPERIQ_CONFIG or paperiq.ini)")
+    parser.add_argument("--timing", action="store_true", help="Print how long the command took")
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="One of the commands below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.config:
+        # Read by config.py when the first script imports it
+        os.environ["PAPERIQ_CONFIG"] = args.config
+    start = time.perf_counter()
+    try:
+        for script in COMMANDS[args.command][0]:
+            run_script(args.command, script, script_args(args.command, script, args.args))
+    finally:
+        if args.timing:
+            print(f"paperiq {args.command}: {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
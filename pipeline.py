@@ -0,0 +1,297 @@
+import os
+import time
+import queue
+import logging
+import argparse
+import threading
+import multiprocessing
+from collections import Counter
+import main
+import fetcher
+import metrics
+import PDF_Sorter
+import extraction_cache
+import question_store
+import search_index
+from ftp_snapshot import SNAPSHOT_PATH, DELTA_PATH, diff_snapshots, iter_files, load_snapshot, sync
+from paper_paths import CSV_HEADER, parse_paper_path, row_sort_key
+from run_manifest import RunManifest, MANIFEST_PATH, write_json_atomic
+
+DOWNLOAD_CONNECTIONS = fetcher.MAX_CONNECTIONS  # Parallel FTP transfers
+PLACE_WORKERS = 2                               # Threads copying PDFs into sorted_pdfs
+EXTRACT_WORKERS = main.MAX_WORKERS              # Worker processes extracting questions
+QUEUE_SIZE = 64                                 # Items buffered between two stages
+PROCESSED_PATH = "ftp_processed.json"           # FTP snapshot as of the last run that processed every PDF
+
+_DONE = None  # End-of-stream marker put on a queue by each producer
+
+
+def extraction_key(row):
+    """
+    The (Department, Branch, Semester, Subject) key a tree row is grouped
+    under once it is placed in sorted_pdfs.
+    """
+    return (row["Department"].strip(), row["Branch"].strip(), row["Semester"].strip(), row["Subject"].strip())
+
+def crawl_rows(ftp, snapshot_path=SNAPSHOT_PATH, delta_path=DELTA_PATH, changed_only=False,
+               processed_path=PROCESSED_PATH):
+    """
+    Re-lists the whole FTP tree (so sizes and times of files overwritten in
+    place are current), updates the snapshot and delta, and returns one row
+    dict (CSV_HEADER columns plus 'size' and 'modify') per PDF, ordered
+    subject by subject so that each subject is downloaded, and can be
+    finished, before the next one. Returns (rows, snapshot).
+    With changed_only, only subjects with PDFs added, removed or modified
+    since the snapshot at processed_path are kept. That snapshot is only
+    replaced once a run has processed everything (see run()), so changes
+    picked up by another sync, or by a run that was killed, are not lost.
+    """
+    snapshot, _, listed = sync(ftp, snapshot_path=snapshot_path, delta_path=delta_path, full=True)
+    logging.info(f"Crawl listed {listed} of {len(snapshot['dirs'])} directories")
+    rows = []
+    for path, entry in iter_files(snapshot):
+        row = parse_paper_path(path)
+        if row:
+            row = dict(zip(CSV_HEADER, row))
+            row["size"], row["modify"] = entry["size"], entry["modify"]
+            rows.append(row)
+    if changed_only:
+        delta = diff_snapshots(load_snapshot(processed_path), snapshot)
+        changed = [parse_paper_path(item["path"]) for kind in ("added", "removed", "modified")
+                   for item in delta[kind]]
+        changed_keys = {extraction_key(dict(zip(CSV_HEADER, row))) for row in changed if row}
+        rows = [row for row in rows if extraction_key(row) in changed_keys]
+    rows.sort(key=lambda row: ([part.lower() for part in extraction_key(row)],
+                               row_sort_key([row[column] for column in CSV_HEADER])))
+    return rows, snapshot
+
+def iter_queue(q, producers):
+    """
+    Yields items from q until each of the producers has put _DONE.
+    """
+    while producers:
+        item = q.get()
+        if item is _DONE:
+            producers -= 1
+            continue
+        yield item
+
+def download_stage(rows, place_q, placers, connections, connect_args, local_root, target_root, index):
+    """
+    Downloads the rows' PDFs and hands each (order, row, outcome, plan) to
+    the placement stage, order being the row's position in rows. Transfers
+    finish in any order, so they are handed on in row order: destination
+    names (Subject_Timeline_N.pdf on collisions) are picked by
+    PDF_Sorter.plan_pdf here, one row at a time, the way PDF_Sorter.py does.
+    """
+    def items():
+        for order, row in enumerate(rows):
+            local_path = os.path.join(local_root, *row["FullPath"].strip("/").split("/"))
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            yield row["FullPath"], local_path, row["size"], row["modify"], (order, row)
+
+    finished = {}
+    next_order = 0
+    try:
+        for item, outcome in fetcher.iter_downloads(items(), connections, connect_args):
+            order, row = item[4]
+            finished[order] = (row, outcome)
+            while next_order in finished:
+                row, outcome = finished.pop(next_order)
+                plan = None
+                if outcome != "failed":
+                    try:
+                        plan = PDF_Sorter.plan_pdf(row, local_root, target_root, index)
+                    except Exception as e:
+                        plan = ("error", str(e))
+                place_q.put((next_order, row, outcome, plan))
+                next_order += 1
+    except Exception as e:
+        logging.error(f"Download stage stopped: {e}")
+    finally:
+        for _ in range(placers):
+            place_q.put(_DONE)
+
+def place_stage(place_q, extract_q, dedup_q, local_root, target_root, index):
+    """
+    Places downloaded PDFs into target_root as planned by the download stage
+    and passes them on as main.py records. PDFs that failed to download or
+    place are reported to the dedup stage as dropped, so their subject can
+    still be finished.
+    """
+    try:
+        for order, row, outcome, plan in iter_queue(place_q, 1):
+            key = extraction_key(row)
+            if outcome == "failed":
+                dedup_q.put(("dropped", key, (row["FullPath"], "download failed")))
+                continue
+            try:
+                status, path = PDF_Sorter.execute_plan(row, plan, local_root, target_root,
+                                                       PDF_Sorter.PLACE_MODE, index)
+            except Exception as e:
+                status, path = "error", str(e)
+            if status in ("missing", "error"):
+                dedup_q.put(("dropped", key, (row["FullPath"], f"placement {status}: {path}")))
+                continue
+            dept, branch, sem, subject = key
+            extract_q.put({"Department": dept, "Branch": branch, "Semester": sem, "Subject": subject,
+                           "FullPath": os.path.relpath(path, target_root), "_order": order})
+    finally:
+        extract_q.put(_DONE)
+
+def dedup_stage(dedup_q, expected, manifest, started, sinks=()):
+    """
+    Collects extraction results per subject and deduplicates and saves a
+    subject as soon as all of its expected PDFs have come in. Returns
+    (subjects written, PDFs that failed or were dropped).
+    """
+    groups = {}
+    written = failed = 0
+    for kind, key, payload in iter_queue(dedup_q, 1):
+        group = groups.setdefault(key, {"questions": [], "diagrams": [], "remaining": expected[key]})
+        group["remaining"] -= 1
+        if kind == "result":
+            order, record = payload
+            manifest.mark_pdf(record["FullPath"], key, record)
+            failed += bool(record.get("error"))
+            group["questions"].append((order, record["questions"]))
+            group["diagrams"].append((order, os.path.basename(record["pdf_path"]), record["diagrams"]))
+        else:
+            full_path, error = payload
+            logging.error(f"Skipping {full_path}: {error}")
+            manifest.mark_pdf(full_path, key, {"error": error})
+            failed += 1
+        if group["remaining"] == 0:
+            json_path, question_count = main.finish_subject(key, groups.pop(key), sinks)
+            manifest.mark_subject(key, json_path, question_count)
+            written += 1
+            if written == 1:
+                print(f"First subject written after {time.perf_counter() - started:.1f}s: {json_path}")
+    for key, group in groups.items():
+        logging.warning(f"Subject {key} not written: {group['remaining']} PDFs never arrived")
+    return written, failed
+
+def default_mp_context():
+    """
+    Worker processes are started while the download and placement threads
+    run, so avoid plain fork where a safer start method exists.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
+
+def run(connect_args=None, connections=DOWNLOAD_CONNECTIONS, placers=PLACE_WORKERS, workers=EXTRACT_WORKERS,
+        queue_size=QUEUE_SIZE, changed_only=False, local_root=PDF_Sorter.local_root,
+        target_root=PDF_Sorter.target_root, manifest_path=MANIFEST_PATH,
+        metrics_path=metrics.METRICS_JSON_PATH, prometheus_path=metrics.METRICS_PROM_PATH, parquet_dir=None,
+        search_index_path=None, processed_path=PROCESSED_PATH):
+    """
+    Runs crawl -> download -> place -> extract -> dedup as overlapping stages
+    joined by bounded queues: FTP transfers, file copies (threads), question
+    extraction (processes) and per-subject dedup all proceed at once, and a
+    subject's JSON is written as soon as its last PDF is extracted.
+    With parquet_dir and search_index_path, the questions also go to the
+    Parquet question store and the search index.
+    The PDFs are recorded in the manifest at manifest_path next to those of
+    earlier runs (main.py's included). Once every subject is written with no
+    failed PDF, the crawled snapshot is saved at processed_path as the
+    baseline of the next changed_only run.
+    """
+    started = time.perf_counter()
+    sinks = main.output_sinks(parquet_dir, search_index_path)
+    connect_args = connect_args or {"server": fetcher.FTP_SERVER, "port": fetcher.FTP_PORT}
+    main.INPUT_DIR = target_root
+
+    ftp = fetcher.connect(**connect_args)
+    rows, snapshot = crawl_rows(ftp, changed_only=changed_only, processed_path=processed_path)
+    ftp.quit()
+    expected = Counter(extraction_key(row) for row in rows)
+    print(f"{len(rows)} PDFs in {len(expected)} subjects to process")
+
+    place_q = queue.Queue(queue_size)
+    extract_q = queue.Queue(queue_size)
+    dedup_q = queue.Queue()
+    manifest = RunManifest(manifest_path, resume=True)
+    placement_index = PDF_Sorter.PlacementIndex()
+    results = {}
+
+    threads = [
+        threading.Thread(target=download_stage, name="download", daemon=True,
+                         args=(rows, place_q, placers, connections, connect_args, local_root, target_root,
+                               placement_index)),
+        threading.Thread(target=lambda: results.update(
+                             zip(("written", "failed"), dedup_stage(dedup_q, expected, manifest, started, sinks))),
+                         name="dedup", daemon=True)
+    ]
+    threads += [threading.Thread(target=place_stage, name=f"place-{n}", daemon=True,
+                                 args=(place_q, extract_q, dedup_q, local_root, target_root,
+                                       placement_index))
+                for n in range(placers)]
+    for thread in threads:
+        thread.start()
+
+    orders = []
+
+    def extraction_records():
+        for record in iter_queue(extract_q, placers):
+            orders.append(record.pop("_order"))
+            yield record
+
+    for index, record in main.iter_processed_records(extraction_records(), workers, default_mp_context()):
+        main.record_metrics(record)
+        dedup_q.put(("result", main.subject_key(record), (orders[index], record)))
+    dedup_q.put(_DONE)
+    for thread in threads:
+        thread.join()
+    for sink in sinks:
+        sink.flush()
+    manifest.save(force=True)
+    if results.get("written") == len(expected) and not results.get("failed"):
+        write_json_atomic(processed_path, snapshot)
+    else:
+        logging.warning(f"Not all PDFs were processed; {processed_path} is left as it was")
+
+    conn = main.get_cache()
+    if conn is not None:
+        extraction_cache.evict(conn, main.CACHE_MAX_BYTES)
+    metrics.current().observe("pipeline", time.perf_counter() - started)
+    metrics.current().write(metrics_path, prometheus_path)
+    print(f"Wrote {results.get('written', 0)} subjects in {time.perf_counter() - started:.1f}s; "
+          f"PDFs: {manifest.counts()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch, sort, extract and deduplicate in one overlapping run.")
+    parser.add_argument("--server", default=fetcher.FTP_SERVER, help="FTP server to crawl")
+    parser.add_argument("--port", type=int, default=fetcher.FTP_PORT)
+    parser.add_argument("--connections", type=int, default=DOWNLOAD_CONNECTIONS,
+                        help="Parallel FTP downloads")
+    parser.add_argument("--placers", type=int, default=PLACE_WORKERS,
+                        help="Threads copying PDFs into the sorted folder")
+    parser.add_argument("--place-mode", choices=["hardlink", "reflink", "copy"], default=PDF_Sorter.PLACE_MODE,
+                        help="How PDFs are placed in the sorted folder; hardlink and reflink fall back to copy")
+    parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS,
+                        help="Extraction worker processes (1 = in the main process)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="Items buffered between two stages")
+    parser.add_argument("--changed", action="store_true",
+                        help="Only process subjects with PDFs added, removed or modified since the last "
+                             "run that processed every PDF")
+    parser.add_argument("--local-root", default=PDF_Sorter.local_root, help="Folder PDFs are downloaded to")
+    parser.add_argument("--target-root", default=PDF_Sorter.target_root, help="Folder PDFs are sorted into")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-extract every PDF instead of using the extraction cache")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Path of the per-PDF run manifest")
+    parser.add_argument("--diagrams", action="store_true",
+                        help="Also store each PDF's diagrams and list them in the subject JSON")
+    parser.add_argument("--parquet", nargs="?", const=question_store.STORE_DIR, metavar="DIR",
+                        help="Also append the unique questions to a partitioned Parquet dataset")
+    parser.add_argument("--search-index", nargs="?", const=search_index.INDEX_PATH, metavar="PATH",
+                        help="Also keep a searchable question index up to date")
+    args = parser.parse_args()
+    main.USE_CACHE = not args.no_cache
+    main.EXTRACT_DIAGRAMS = args.diagrams
+    PDF_Sorter.PLACE_MODE = args.place_mode
+    run(connect_args={"server": args.server, "port": args.port}, connections=args.connections,
+        placers=args.placers, workers=args.workers, queue_size=args.queue_size, changed_only=args.changed,
+        local_root=args.local_root, target_root=args.target_root, manifest_path=args.manifest,
+        parquet_dir=args.parquet, search_index_path=args.search_index)
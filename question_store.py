@@ -0,0 +1,182 @@
+import os
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+STORE_DIR = "question_store"  # Parquet dataset: <store>/department=<...>/branch=<...>/part-*.parquet
+FLUSH_ROWS = 50000            # Buffered rows written out as one part per partition
+
+
+def question_hash(question):
+    """
+    Hash of a question with case and whitespace normalized, so the same
+    question has the same hash in every subject.
+    """
+    normalized = " ".join(question.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([("semester", pa.string()), ("subject", pa.string()), ("question", pa.string()),
+                      ("count", pa.int32()), ("sources", pa.list_(pa.string())), ("hash", pa.string()),
+                      ("written", pa.string())])
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([("department", pa.string()), ("branch", pa.string())]), flavor="hive")
+
+def partition_dir(store_dir, department, branch):
+    # Values are URI-escaped the way hive partitioning decodes them
+    return os.path.join(store_dir, f"department={quote(str(department), safe=' &()-_.,')}",
+                        f"branch={quote(str(branch), safe=' &()-_.,')}")
+
+
+class QuestionStore:
+    """
+    Collects the unique questions of finished subjects and appends them,
+    one row per question, to a Parquet dataset partitioned by department
+    and branch. Every run writes new part files; a subject written again
+    by a later run supersedes its earlier rows (see load_questions), and
+    compact() drops the superseded rows for good. Each subject also gets a
+    marker row (no question, count 0), so a subject rewritten with no
+    questions still supersedes what it had.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, flush_rows=FLUSH_ROWS):
+        import pyarrow  # noqa: F401 -- fail at startup, not after the first subject
+        self.store_dir = store_dir
+        self.flush_rows = flush_rows
+        # Sorts after every earlier run's stamp; the pid keeps concurrent runs apart
+        self.written = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+        self._rows = {}
+        self._buffered = 0
+        self._parts = 0
+
+    def add_subject(self, department, branch, semester, subject, unique_questions):
+        rows = self._rows.setdefault((department, branch), [])
+        rows.append({"semester": str(semester), "subject": subject, "question": None, "count": 0,
+                     "sources": [], "hash": None, "written": self.written})
+        for uq in unique_questions:
+            rows.append({"semester": str(semester), "subject": subject, "question": uq["question"],
+                         "count": uq["count"], "sources": list(uq["sources"]),
+                         "hash": question_hash(uq["question"]), "written": self.written})
+        self._buffered += len(unique_questions) + 1
+        if self._buffered >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows, one new part file per partition.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for (department, branch), rows in self._rows.items():
+            if not rows:
+                continue
+            out_dir = partition_dir(self.store_dir, department, branch)
+            os.makedirs(out_dir, exist_ok=True)
+            path = os.path.join(out_dir, f"part-{self.written}-{self._parts:05d}.parquet")
+            tmp_path = f"{path}.tmp"
+            pq.write_table(pa.Table.from_pylist(rows, schema=_schema()), tmp_path)
+            os.replace(tmp_path, path)
+            self._parts += 1
+        self._rows = {}
+        self._buffered = 0
+
+
+def _current_rows(store_dir, department=None, branch=None, columns=None):
+    """
+    The rows of each subject's latest write, marker rows included.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(store_dir, format="parquet", partitioning=_partitioning())
+    expression = None
+    for name, value in (("department", department), ("branch", branch)):
+        if value is not None:
+            condition = ds.field(name) == value
+            expression = condition if expression is None else expression & condition
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(list(columns) + ["department", "branch", "semester", "subject",
+                                                           "count", "written"]))
+    df = dataset.to_table(columns=read_columns, filter=expression).to_pandas()
+    if df.empty:
+        return df
+    subject = ["department", "branch", "semester", "subject"]
+    latest = df.groupby(subject)["written"].transform("max")
+    df = df[df["written"] == latest].reset_index(drop=True)
+    return df
+
+def load_questions(store_dir=STORE_DIR, department=None, branch=None, columns=None):
+    """
+    Read the dataset into a pandas DataFrame, optionally only the given
+    department and/or branch partitions. columns limits what is read
+    beyond the subject key, 'count' and 'written', which are always included.
+    Rows of a subject that a later run wrote again are left out, and so
+    are the subject marker rows.
+    """
+    df = _current_rows(store_dir, department, branch, columns)
+    if df.empty:
+        return df
+    return df[df["count"] > 0].reset_index(drop=True)
+
+def top_repeated(store_dir=STORE_DIR, limit=50, department=None, branch=None):
+    """
+    The most repeated questions across subjects: occurrences summed per
+    question hash, with the number of subjects each appears in and one
+    of its texts.
+    """
+    df = load_questions(store_dir, department, branch, columns=["question", "count", "hash"])
+    if df.empty:
+        return df
+    df["subject_key"] = df["department"] + "/" + df["branch"] + "/" + df["semester"] + "/" + df["subject"]
+    grouped = df.groupby("hash").agg(question=("question", "first"), count=("count", "sum"),
+                                     subjects=("subject_key", "nunique"))
+    return grouped.sort_values(["count", "subjects"], ascending=False).head(limit).reset_index()
+
+def compact(store_dir=STORE_DIR):
+    """
+    Rewrite every partition as a single part holding only its current rows
+    (subject markers included, so every partition with parts is rewritten).
+    Returns the number of question rows kept.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = _current_rows(store_dir)
+    if df.empty:
+        return 0
+    for (department, branch), rows in df.groupby(["department", "branch"]):
+        out_dir = partition_dir(store_dir, department, branch)
+        old_parts = [name for name in os.listdir(out_dir) if name.endswith(".parquet")]
+        table = pa.Table.from_pandas(rows.drop(columns=["department", "branch"]), schema=_schema(),
+                                     preserve_index=False)
+        path = os.path.join(out_dir, "part-compacted.parquet")
+        pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        for name in old_parts:
+            if name != "part-compacted.parquet":
+                os.remove(os.path.join(out_dir, name))
+    return int((df["count"] > 0).sum())
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the Parquet question store.")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--department")
+    parser.add_argument("--branch")
+    parser.add_argument("--top", type=int, default=50, help="Number of most repeated questions to list")
+    parser.add_argument("--compact", action="store_true", help="Merge each partition's parts and exit")
+    args = parser.parse_args()
+
+    if args.compact:
+        print(f"Compacted {compact(args.store)} rows")
+        return
+    for row in top_repeated(args.store, args.top, args.department, args.branch).itertuples():
+        print(f"{row.count:>5} {row.subjects:>3}  {' '.join(row.question.split())}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import json
+import time
+
+MANIFEST_PATH = "run_manifest.json"
+MANIFEST_FLUSH_SECONDS = 5  # Least time between two writes of the manifest file
+
+
+def subject_id(key):
+    """
+    Manifest id of a (Department, Branch, Semester, Subject) key.
+    """
+    return " | ".join(str(part) for part in key)
+
+def write_json_atomic(path, data):
+    """
+    Write data as JSON to a temp file next to path and rename it over path,
+    so a crash leaves either the old or the new file, never a partial one.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RunManifest:
+    """
+    Per-PDF and per-subject progress of a main.py run.
+    PDFs are keyed by their CSV FullPath and have a status of pending, done
+    or failed, with duration, page count and OCR page count. Subjects are
+    marked done once their JSON file has been written.
+    """
+
+    def __init__(self, path=MANIFEST_PATH, resume=False):
+        self.path = path
+        self.data = {"pdfs": {}, "subjects": {}}
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        self._last_save = 0.0
+        self._dirty = False
+
+    def subjects_to_skip(self):
+        """
+        Subject ids whose JSON was written and all of whose PDFs are done
+        (none failed, and none re-queued by a run that did not finish).
+        """
+        unfinished = {entry["subject"] for entry in self.data["pdfs"].values() if entry["status"] != "done"}
+        return {sid for sid, entry in self.data["subjects"].items()
+                if entry["status"] == "done" and sid not in unfinished}
+
+    def mark_pending(self, full_path, key):
+        """
+        Queue one PDF; its subject is pending again until its JSON is rewritten.
+        """
+        self.data["pdfs"][full_path] = {"subject": subject_id(key), "status": "pending"}
+        self.data["subjects"][subject_id(key)] = {"status": "pending"}
+        self._changed()
+
+    def mark_pdf(self, full_path, key, record):
+        """
+        Record the outcome of one processed PDF from its result dict.
+        """
+        self.data["pdfs"][full_path] = {
+            "subject": subject_id(key),
+            "status": "failed" if record.get("error") else "done",
+            "duration": round(record.get("duration", 0.0), 3),
+            "pages": record.get("pages", 0),
+            "ocr_pages": record.get("ocr_pages", 0),
+            "error": record.get("error")
+        }
+        self._changed()
+
+    def mark_subject(self, key, json_path, question_count):
+        self.data["subjects"][subject_id(key)] = {
+            "status": "done",
+            "json": json_path,
+            "questions": question_count
+        }
+        self._changed()
+
+    def counts(self):
+        """
+        Number of PDFs per status.
+        """
+        counts = {"pending": 0, "done": 0, "failed": 0}
+        for entry in self.data["pdfs"].values():
+            counts[entry["status"]] += 1
+        return counts
+
+    def _changed(self):
+        self._dirty = True
+        self.save()
+
+    def save(self, force=False):
+        """
+        Write the manifest if it changed, at most every MANIFEST_FLUSH_SECONDS
+        unless force is set.
+        """
+        if not self._dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_save < MANIFEST_FLUSH_SECONDS:
+            return
+        write_json_atomic(self.path, self.data)
+        self._last_save = now
+        self._dirty = False
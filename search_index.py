@@ -0,0 +1,206 @@
+import os
+import glob
+import json
+import time
+import sqlite3
+import argparse
+from fuzzywuzzy import fuzz
+from dedup import QuestionIndex, SIMILARITY_THRESHOLD, question_tokens
+
+INDEX_PATH = "search_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    department TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    question TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sources TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_subject ON questions (department, branch, semester, subject);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question, content='questions', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, question) VALUES (new.id, new.question);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, question) VALUES ('delete', old.id, old.question);
+END;
+CREATE TABLE IF NOT EXISTS json_files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+
+def open_index(path=INDEX_PATH):
+    """
+    Opens (creating if needed) the SQLite search index. The connection may
+    be handed to another thread, as long as one thread uses it at a time.
+    """
+    conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def upsert_subject(conn, department, branch, semester, subject, unique_questions):
+    """
+    Replace the indexed questions of one subject with unique_questions
+    (the dedup output: dicts with 'question', 'sources' and 'count').
+    """
+    key = (department, branch, str(semester), subject)
+    with conn:
+        conn.execute("DELETE FROM questions WHERE department = ? AND branch = ? AND semester = ? AND subject = ?",
+                     key)
+        conn.executemany("INSERT INTO questions (department, branch, semester, subject, question, count, sources) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         [key + (uq["question"], uq["count"], json.dumps(uq["sources"], ensure_ascii=False))
+                          for uq in unique_questions])
+
+def index_json_dir(conn, json_dir):
+    """
+    Index the subject JSON files main.py wrote under json_dir, skipping
+    files unchanged since they were last indexed. Returns the number of
+    files (re)indexed.
+    """
+    indexed = 0
+    for path in glob.glob(os.path.join(json_dir, "**", "*_Questions.json"), recursive=True):
+        mtime = os.stat(path).st_mtime
+        row = conn.execute("SELECT mtime FROM json_files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == mtime:
+            continue
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        upsert_subject(conn, data["Department"], data["Branch"], data["Semester"], data["Subject"],
+                       data["questions"])
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO json_files (path, mtime) VALUES (?, ?)", (path, mtime))
+        indexed += 1
+    return indexed
+
+def match_expression(text):
+    """
+    An FTS5 query matching any token of text. Tokens are quoted so words
+    such as AND, NEAR or a stray '*' in a question are not query syntax.
+    """
+    tokens = sorted(question_tokens(text))
+    return " OR ".join(f'"{token}"' for token in tokens)
+
+def _filters(department, branch, subject):
+    clauses, params = [], []
+    for column, value in (("department", department), ("branch", branch), ("subject", subject)):
+        if value is not None:
+            clauses.append(f"q.{column} = ?")
+            params.append(value)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def _result(row, score):
+    return {"question": row[0], "count": row[1], "sources": json.loads(row[2]), "department": row[3],
+            "branch": row[4], "semester": row[5], "subject": row[6], "score": score}
+
+def _ranked_rows(conn, text, limit, department, branch, subject):
+    expression = match_expression(text)
+    if not expression:
+        return []
+    where, params = _filters(department, branch, subject)
+    return conn.execute(
+        "SELECT q.question, q.count, q.sources, q.department, q.branch, q.semester, q.subject, "
+        "bm25(questions_fts) AS rank FROM questions_fts JOIN questions q ON q.id = questions_fts.rowid "
+        f"WHERE questions_fts MATCH ?{where} ORDER BY rank LIMIT ?",
+        [expression] + params + [limit]).fetchall()
+
+def search(conn, text, limit=20, department=None, branch=None, subject=None):
+    """
+    Questions sharing words with text, best BM25 match first. Each result
+    is a dict with the question, its count and sources, its subject and
+    'score' (the negated bm25 value, higher is better).
+    """
+    return [_result(row, -row[7]) for row in _ranked_rows(conn, text, limit, department, branch, subject)]
+
+def similar(conn, text, threshold=SIMILARITY_THRESHOLD, limit=20, department=None, branch=None, subject=None):
+    """
+    Indexed questions whose fuzz.token_set_ratio with text reaches
+    threshold, i.e. the ones main.py's dedup would have merged with it,
+    most similar first. Every question passing the filters is considered,
+    since a near-duplicate need not share a word with text (e.g. "kirchoffs
+    law" and "kirchhoff's laws"): QuestionIndex.candidates() narrows them
+    down exactly and score() rules out most of the rest without calling fuzz.
+    """
+    where, params = _filters(department, branch, subject)
+    rows = conn.execute("SELECT q.question, q.count, q.sources, q.department, q.branch, q.semester, q.subject "
+                        f"FROM questions q WHERE 1 = 1{where}", params).fetchall()
+    index = QuestionIndex()
+    for row in rows:
+        index.add(row[0])
+    tokens = question_tokens(text)
+    results = []
+    for position in index.candidates(tokens, threshold):
+        row = rows[position]
+        # score() may accept on a lower bound; report the exact ratio
+        if index.score(text, tokens, position, threshold) >= threshold:
+            results.append(_result(row, fuzz.token_set_ratio(text, row[0])))
+    results.sort(key=lambda result: (-result["score"], -result["count"]))
+    return results[:limit]
+
+
+class SearchIndex:
+    """
+    Output sink for main.py and pipeline.py: every finished subject is
+    upserted into the index at path, so it stays current as PDFs are
+    processed.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.conn = open_index(path)
+
+    def add_subject(self, department, branch, semester, subject, unique_questions):
+        upsert_subject(self.conn, department, branch, semester, subject, unique_questions)
+
+    def flush(self):
+        # Each subject is committed as it is added
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the extracted questions.")
+    parser.add_argument("query", nargs="?", help="Question or words to look for")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--build", metavar="JSON_DIR",
+                        help="First index the subject JSON files under JSON_DIR (only changed files)")
+    parser.add_argument("--similar", action="store_true",
+                        help="Only near-duplicates (token_set_ratio >= --threshold), most similar first")
+    parser.add_argument("--threshold", type=int, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--department")
+    parser.add_argument("--branch")
+    parser.add_argument("--subject")
+    args = parser.parse_args()
+
+    conn = open_index(args.index)
+    if args.build:
+        start = time.perf_counter()
+        indexed = index_json_dir(conn, args.build)
+        print(f"Indexed {indexed} subject files in {time.perf_counter() - start:.1f}s")
+    if not args.query:
+        return
+
+    start = time.perf_counter()
+    filters = {"department": args.department, "branch": args.branch, "subject": args.subject}
+    if args.similar:
+        results = similar(conn, args.query, args.threshold, args.limit, **filters)
+    else:
+        results = search(conn, args.query, args.limit, **filters)
+    elapsed = (time.perf_counter() - start) * 1000
+    for result in results:
+        question = " ".join(result["question"].split())
+        print(f"{result['score']:>7.1f} {result['count']:>4}x  {question}")
+        print(f"{'':>14}{result['department']} / {result['branch']} / {result['semester']} / "
+              f"{result['subject']}: {', '.join(result['sources'])}")
+    print(f"{len(results)} results in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
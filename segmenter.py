@@ -0,0 +1,81 @@
+import re
+import itertools
+from collections import namedtuple
+
+# Bump when the segmentation rules change; part of the extraction cache key.
+SEGMENTER_VERSION = 2
+
+# One pattern for every marker at the start of a line, so the text is
+# scanned once without backtracking. Question numbers: "1.", "1)", "Q1",
+# "Q.1", "Q 1:" (at most three digits, and "1.5" is not a number).
+# Subquestion markers: "(a)", "(iv)", "a)", "iv)".
+MARKER = r"""
+    [ \t]*
+    (?:
+        (?:[Qq]\.?[ \t]?(?P<qno>\d{1,3})(?!\d)[.):]?
+          | (?P<no>\d{1,3})[.)](?!\d))
+      | \((?P<sub>[a-z]|[ivx]+)\)
+      | (?P<bare_sub>[a-z]|[ivx]+)\)
+    )
+    """
+# Leading with the newline lets the regex engine skip ahead to line breaks
+# instead of trying the pattern at every character (as ^ with MULTILINE does);
+# the first line is matched on its own.
+FIRST_LINE_RE = re.compile(MARKER, re.VERBOSE)
+LINE_RE = re.compile(r"\n" + MARKER, re.VERBOSE)
+
+Segment = namedtuple("Segment", ["question_no", "sub_marker", "text", "start", "end"])
+
+
+def _segment(text, question_no, sub_marker, start, end):
+    """
+    The Segment for text[start:end] without its surrounding whitespace,
+    or None when nothing is left.
+    """
+    chunk = text[start:end]
+    stripped = chunk.strip()
+    if not stripped:
+        return None
+    start += len(chunk) - len(chunk.lstrip())
+    return Segment(question_no, sub_marker, stripped, start, start + len(stripped))
+
+def iter_segments(text):
+    """
+    Yield a Segment(question_no, sub_marker, text, start, end) for each
+    question and subquestion of text, in order. The text of a question
+    runs from its number to its first subquestion marker (sub_marker is
+    None), each subquestion's to the next marker. start and end are the
+    offsets of the segment text in text. Text before the first question
+    number is skipped, as are empty segments.
+    """
+    question_no = None
+    sub_marker = None
+    content_start = None
+    first = FIRST_LINE_RE.match(text)
+    matches = LINE_RE.finditer(text)
+    for match in itertools.chain([first] if first else [], matches):
+        number = match.group("qno") or match.group("no")
+        if number is None and question_no is None:
+            continue
+        if question_no is not None:
+            segment = _segment(text, question_no, sub_marker, content_start, match.start())
+            if segment is not None:
+                yield segment
+        if number is not None:
+            question_no, sub_marker = number, None
+        else:
+            sub_marker = match.group("sub") or match.group("bare_sub")
+        content_start = match.end()
+    if question_no is not None:
+        segment = _segment(text, question_no, sub_marker, content_start, len(text))
+        if segment is not None:
+            yield segment
+
+def question_text(segment):
+    """
+    The question string stored in the JSON: subquestions keep their
+    marker in the "(a) ..." form.
+    """
+    if segment.sub_marker is None:
+        return segment.text
+    return f"({segment.sub_marker}) {segment.text}"
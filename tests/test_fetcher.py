@@ -0,0 +1,151 @@
+import os
+import random
+import logging
+import pytest
+
+pytest.importorskip("pyftpdlib")
+from pyftpdlib.handlers import FTPHandler
+import fetcher
+from bench_ftp_listing import build_tree, start_server
+
+TREE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ftp_tree.txt")
+TREE_LIMIT = 60                 # Entries of ftp_tree.txt recreated on the test server
+FILE_SIZES = (20000, 400000)    # Random content size range of each served file, in bytes
+SERVER_MTIME = 1704067200       # Modification time of the served files (2024-01-01)
+
+
+class FlakyHandler(FTPHandler):
+    """
+    FTP handler that records REST offsets and logins, and fails chosen
+    transfers once: paths in cut_short get only their first half sent,
+    paths in drop lose the control connection before any data.
+    """
+    cut_short = set()
+    drop = set()
+    rest_offsets = []
+    logins = 0
+    scratch = None
+
+    def on_login(self, username):
+        FlakyHandler.logins += 1
+
+    def ftp_REST(self, line):
+        FlakyHandler.rest_offsets.append(int(line))
+        return super().ftp_REST(line)
+
+    def ftp_RETR(self, file):
+        if file in self.drop:
+            self.drop.discard(file)
+            self.close()
+            return
+        if file in self.cut_short:
+            self.cut_short.discard(file)
+            with open(file, "rb") as f:
+                data = f.read()
+            half = os.path.join(self.scratch, "half")
+            with open(half, "wb") as f:
+                f.write(data[:len(data) // 2])
+            return super().ftp_RETR(half)
+        return super().ftp_RETR(file)
+
+
+@pytest.fixture(scope="module")
+def served(tmp_path_factory):
+    """
+    A local FTP server over part of the ftp_tree.txt structure, its files
+    filled with random contents. Yields (served root, file paths, connect args).
+    """
+    logging.getLogger("pyftpdlib").setLevel(logging.WARNING)
+    root = str(tmp_path_factory.mktemp("served"))
+    build_tree(TREE_PATH, root, TREE_LIMIT)
+    rng = random.Random(8)
+    paths = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "wb") as f:
+                f.write(rng.randbytes(rng.randint(*FILE_SIZES)))
+            os.utime(path, (SERVER_MTIME, SERVER_MTIME))
+            paths.append(path)
+    FlakyHandler.scratch = str(tmp_path_factory.mktemp("scratch"))
+    server, port = start_server(root, FlakyHandler)
+    yield root, sorted(paths), {"server": "127.0.0.1", "port": port}
+    server.close_all()
+
+@pytest.fixture
+def local(tmp_path):
+    return str(tmp_path)
+
+def fetch_all(connect_args, local_dir):
+    ftp = fetcher.connect(**connect_args)
+    try:
+        return fetcher.download_ftp_tree(ftp, "/", local_dir, fetcher.MAX_CONNECTIONS, connect_args)
+    finally:
+        ftp.quit()
+
+def local_path(root, local_dir, server_path):
+    return os.path.join(local_dir, os.path.relpath(server_path, root))
+
+def same_copy(server_path, copy_path):
+    with open(server_path, "rb") as a, open(copy_path, "rb") as b:
+        same = a.read() == b.read()
+    return same and int(os.stat(copy_path).st_mtime) == SERVER_MTIME
+
+
+def test_fresh_download(served, local):
+    root, paths, connect_args = served
+    outcomes = fetch_all(connect_args, local)
+    assert outcomes["downloaded"] == len(paths)
+    assert all(same_copy(path, local_path(root, local, path)) for path in paths)
+    assert not [name for _, _, names in os.walk(local) for name in names if name.endswith(".part")]
+
+def test_skips_unchanged_and_refetches_modified(served, local):
+    root, paths, connect_args = served
+    fetch_all(connect_args, local)
+    assert fetch_all(connect_args, local)["skipped"] == len(paths)
+
+    changed = paths[0]
+    os.utime(changed, (SERVER_MTIME + 3600, SERVER_MTIME + 3600))
+    try:
+        outcomes = fetch_all(connect_args, local)
+    finally:
+        os.utime(changed, (SERVER_MTIME, SERVER_MTIME))
+    assert outcomes["downloaded"] == 1
+    assert outcomes["skipped"] == len(paths) - 1
+
+def test_resumes_part_file_with_rest(served, local):
+    root, paths, connect_args = served
+    fetch_all(connect_args, local)
+    partial = paths[len(paths) // 2]
+    target = local_path(root, local, partial)
+    os.remove(target)
+    with open(partial, "rb") as f:
+        head = f.read(os.path.getsize(partial) // 3)
+    with open(target + ".part", "wb") as f:
+        f.write(head)
+    del FlakyHandler.rest_offsets[:]
+
+    outcomes = fetch_all(connect_args, local)
+    assert outcomes["resumed"] == 1
+    assert FlakyHandler.rest_offsets == [len(head)]
+    assert same_copy(partial, target)
+    assert not os.path.exists(target + ".part")
+
+def test_retries_short_transfer_and_dropped_connection(served, local):
+    root, paths, connect_args = served
+    fetch_all(connect_args, local)
+    short, dropped = paths[1], paths[-1]
+    for path in (short, dropped):
+        os.remove(local_path(root, local, path))
+    FlakyHandler.cut_short.add(short)
+    FlakyHandler.drop.add(dropped)
+    del FlakyHandler.rest_offsets[:]
+    logins = FlakyHandler.logins
+
+    outcomes = fetch_all(connect_args, local)
+    # The short copy is resumed from where it stopped, on a new connection
+    assert same_copy(short, local_path(root, local, short))
+    assert os.path.getsize(short) // 2 in FlakyHandler.rest_offsets
+    assert same_copy(dropped, local_path(root, local, dropped))
+    assert outcomes["failed"] == 0
+    assert FlakyHandler.logins > logins + 1
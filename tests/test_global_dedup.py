@@ -0,0 +1,45 @@
+import random
+from fuzzywuzzy import fuzz
+import global_dedup
+from dedup import SIMILARITY_THRESHOLD
+
+QUESTIONS = ["State Kirchhoffs law", "Kirchoffs laws", "State Kirchhoff's laws", "Explain paging",
+             "Explain paging with a neat diagram", "Define normalization", "What is normalisation?",
+             "???", "Explain deadlock", "???", "Compare stack and queue", "Compare queue and stack", "!"]
+
+
+def brute_force_components(questions):
+    components = global_dedup.UnionFind(len(questions))
+    for i in range(len(questions)):
+        for j in range(i + 1, len(questions)):
+            if (questions[i] == questions[j]
+                    or fuzz.token_set_ratio(questions[i], questions[j]) >= SIMILARITY_THRESHOLD):
+                components.union(i, j)
+    return partition(components.find(i) for i in range(len(questions)))
+
+def partition(roots):
+    groups = {}
+    for i, root in enumerate(roots):
+        groups.setdefault(root, set()).add(i)
+    return sorted(sorted(group) for group in groups.values())
+
+def test_matches_brute_force():
+    rng = random.Random(3)
+    words = "stack queue tree graph heap explain define compare state law paging deadlock".split()
+    questions = QUESTIONS + [" ".join(rng.choice(words) for _ in range(rng.randint(1, 6))) for _ in range(150)]
+    roots, _, _ = global_dedup.cluster_questions(questions, workers=1)
+    assert partition(roots) == brute_force_components(questions)
+
+def test_parallel_chunks_agree(monkeypatch):
+    monkeypatch.setattr(global_dedup, "SCORE_CHUNK", 4)
+    roots, _, _ = global_dedup.cluster_questions(QUESTIONS, workers=2)
+    assert partition(roots) == brute_force_components(QUESTIONS)
+
+def test_cluster_ids_are_unique():
+    subject = {"Department": "B. E", "Branch": "CSE", "Semester": "4", "Subject": "OS"}
+    occurrences = [("os.json", position, {"question": question, "count": 1, "sources": ["a.pdf"]}, subject)
+                   for position, question in enumerate(QUESTIONS)]
+    roots, _, _ = global_dedup.cluster_questions(QUESTIONS, workers=1)
+    clusters, cluster_ids = global_dedup.build_clusters(occurrences, roots)
+    assert len(clusters) == len(set(roots))
+    assert sum(len(cluster["occurrences"]) for cluster in clusters.values()) == len(QUESTIONS)
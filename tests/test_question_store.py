@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("pandas")
+import question_store
+
+
+def write_subject(store_dir, subject, questions):
+    store = question_store.QuestionStore(str(store_dir))
+    store.add_subject("B. E", "CSE", "4", subject,
+                      [{"question": question, "count": 2, "sources": ["a.pdf"]} for question in questions])
+    store.flush()
+
+def test_latest_write_supersedes(tmp_path):
+    write_subject(tmp_path, "DBMS", ["Define normalization", "Explain indexing"])
+    write_subject(tmp_path, "DBMS", ["Explain indexing"])
+    write_subject(tmp_path, "OS", ["Explain paging"])
+    df = question_store.load_questions(str(tmp_path))
+    assert sorted(df["question"]) == ["Explain indexing", "Explain paging"]
+
+def test_subject_rewritten_without_questions(tmp_path):
+    write_subject(tmp_path, "DBMS", ["Define normalization"])
+    write_subject(tmp_path, "OS", ["Explain paging"])
+    write_subject(tmp_path, "DBMS", [])
+    assert list(question_store.load_questions(str(tmp_path))["question"]) == ["Explain paging"]
+    assert list(question_store.top_repeated(str(tmp_path))["question"]) == ["Explain paging"]
+
+    assert question_store.compact(str(tmp_path)) == 1
+    assert list(question_store.load_questions(str(tmp_path))["question"]) == ["Explain paging"]
+
+def test_compact_partition_left_without_questions(tmp_path):
+    write_subject(tmp_path, "DBMS", ["Define normalization"])
+    write_subject(tmp_path, "DBMS", [])
+    assert question_store.compact(str(tmp_path)) == 0
+    assert question_store.load_questions(str(tmp_path)).empty